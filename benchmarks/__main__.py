@@ -0,0 +1,124 @@
+# benchmarks/__main__.py
+#
+# python -m benchmarks --tablas MOVS FACTURAD --escala 1m --salida reporte.json
+#
+# Genera los DBF sintéticos (benchmarks/generador.py), corre las etapas
+# (benchmarks/etapas.py) contra la base indicada en --uri (SQLite local por
+# default) y escribe el reporte JSON para comparar con benchmarks/comparar.py.
+
+import os
+import sys
+import json
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from benchmarks import etapas
+
+ESCALAS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+TABLAS_DEFAULT = ["MOVS", "FACTURAD"]
+TRABAJO_DEFAULT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "state", "benchmarks")
+VERSION_REPORTE = 1
+
+
+def _versiones() -> dict:
+    versiones = {"python": platform.python_version()}
+    for modulo in ("numpy", "pandas", "sqlalchemy", "pymysql", "dbfread", "pyarrow"):
+        try:
+            versiones[modulo] = __import__(modulo).__version__
+        except Exception:
+            versiones[modulo] = None
+    return versiones
+
+
+def _commit() -> str:
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=raiz, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _valor(texto: str):
+    """Valor de --config: JSON si se puede (true, 4, "x"), si no texto."""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de AlphaETL con DBF sintéticos.")
+    parser.add_argument("--tablas", nargs="+", default=TABLAS_DEFAULT, help=f"Entradas de schemas.json a medir (default {' '.join(TABLAS_DEFAULT)}).")
+    parser.add_argument("--escala", choices=ESCALAS, default="10k", help="Filas por tabla: 10k, 1m o 10m (default 10k).")
+    parser.add_argument("--filas", type=int, help="Filas por tabla (reemplaza --escala).")
+    parser.add_argument("--etapas", nargs="+", choices=etapas.ETAPAS, default=list(etapas.ETAPAS), help="Etapas a medir (default todas).")
+    parser.add_argument("--cambios", type=float, default=0.05, help="Fracción de registros modificados para diff/e2e (default 0.05).")
+    parser.add_argument("--altas", type=float, default=0.01, help="Fracción de registros nuevos para diff/e2e (default 0.01).")
+    parser.add_argument("--borrados", type=float, default=0.0, help="Fracción de registros marcados '*' para diff/e2e (default 0).")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los datos sintéticos (default 0).")
+    parser.add_argument("--uri", help="Base destino (SQLAlchemy). Default: SQLite en el directorio de trabajo.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Tamaño de lote de lectura y upsert (default 10000).")
+    parser.add_argument("--config", action="append", default=[], metavar="CLAVE=VALOR", help="Opción de config.json para e2e (p. ej. PIPELINE=true). Se puede repetir.")
+    parser.add_argument("--trabajo", default=TRABAJO_DEFAULT, help="Directorio para DBF, base SQLite y estado (default state/benchmarks).")
+    parser.add_argument("--salida", help="Ruta del reporte JSON (default bench_<fecha>.json en el directorio de trabajo).")
+    parser.add_argument("--debug", action="store_true", help="Muestra el log INFO del ETL.")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.debug else logging.WARNING)
+
+    filas = args.filas or ESCALAS[args.escala]
+    os.makedirs(args.trabajo, exist_ok=True)
+    uri = args.uri or f"sqlite:///{os.path.join(os.path.abspath(args.trabajo), 'destino.sqlite')}"
+    config = {}
+    for opcion in args.config:
+        clave, _, valor = opcion.partition("=")
+        config[clave.strip()] = _valor(valor)
+    salida = args.salida or os.path.join(args.trabajo, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+
+    reporte = {
+        "version": VERSION_REPORTE,
+        "meta": {
+            "fecha":      datetime.now().isoformat(timespec="seconds"),
+            "commit":     _commit(),
+            "plataforma": platform.platform(),
+            "cpu":        platform.processor() or platform.machine(),
+            "nucleos":    os.cpu_count(),
+            "versiones":  _versiones(),
+            "uri":        make_url(uri).render_as_string(hide_password=True),
+            "filas":      filas,
+            "chunk_size": args.chunk_size,
+            "cambios":    args.cambios,
+            "altas":      args.altas,
+            "borrados":   args.borrados,
+            "semilla":    args.semilla,
+            "config":     config
+        },
+        "resultados": []
+    }
+
+    def guardar():
+        # Se reescribe tras cada etapa: una corrida larga interrumpida deja lo medido
+        with open(salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    for tabla in args.tablas:
+        ctx = etapas.Contexto(tabla, filas, args.trabajo, uri, args.chunk_size, args.semilla, config)
+        try:
+            etapas.ejecutar(ctx, args.etapas, args.cambios, args.altas, args.borrados, reporte["resultados"], guardar)
+        except Exception as e:
+            logging.exception(f"Benchmark de {tabla} interrumpido: {e}")
+            reporte.setdefault("errores", []).append({"tabla": tabla, "error": str(e)})
+    guardar()
+    print(f"Reporte: {salida}")
+    sys.exit(1 if reporte.get("errores") else 0)
+
+
+if __name__ == "__main__":
+    main()
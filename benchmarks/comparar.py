@@ -0,0 +1,66 @@
+# benchmarks/comparar.py
+#
+# python -m benchmarks.comparar base.json nuevo.json [--tolerancia 0.10]
+#
+# Compara dos reportes de `python -m benchmarks` por (tabla, etapa, variante):
+# filas/s, latencia p95 y pico de RSS. Sale con código 1 si alguna medición
+# empeora más que la tolerancia (para usar en CI o antes de un merge).
+
+import sys
+import json
+import argparse
+
+# (campo, mayor es mejor)
+METRICAS = (("filas_s", True), ("latencia_p95", False), ("pico_rss_mb", False))
+
+
+def _indice(reporte: dict) -> dict:
+    salida = {}
+    for r in reporte["resultados"]:
+        fila = dict(r)
+        fila["latencia_p95"] = (r.get("latencia") or {}).get("p95")
+        salida[(r["tabla"], r["etapa"], r["variante"])] = fila
+    return salida
+
+
+def comparar(base: dict, nuevo: dict, tolerancia: float = 0.10) -> list:
+    """[(clave, métrica, antes, después, cambio relativo, regresión)] de las mediciones comunes."""
+    a, b = _indice(base), _indice(nuevo)
+    filas = []
+    for clave in sorted(a.keys() & b.keys()):
+        for metrica, mayor_mejor in METRICAS:
+            antes, despues = a[clave].get(metrica), b[clave].get(metrica)
+            if not antes or despues is None:
+                continue
+            cambio = (despues - antes) / antes
+            peor   = -cambio if mayor_mejor else cambio
+            filas.append((clave, metrica, antes, despues, cambio, peor > tolerancia))
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos reportes de benchmarks de AlphaETL.")
+    parser.add_argument("base", help="Reporte de referencia (JSON).")
+    parser.add_argument("nuevo", help="Reporte a evaluar (JSON).")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Empeoramiento relativo permitido (default 0.10).")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+    if base["meta"].get("filas") != nuevo["meta"].get("filas") or base["meta"].get("uri") != nuevo["meta"].get("uri"):
+        print("Aviso: los reportes usan distinta escala o base destino")
+
+    filas = comparar(base, nuevo, args.tolerancia)
+    print(f"{'TABLA':<10} {'ETAPA':<8} {'VARIANTE':<22} {'MÉTRICA':<13} {'ANTES':>12} {'DESPUÉS':>12} {'CAMBIO':>8}")
+    for (tabla, etapa, variante), metrica, antes, despues, cambio, regresion in filas:
+        marca = "  REGRESIÓN" if regresion else ""
+        print(f"{tabla:<10} {etapa:<8} {variante:<22} {metrica:<13} {antes:>12.4g} {despues:>12.4g} {cambio:>+7.1%}{marca}")
+    regresiones = sum(1 for f in filas if f[-1])
+    print(f"{regresiones} regresiones (tolerancia {args.tolerancia:.0%})")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
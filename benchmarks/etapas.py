@@ -0,0 +1,327 @@
+# benchmarks/etapas.py
+#
+# Mediciones por etapa sobre un DBF sintético (benchmarks/generador.py):
+# lectura, hash, upsert, diff y la sincronización completa (e2e) con
+# ejecutar_etl_con_progreso. Cada medición devuelve un dict con segundos,
+# filas/s, latencia por lote (p50/p95/máx) y pico de RSS; __main__ los junta
+# en el reporte JSON.
+#
+# La base destino puede ser MySQL/MariaDB o SQLite (upsert_chunks usa
+# ON CONFLICT con SQLite). El estado (etl/state.py), snapshots y caché de
+# metadatos se redirigen al directorio de trabajo para no tocar los reales.
+
+import gc
+import os
+import json
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+import numpy as np
+import psutil
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Date, DateTime, Float, Integer, MetaData, String, Table, Text
+)
+
+from etl import control, db, etl_core, metadata, snapshot, state, telemetria
+from etl.hashing import ALGORITMOS, calcular_hashes
+from benchmarks import generador
+
+ETAPAS = ("lectura", "hash", "upsert", "diff", "e2e")
+# Filas para medir calcular_hash_fila (una por una es lento)
+MUESTRA_HASH_FILA = 100_000
+
+
+class Contexto:
+    """Tabla a medir: entrada de schemas.json, estructura del DBF y rutas de trabajo."""
+
+    def __init__(self, tabla: str, filas: int, trabajo: str, uri: str, chunk_size: int,
+                 semilla: int = 0, config: dict = None):
+        self.tabla      = tabla.upper()
+        self.filas      = filas
+        self.trabajo    = os.path.abspath(trabajo)
+        self.uri        = uri
+        self.chunk_size = chunk_size
+        self.semilla    = semilla
+        self.config     = config or {}
+        self.entry      = generador.cargar_entry(self.tabla)
+        self.campos     = generador.cargar_estructura(self.tabla)
+        self.key_cols   = self.entry.get("KEYS") or self.entry["TARGET"].get("KEYS", [])
+        self.hash_cols  = self.entry.get("HASHES") or self.entry["TARGET"].get("HASHES", [])
+        self.claves_dbf = generador.campos_fuente(self.entry, self.key_cols)
+        self.src_cols   = [c["SOURCE"] for c in self.entry["TARGET"]["COLUMNS"]]
+        self.rename_map = {c["SOURCE"].lower(): c["TARGET"] for c in self.entry["TARGET"]["COLUMNS"]}
+        self.nombre_tabla = self.entry["TARGET"]["TABLE"]
+        self.dbf_dir    = os.path.join(self.trabajo, "dbf")
+
+    @property
+    def base(self) -> str:
+        """DBF sintético original (se reutiliza si ya existe con la misma semilla)."""
+        return os.path.join(self.trabajo, "base", f"{self.tabla}_{self.filas}_{self.semilla}.DBF")
+
+    def generar(self) -> str:
+        if not os.path.exists(self.base):
+            t0 = time.perf_counter()
+            generador.generar_dbf(self.base, self.campos, self.filas, self.claves_dbf, self.semilla)
+            logging.info(f"{self.base} generado en {time.perf_counter() - t0:.1f}s")
+        return self.base
+
+    def copia(self, nombre: str) -> str:
+        ruta = os.path.join(self.trabajo, "copias", nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        shutil.copyfile(self.generar(), ruta)
+        return ruta
+
+    def mutar(self, ruta: str, cambios: float, altas: float, borrados: float) -> dict:
+        return generador.mutar_dbf(
+            ruta, self.campos, self.claves_dbf, cambios, altas, borrados,
+            campos_cambio=generador.campos_fuente(self.entry, self.hash_cols), semilla=self.semilla + 1
+        )
+
+    def leer(self, ruta: str):
+        """DBF completo ya renombrado y con row_hash, como lo ve preparar_lote."""
+        df = etl_core.dbf_to_dataframe(ruta, self.src_cols)
+        df = df.rename(columns={c: self.rename_map[c.lower()] for c in df.columns})
+        df["row_hash"] = calcular_hashes(df, self.hash_cols, self._algoritmo())
+        return df
+
+    def _algoritmo(self) -> str:
+        return self.entry.get("HASH_ALGORITHM") or self.config.get("HASH_ALGORITHM", "sha256")
+
+
+def _tipo(campo: dict):
+    tipo, largo, dec = campo["type"], campo["length"], campo["decimal_count"]
+    if tipo == "C":
+        return String(largo)
+    if tipo in "NF":
+        if dec:
+            return Float
+        return BigInteger if largo > 9 else Integer
+    if tipo == "D":
+        return Date
+    if tipo == "T":
+        return DateTime
+    if tipo == "L":
+        return Boolean
+    if tipo == "I":
+        return Integer
+    return Text
+
+
+def crear_tablas(ctx: Contexto):
+    """(Re)crea la tabla destino vacía y tbl_sync_log si no existe."""
+    engine = db.obtener_engine(ctx.uri)
+    tipos  = {c["name"].lower(): c for c in ctx.campos}
+    keys   = {k.lower() for k in ctx.key_cols}
+    md     = MetaData()
+    cols   = []
+    for c in ctx.entry["TARGET"]["COLUMNS"]:
+        campo = tipos.get(c["SOURCE"].lower())
+        tipo  = _tipo(campo) if campo else Text
+        cols.append(Column(c["TARGET"], tipo, primary_key=c["TARGET"].lower() in keys))
+    cols.append(Column("row_hash", String(64)))
+    destino = Table(ctx.nombre_tabla, md, *cols)
+    Table(
+        "tbl_sync_log", md,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("dbf_name", String(64)),
+        Column("sync_time", DateTime),
+        Column("rows_processed", Integer),
+        Column("rows_upserted", Integer),
+        Column("time_elapsed", Integer),
+        Column("chunk_size", Integer),
+        Column("mem_used_mb", Float)
+    )
+    destino.drop(engine, checkfirst=True)
+    md.create_all(engine)
+
+
+def preparar_entorno(ctx: Contexto):
+    """config.json/schemas.json de trabajo y estado aislado en `ctx.trabajo`."""
+    os.makedirs(ctx.dbf_dir, exist_ok=True)
+    estado_dir = os.path.join(ctx.trabajo, "state")
+    # Estado vacío por tabla: la primera corrida e2e es una carga completa
+    for sufijo in ("", "-wal", "-shm"):
+        ruta = os.path.join(estado_dir, f"{ctx.tabla}.db{sufijo}")
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    state.STATE_FILE       = os.path.join(estado_dir, f"{ctx.tabla}.db")
+    snapshot.SNAPSHOT_DIR  = os.path.join(estado_dir, "snapshots")
+    metadata.METADATA_DIR  = os.path.join(estado_dir, "metadata")
+    control.CONTROL_FILE   = os.path.join(estado_dir, "sync_control.json")
+
+    cfg = {
+        "DBF_DIR":    ctx.dbf_dir,
+        "CHUNK_SIZE": ctx.chunk_size,
+        "MYSQL_URI":  ctx.uri,
+        **ctx.config
+    }
+    schemas = {"ENTRIES": {"TRANSACTIONAL": [ctx.entry]}}
+    etl_core.CONFIG_PATH = os.path.join(ctx.trabajo, "config.json")
+    etl_core.SCHEMA_PATH = os.path.join(ctx.trabajo, "schemas.json")
+    with open(etl_core.CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(cfg, f, indent=2)
+    with open(etl_core.SCHEMA_PATH, "w", encoding="utf-8") as f:
+        json.dump(schemas, f, indent=2, ensure_ascii=False)
+
+
+def _latencias(marcas: List[float]) -> Optional[dict]:
+    """p50/p95/máx (segundos) entre marcas de tiempo consecutivas."""
+    if len(marcas) < 2:
+        return None
+    d = np.diff(np.asarray(marcas))
+    return {
+        "lotes": len(d),
+        "p50":   round(float(np.percentile(d, 50)), 4),
+        "p95":   round(float(np.percentile(d, 95)), 4),
+        "max":   round(float(d.max()), 4)
+    }
+
+
+@contextmanager
+def medir(ctx: Contexto, etapa: str, variante: str, resultados: list, filas: int = None):
+    """
+    Mide el bloque con etl.telemetria (tiempo y pico de RSS) y agrega el
+    resultado. El bloque puede completar el dict que recibe (filas, latencia...).
+    """
+    gc.collect()
+    r = {
+        "tabla":    ctx.tabla,
+        "filas":    ctx.filas if filas is None else filas,
+        "etapa":    etapa,
+        "variante": variante,
+        "rss_base_mb": round(psutil.Process().memory_info().rss / 1024**2, 2)
+    }
+    tele = telemetria.Telemetria().iniciar()
+    try:
+        yield r
+    finally:
+        tele.detener()
+    r["segundos"]    = round(tele.segundos, 4)
+    r["filas_s"]     = round(r["filas"] / tele.segundos, 1) if tele.segundos > 0 else None
+    r["pico_rss_mb"] = tele.pico_rss_mb
+    r.setdefault("latencia", None)
+    resultados.append(r)
+    print(
+        f"{ctx.tabla:<10} {etapa:<8} {variante:<22} {r['filas']:>10} filas "
+        f"{r['segundos']:>9.3f}s {r['filas_s'] or 0:>12.0f} filas/s {r['pico_rss_mb']:>8.1f} MB",
+        flush=True
+    )
+
+
+def lectura(ctx: Contexto, resultados: list):
+    ruta = ctx.generar()
+    mb   = os.path.getsize(ruta) / 1024**2
+    with medir(ctx, "lectura", "dataframe", resultados) as r:
+        df = etl_core.dbf_to_dataframe(ruta, ctx.src_cols)
+    r["mb_s"] = round(mb / r["segundos"], 1) if r["segundos"] else None
+    del df
+
+    marcas = []
+    with medir(ctx, "lectura", "lotes", resultados) as r:
+        marcas.append(time.perf_counter())
+        for lote in etl_core.dbf_to_batches(ruta, ctx.src_cols, batch_size=ctx.chunk_size):
+            marcas.append(time.perf_counter())
+        r["latencia"] = _latencias(marcas)
+    r["mb_s"] = round(mb / r["segundos"], 1) if r["segundos"] else None
+
+
+def hashear(ctx: Contexto, resultados: list):
+    df = etl_core.dbf_to_dataframe(ctx.generar(), ctx.src_cols)
+    df = df.rename(columns={c: ctx.rename_map[c.lower()] for c in df.columns})
+
+    muestra = df.head(MUESTRA_HASH_FILA).to_dict("records")
+    with medir(ctx, "hash", "fila_sha256", resultados, filas=len(muestra)):
+        for row in muestra:
+            etl_core.calcular_hash_fila(row, ctx.hash_cols)
+    del muestra
+
+    for algoritmo in ALGORITMOS:
+        with medir(ctx, "hash", algoritmo, resultados):
+            calcular_hashes(df, ctx.hash_cols, algoritmo)
+
+
+def _upsert(ctx: Contexto, df, r: dict = None):
+    marcas = [time.perf_counter()]
+    etl_core.upsert_dataframe_con_progreso(
+        df, ctx.uri, ctx.nombre_tabla, ctx.key_cols, "row_hash", ctx.chunk_size,
+        lambda _: marcas.append(time.perf_counter()),
+        concurrencia=ctx.config.get("ASYNC_UPSERT", 1)
+    )
+    if r is not None:
+        r["latencia"] = _latencias(marcas)
+
+
+def upsert(ctx: Contexto, resultados: list):
+    crear_tablas(ctx)
+    df = ctx.leer(ctx.generar())
+    with medir(ctx, "upsert", "inicial", resultados) as r:
+        _upsert(ctx, df, r)
+    # Segunda pasada: mismas llaves, todas las filas actualizan
+    with medir(ctx, "upsert", "actualizacion", resultados) as r:
+        _upsert(ctx, df, r)
+
+
+def diff(ctx: Contexto, resultados: list, cambios: float, altas: float, borrados: float):
+    # Destino con el DBF original; el diff se mide contra una copia mutada
+    crear_tablas(ctx)
+    _upsert(ctx, ctx.leer(ctx.generar()))
+    ruta = ctx.copia(f"{ctx.tabla}_diff.DBF")
+    mutacion = ctx.mutar(ruta, cambios, altas, borrados)
+    df = ctx.leer(ruta)
+    with medir(ctx, "diff", "filter_new_or_changed", resultados, filas=len(df)) as r:
+        cambiadas = etl_core.filter_new_or_changed(
+            df, db.obtener_engine(ctx.uri), ctx.nombre_tabla, ctx.key_cols, "row_hash", ctx.hash_cols
+        )
+        r["cambiadas"] = len(cambiadas)
+        r["mutacion"]  = mutacion
+
+
+def e2e(ctx: Contexto, resultados: list, cambios: float, altas: float, borrados: float):
+    """Carga inicial, corrida incremental tras mutar el DBF y corrida sin cambios."""
+    crear_tablas(ctx)
+    preparar_entorno(ctx)
+    ruta = os.path.join(ctx.dbf_dir, f"{ctx.tabla}.DBF")
+    shutil.copyfile(ctx.generar(), ruta)
+
+    def correr(variante: str, mutacion: dict = None):
+        marcas, perfil = [time.perf_counter()], {}
+
+        def etapa(nombre: str, n: int, total: int):
+            if nombre == "carga":
+                marcas.append(time.perf_counter())
+
+        with medir(ctx, "e2e", variante, resultados, filas=etl_core.contar_registros_dbf(ruta)) as r:
+            r["mensaje"] = etl_core.ejecutar_etl_con_progreso(
+                ctx.tabla, ctx.chunk_size, lambda _: None,
+                stage_callback=etapa, perfil_callback=perfil.update
+            )
+            r["latencia"] = _latencias(marcas)
+            r["perfil"]   = perfil or None
+            if mutacion:
+                r["mutacion"] = mutacion
+
+    correr("inicial")
+    correr("incremental", ctx.mutar(ruta, cambios, altas, borrados))
+    correr("sin_cambios")
+
+
+_FUNCIONES = {"lectura": lectura, "hash": hashear, "upsert": upsert, "diff": diff, "e2e": e2e}
+_CON_MUTACION = {"diff", "e2e"}
+
+
+def ejecutar(ctx: Contexto, etapas: List[str], cambios: float, altas: float, borrados: float,
+             resultados: list, al_terminar: Callable[[], None] = None):
+    """Corre las etapas pedidas (en el orden de ETAPAS) para una tabla."""
+    preparar_entorno(ctx)
+    for nombre in ETAPAS:
+        if nombre not in etapas:
+            continue
+        if nombre in _CON_MUTACION:
+            _FUNCIONES[nombre](ctx, resultados, cambios, altas, borrados)
+        else:
+            _FUNCIONES[nombre](ctx, resultados)
+        if al_terminar:
+            al_terminar()
@@ -0,0 +1,306 @@
+# benchmarks/generador.py
+#
+# Generador de DBF sintéticos con la estructura real de cada tabla
+# (config/estructure.json) y llaves únicas según KEYS de config/schemas.json.
+# Los registros se escriben por bloques con arreglos estructurados de NumPy,
+# así que 10M de filas no necesitan más memoria que un bloque. Con la misma
+# semilla el archivo generado es idéntico byte a byte.
+#
+# mutar_dbf() aplica sobre el archivo una tasa de cambios, altas y borrados
+# para medir la corrida incremental.
+
+import os
+import json
+import struct
+import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESTRUCTURA_PATH = os.path.join(RAIZ, "config", "estructure.json")
+SCHEMA_PATH     = os.path.join(RAIZ, "config", "schemas.json")
+
+# Registros por bloque de escritura
+REGISTROS_BLOQUE = 100_000
+# Valores distintos por campo no llave (cardinalidad de los datos)
+TAM_POOL = 4096
+FECHA_MIN = datetime.date(2015, 1, 1)
+FECHA_MAX = datetime.date(2025, 12, 31)
+_ALFABETO = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ", dtype="S1")
+_MAX_DIGITOS = 18
+
+
+def cargar_estructura(tabla: str) -> List[dict]:
+    """Campos de `tabla` en config/estructure.json (sin distinguir mayúsculas)."""
+    with open(ESTRUCTURA_PATH, encoding="utf-8") as f:
+        estructura = json.load(f)
+    for nombre, campos in estructura.items():
+        if nombre.upper() == tabla.upper():
+            return campos
+    raise KeyError(f"{tabla} no está en {ESTRUCTURA_PATH}")
+
+
+def cargar_entry(tabla: str) -> dict:
+    """Entrada de `tabla` en config/schemas.json."""
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        schemas = json.load(f)
+    for grupo in schemas["ENTRIES"].values():
+        for entry in grupo:
+            if entry["DBF"].upper() == tabla.upper():
+                return entry
+    raise KeyError(f"{tabla} no está en {SCHEMA_PATH}")
+
+
+def campos_fuente(entry: dict, nombres: Sequence[str]) -> List[str]:
+    """Nombres destino (KEYS/HASHES) traducidos a los campos del DBF."""
+    origen = {c["TARGET"].lower(): c["SOURCE"] for c in entry["TARGET"]["COLUMNS"]}
+    return [origen.get(n.lower(), n).upper() for n in nombres]
+
+
+def _dtype(campos: List[dict]) -> np.dtype:
+    """Registro DBF como dtype estructurado (I y T binarios, el resto texto)."""
+    formatos = [("_flag", "S1")]
+    for c in campos:
+        if c["type"] == "I":
+            formatos.append((c["name"], "<i4"))
+        elif c["type"] == "T":
+            formatos.append((c["name"], "<i4", (2,)))
+        else:
+            formatos.append((c["name"], f"S{c['length']}"))
+    return np.dtype(formatos)
+
+
+def _texto_fijo(valores: np.ndarray, ancho: int, relleno: bytes = b"0") -> np.ndarray:
+    """Enteros >= 0 como texto de `ancho` bytes, alineados a la derecha."""
+    digitos = min(ancho, _MAX_DIGITOS)
+    pot = 10 ** np.arange(digitos - 1, -1, -1, dtype=np.int64)
+    matriz = ((valores.astype(np.int64)[:, None] // pot) % 10 + 48).astype(np.uint8)
+    if relleno != b"0":
+        # Ceros a la izquierda -> relleno (el último dígito siempre queda)
+        significativos = np.cumsum(matriz != 48, axis=1) > 0
+        significativos[:, -1] = True
+        matriz[~significativos] = ord(relleno)
+    if digitos < ancho:
+        lado = np.full((len(valores), ancho - digitos), ord(relleno), dtype=np.uint8)
+        matriz = np.hstack([lado, matriz])
+    return np.ascontiguousarray(matriz).view(f"S{ancho}").ravel()
+
+
+def _capacidad(campo: dict) -> Optional[int]:
+    """Valores distintos que caben en un campo llave (None si no se puede usar como llave)."""
+    tipo, largo, dec = campo["type"], campo["length"], campo["decimal_count"]
+    if tipo == "C":
+        return 10 ** min(largo, _MAX_DIGITOS)
+    if tipo in "NF":
+        enteros = largo - (dec + 1 if dec else 0)
+        return 10 ** min(enteros, _MAX_DIGITOS) if enteros > 0 else None
+    if tipo == "I":
+        return 2**31 - 1
+    return None
+
+
+def _llaves(campos: Dict[str, dict], claves: List[str], indices: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Reparte el número de registro entre los campos llave (base mixta), de modo
+    que la combinación es única aunque ningún campo alcance por sí solo.
+    """
+    capacidades = []
+    for k in claves:
+        cap = _capacidad(campos[k])
+        if cap is None:
+            raise ValueError(f"El campo llave {k} ({campos[k]['type']}) no se puede generar")
+        capacidades.append(cap)
+    if len(indices) and indices.max() >= np.prod([float(c) for c in capacidades]):
+        raise ValueError(
+            f"Las llaves {claves} admiten {int(np.prod([float(c) for c in capacidades]))} registros distintos"
+        )
+
+    valores, resto = {}, indices.astype(np.int64)
+    for k, cap in reversed(list(zip(claves, capacidades))):
+        valores[k] = resto % cap
+        resto      = resto // cap
+    salida = {}
+    for k in claves:
+        c = campos[k]
+        if c["type"] == "I":
+            salida[k] = valores[k].astype("<i4")
+        elif c["type"] == "C":
+            salida[k] = _texto_fijo(valores[k], c["length"], b"0")
+        else:
+            dec = c["decimal_count"]
+            enteros = c["length"] - (dec + 1 if dec else 0)
+            txt = _texto_fijo(valores[k], enteros, b" ")
+            if dec:
+                txt = np.char.add(txt, b"." + b"0" * dec)
+            salida[k] = txt
+    return salida
+
+
+def _pool(campo: dict, rng: np.random.Generator, tam: int = TAM_POOL) -> np.ndarray:
+    """Valores posibles de un campo no llave."""
+    tipo, largo, dec = campo["type"], campo["length"], campo["decimal_count"]
+    if tipo == "C":
+        letras = _ALFABETO[rng.integers(0, len(_ALFABETO) - 1, size=(tam, largo))]
+        cortes = rng.integers(1, largo + 1, size=tam)
+        letras[np.arange(largo)[None, :] >= cortes[:, None]] = b" "
+        return letras.view(f"S{largo}").ravel() if largo else np.full(tam, b"", dtype="S1")
+    if tipo in "NF":
+        enteros = max(1, min(largo - (dec + 1 if dec else 0), 9))
+        valores = rng.integers(0, 10 ** enteros, size=tam)
+        if dec:
+            fraccion = rng.integers(0, 10 ** dec, size=tam)
+            txt = [f"{v}.{f:0{dec}d}".rjust(largo)[:largo] for v, f in zip(valores, fraccion)]
+        else:
+            txt = [str(v).rjust(largo)[:largo] for v in valores]
+        return np.array([t.encode("ascii") for t in txt], dtype=f"S{largo}")
+    if tipo == "D":
+        dias = (FECHA_MAX - FECHA_MIN).days + 1
+        fechas = [FECHA_MIN + datetime.timedelta(days=int(d)) for d in rng.integers(0, dias, size=tam)]
+        return np.array([f.strftime("%Y%m%d").encode("ascii") for f in fechas], dtype="S8")
+    if tipo == "L":
+        return np.array([b"T", b"F"], dtype="S1")[rng.integers(0, 2, size=tam)]
+    if tipo == "I":
+        return rng.integers(-(2**31), 2**31 - 1, size=tam).astype("<i4")
+    if tipo == "T":
+        base = datetime.date(2015, 1, 1).toordinal() + 1721425
+        return np.stack([
+            rng.integers(base, base + 4000, size=tam), rng.integers(0, 86_400_000, size=tam)
+        ], axis=1).astype("<i4")
+    # Memo (sin .FPT), general, etc.: puntero en blanco
+    return np.full(tam, b" " * largo, dtype=f"S{largo}")
+
+
+def _pools(campos: List[dict], claves: List[str], semilla: int) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(semilla)
+    return {c["name"]: _pool(c, rng) for c in campos if c["name"] not in claves}
+
+
+def _bloque(campos, claves, pools, dtype, inicio: int, n: int, semilla: int) -> np.ndarray:
+    rng = np.random.default_rng([semilla, inicio])
+    registros = np.zeros(n, dtype=dtype)
+    registros["_flag"] = b" "
+    por_nombre = {c["name"]: c for c in campos}
+    for nombre, valores in _llaves(por_nombre, claves, np.arange(inicio, inicio + n)).items():
+        registros[nombre] = valores
+    for nombre, pool in pools.items():
+        registros[nombre] = pool[rng.integers(0, len(pool), size=n)]
+    return registros
+
+
+def _encabezado(campos: List[dict], registros: int) -> bytes:
+    record_len = 1 + sum(c["length"] for c in campos)
+    header_len = 32 + 32 * len(campos) + 1
+    hoy = datetime.date.today()
+    head = bytearray(32)
+    struct.pack_into("<BBBBIHH", head, 0, 0x03, hoy.year % 100, hoy.month, hoy.day, registros, header_len, record_len)
+    head[29] = 0x03  # cp1252
+    for c in campos:
+        desc = bytearray(32)
+        desc[:11] = c["name"].encode("cp1252")[:10].ljust(11, b"\0")
+        desc[11]  = ord(c["type"])
+        largo     = c["length"]
+        if c["type"] == "C":
+            desc[16], desc[17] = largo & 0xFF, largo >> 8
+        else:
+            desc[16], desc[17] = largo, c["decimal_count"]
+        head += desc
+    return bytes(head) + b"\r"
+
+
+def generar_dbf(
+    ruta: str,
+    campos: List[dict],
+    registros: int,
+    claves: List[str],
+    semilla: int = 0,
+    bloque: int = REGISTROS_BLOQUE
+) -> str:
+    """Escribe `registros` filas sintéticas en `ruta` con la estructura `campos`."""
+    campos = [dict(c, name=c["name"].upper()) for c in campos]
+    claves = [k.upper() for k in claves]
+    dtype  = _dtype(campos)
+    pools  = _pools(campos, claves, semilla)
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(_encabezado(campos, registros))
+        for inicio in range(0, registros, bloque):
+            n = min(bloque, registros - inicio)
+            f.write(_bloque(campos, claves, pools, dtype, inicio, n, semilla).tobytes())
+        f.write(b"\x1a")
+    return ruta
+
+
+def generar_tabla(ruta: str, tabla: str, registros: int, semilla: int = 0) -> str:
+    """DBF sintético de una tabla de schemas.json con su estructura real."""
+    entry  = cargar_entry(tabla)
+    claves = campos_fuente(entry, entry.get("KEYS") or entry["TARGET"].get("KEYS", []))
+    return generar_dbf(ruta, cargar_estructura(tabla), registros, claves, semilla)
+
+
+def mutar_dbf(
+    ruta: str,
+    campos: List[dict],
+    claves: List[str],
+    cambios: float = 0.0,
+    altas: float = 0.0,
+    borrados: float = 0.0,
+    campos_cambio: List[str] = None,
+    semilla: int = 1
+) -> dict:
+    """
+    Modifica el DBF en sitio: `cambios` (fracción de registros con un campo
+    de `campos_cambio` distinto), `borrados` (marcados '*') y `altas`
+    (registros nuevos al final, con llaves nuevas). Devuelve los conteos.
+    """
+    campos = [dict(c, name=c["name"].upper()) for c in campos]
+    claves = [k.upper() for k in claves]
+    dtype  = _dtype(campos)
+    with open(ruta, "rb") as f:
+        head = f.read(12)
+    _, _, _, _, total, header_len, _ = struct.unpack("<BBBBIHH", head)
+    rng = np.random.default_rng(semilla)
+
+    candidatos = [
+        c for c in campos
+        if c["name"] not in claves and c["type"] in "CNF" and c["length"] >= 3
+        and (not campos_cambio or c["name"] in {n.upper() for n in campos_cambio})
+    ]
+    n_cambios  = int(total * cambios)
+    n_borrados = int(total * borrados)
+    n_altas    = int(total * altas)
+
+    if total and (n_cambios or n_borrados):
+        registros = np.memmap(ruta, dtype=dtype, mode="r+", offset=header_len, shape=(total,))
+        filas = rng.permutation(total)
+        if n_cambios and candidatos:
+            pools = _pools(candidatos, [], semilla + 1)
+            sel   = np.sort(filas[:n_cambios])
+            for i, campo in enumerate(candidatos):
+                # Cada registro cambia en uno de los campos candidatos
+                parte = sel[i::len(candidatos)]
+                if len(parte):
+                    previo = registros[campo["name"]][parte]
+                    nuevo  = pools[campo["name"]][rng.integers(0, TAM_POOL, size=len(parte))]
+                    # Se garantiza que el valor cambie
+                    iguales = nuevo == previo
+                    nuevo[iguales] = pools[campo["name"]][(np.flatnonzero(iguales) + 1) % TAM_POOL]
+                    registros[campo["name"]][parte] = nuevo
+        if n_borrados:
+            registros["_flag"][np.sort(filas[n_cambios : n_cambios + n_borrados])] = b"*"
+        registros.flush()
+        del registros
+
+    if n_altas:
+        pools = _pools(campos, claves, semilla)
+        with open(ruta, "r+b") as f:
+            f.seek(header_len + total * dtype.itemsize)
+            for inicio in range(total, total + n_altas, REGISTROS_BLOQUE):
+                n = min(REGISTROS_BLOQUE, total + n_altas - inicio)
+                f.write(_bloque(campos, claves, pools, dtype, inicio, n, semilla + 2).tobytes())
+            f.write(b"\x1a")
+            f.truncate()
+            f.seek(4)
+            f.write(struct.pack("<I", total + n_altas))
+
+    return {"cambios": n_cambios if candidatos else 0, "altas": n_altas, "borrados": n_borrados}
@@ -0,0 +1,209 @@
+# etl/async_loader.py
+#
+# Upsert con asyncio (aiomysql, dependencia opcional): mantiene hasta N
+# chunks en vuelo sobre conexiones distintas, de modo que el rendimiento en
+# un enlace de alta latencia escala con la concurrencia y no con 1/RTT.
+# Se activa con "ASYNC_UPSERT": N (N > 1) en config.json o en la entrada.
+
+import math
+import asyncio
+import logging
+import threading
+from typing import Callable, List, Optional
+
+import pandas as pd
+from sqlalchemy import Table
+from sqlalchemy.engine import make_url
+
+from etl import telemetria
+from etl.loader import sql_upsert, filas_como_tuplas
+
+try:
+    import aiomysql
+except ImportError:  # pragma: no cover - depende del entorno
+    aiomysql = None
+
+# Chunks simultáneos por defecto
+CONCURRENCIA = 4
+# Reintentos por chunk ante errores de conexión/bloqueo
+REINTENTOS = 3
+_ESPERA_BASE = 0.5
+
+
+def disponible() -> bool:
+    return aiomysql is not None
+
+
+def _reintentable(error: Exception) -> bool:
+    """Errores transitorios: conexión perdida, deadlock, lock wait timeout."""
+    if aiomysql is None:
+        return False
+    if isinstance(error, (aiomysql.ProgrammingError, aiomysql.IntegrityError, aiomysql.DataError)):
+        return False
+    return isinstance(error, (aiomysql.OperationalError, aiomysql.InternalError, ConnectionError))
+
+
+class _Avance:
+    """Reporta progreso en orden: solo avanza cuando los chunks previos terminaron."""
+
+    def __init__(self, tamanos: List[int], on_chunk: Optional[Callable[[int], None]]):
+        self.tamanos  = tamanos
+        self.on_chunk = on_chunk
+        self.hechos   = [False] * len(tamanos)
+        self.sig      = 0
+        self.filas    = 0
+
+    def marcar(self, i: int):
+        self.hechos[i] = True
+        avanzo = False
+        while self.sig < len(self.hechos) and self.hechos[self.sig]:
+            self.filas += self.tamanos[self.sig]
+            self.sig   += 1
+            avanzo = True
+        if avanzo and self.on_chunk:
+            self.on_chunk(self.filas)
+
+
+class CargadorAsync:
+    """
+    Misma interfaz que loader.CargadorMasivo (upsert / cerrar). El event loop
+    y el pool de aiomysql viven en un hilo propio y se reutilizan entre lotes.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        tbl: Table,
+        key_cols: List[str],
+        filas_por_chunk: int = 10000,
+        concurrencia: int = CONCURRENCIA,
+        reintentos: int = REINTENTOS
+    ):
+        if aiomysql is None:
+            raise RuntimeError("ASYNC_UPSERT requiere el paquete 'aiomysql' (pip install aiomysql)")
+        self.url          = make_url(uri)
+        self.tbl          = tbl
+        self.key_cols     = key_cols
+        self.filas_por_chunk = max(1, filas_por_chunk)
+        self.concurrencia = max(1, concurrencia)
+        self.reintentos   = reintentos
+        self._pool = None
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="etl-async", daemon=True)
+        self._hilo.start()
+
+    def _correr(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _abrir_pool(self):
+        if self._pool is None:
+            self._pool = await aiomysql.create_pool(
+                host=self.url.host,
+                port=self.url.port or 3306,
+                user=self.url.username,
+                password=self.url.password or "",
+                db=self.url.database,
+                charset="utf8mb4",
+                autocommit=False,
+                minsize=self.concurrencia,
+                maxsize=self.concurrencia
+            )
+        return self._pool
+
+    async def _chunk(
+        self, pool, sql: str, filas: List[tuple], i: int, avance: _Avance, sem: asyncio.Semaphore, tele=None
+    ):
+        async with sem:
+            for intento in range(self.reintentos + 1):
+                try:
+                    async with pool.acquire() as conn:
+                        try:
+                            async with conn.cursor() as cur:
+                                await cur.executemany(sql, filas)
+                            await conn.commit()
+                        except BaseException:
+                            await conn.rollback()
+                            raise
+                    if tele:
+                        tele.contar("round_trips", 2)
+                    break
+                except Exception as e:
+                    if intento >= self.reintentos or not _reintentable(e):
+                        raise
+                    if tele:
+                        tele.contar("reintentos")
+                    espera = _ESPERA_BASE * 2 ** intento
+                    logging.warning(
+                        f"Chunk {i} de {self.tbl.name} falló ({e}); reintento {intento + 1} en {espera:.1f}s"
+                    )
+                    await asyncio.sleep(espera)
+        avance.marcar(i)
+
+    async def _upsert(self, sql: str, filas: List[tuple], on_chunk, tele=None) -> int:
+        pool   = await self._abrir_pool()
+        # Se reparte entre las conexiones aunque el lote no llegue a N chunks completos
+        tamano = min(self.filas_por_chunk, math.ceil(len(filas) / self.concurrencia))
+        chunks = [filas[i : i + tamano] for i in range(0, len(filas), tamano)]
+        avance = _Avance([len(c) for c in chunks], on_chunk)
+        sem    = asyncio.Semaphore(self.concurrencia)
+        tareas = [asyncio.ensure_future(self._chunk(pool, sql, c, i, avance, sem, tele)) for i, c in enumerate(chunks)]
+        try:
+            await asyncio.gather(*tareas)
+        except BaseException:
+            for t in tareas:
+                t.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            raise
+        return len(filas)
+
+    def upsert(self, df: pd.DataFrame, on_chunk: Callable[[int], None] = None) -> int:
+        """Inserta/actualiza `df` con hasta `concurrencia` chunks en vuelo."""
+        if df.empty:
+            return 0
+        columnas = [c.name for c in self.tbl.columns if c.name in df.columns]
+        sql      = sql_upsert(self.tbl.name, columnas, self.key_cols)
+        # El event loop corre en otro hilo: la telemetría del llamador se pasa explícita
+        return self._correr(
+            self._upsert(sql, filas_como_tuplas(df, columnas), on_chunk, telemetria.actual())
+        )
+
+    def filas_por_envio(self) -> int:
+        """
+        Filas que conviene juntar antes de cada upsert (etl.lotes.Acumulador):
+        un chunk por conexión, para tener `concurrencia` chunks en vuelo.
+        """
+        return self.filas_por_chunk * self.concurrencia
+
+    async def _cerrar_pool(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    def cerrar(self):
+        """Cierra el pool y detiene el event loop."""
+        if self._loop.is_closed():
+            return
+        try:
+            self._correr(self._cerrar_pool())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._hilo.join(timeout=5)
+            self._loop.close()
+
+
+def crear_cargador_async(
+    engine,
+    tbl: Table,
+    key_cols: List[str],
+    filas_por_chunk: int,
+    concurrencia: int
+) -> Optional[CargadorAsync]:
+    """CargadorAsync si aplica (MySQL, concurrencia > 1 y aiomysql instalado)."""
+    if not concurrencia or concurrencia <= 1 or engine.dialect.name != "mysql":
+        return None
+    if aiomysql is None:
+        logging.warning("ASYNC_UPSERT configurado pero 'aiomysql' no está instalado; se usa el upsert síncrono")
+        return None
+    uri = engine.url.render_as_string(hide_password=False)
+    return CargadorAsync(uri, tbl, key_cols, filas_por_chunk, concurrencia)
@@ -0,0 +1,116 @@
+# etl/borrados.py
+#
+# Propagación de borrados (DELETE_MODE por entrada o global):
+# - "NONE" (por defecto): solo se reportan en el log.
+# - "DELETE": DELETE ... WHERE (k1, k2) IN (...) por lotes.
+# - "SOFT": marca la columna SOFT_DELETE_COLUMN (1) y limpia row_hash, de modo
+#   que si la llave reaparece en el DBF el diff la trate como cambiada.
+#
+# Con lectura completa las llaves a borrar salen del anti-join destino vs.
+# origen (etl.diff.ClavesVistas.faltantes). En lecturas parciales (APPEND/BLOCKS)
+# solo se usan los registros marcados como borrados ('*') en los rangos leídos.
+# En SOFT las filas ya marcadas en corridas previas se excluyen del destino
+# (descartar_marcadas): no se vuelven a marcar ni cuentan para el umbral.
+
+import logging
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Table, select, tuple_, update
+
+from etl.diff import ClavesVistas, construir_clave, separar_clave
+
+MODOS_BORRADO = ("NONE", "DELETE", "SOFT")
+COLUMNA_SOFT  = "is_deleted"
+# Fracción máxima del destino que se puede borrar en una ejecución
+MAX_PROPORCION = 0.10
+# Llaves por sentencia DELETE/UPDATE
+LLAVES_POR_SENTENCIA = 1000
+
+
+class BorradoSospechoso(Exception):
+    """Se iban a borrar más filas de las permitidas por MAX_DELETE_RATIO."""
+
+
+def claves_a_borrar(
+    destino: pd.DataFrame,
+    vistos: ClavesVistas,
+    marcadas: set,
+    completa: bool
+) -> np.ndarray:
+    """
+    Llaves de destino que ya no existen en el DBF. Con lectura completa es el
+    anti-join; si no, las marcadas como borradas que no se vieron activas.
+    """
+    if completa:
+        return vistos.faltantes(destino)
+    candidatas = np.array(list(marcadas), dtype=object)
+    candidatas = candidatas[~vistos.contiene(candidatas)]
+    existentes = destino.index.isin(candidatas)
+    return destino.index[existentes].to_numpy(dtype=object)
+
+
+def claves_marcadas(engine, tbl: Table, key_cols: List[str], columna_soft: str = COLUMNA_SOFT) -> np.ndarray:
+    """Llaves (normalizadas) que un DELETE_MODE = "SOFT" anterior ya marcó."""
+    if columna_soft not in tbl.c:
+        return np.array([], dtype=object)
+    stmt = select(*[tbl.c[k] for k in key_cols]).where(tbl.c[columna_soft] == 1)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    return construir_clave(pd.DataFrame.from_records(rows, columns=key_cols), key_cols)
+
+
+def descartar_marcadas(destino: pd.DataFrame, marcadas_soft: np.ndarray) -> pd.DataFrame:
+    """Destino (indexado por CLAVE) sin las filas ya marcadas como borradas."""
+    if len(marcadas_soft) == 0:
+        return destino
+    return destino.loc[~destino.index.isin(marcadas_soft)]
+
+
+def verificar_umbral(n_borrar: int, n_destino: int, proporcion: float = MAX_PROPORCION):
+    """Lanza BorradoSospechoso si n_borrar supera `proporcion` del destino."""
+    if n_destino and n_borrar > proporcion * n_destino:
+        raise BorradoSospechoso(
+            f"{n_borrar} de {n_destino} filas ({n_borrar / n_destino:.1%}) superan el "
+            f"umbral de borrado ({proporcion:.0%}); revise el DBF o ajuste MAX_DELETE_RATIO"
+        )
+
+
+def aplicar_borrados(
+    engine,
+    tbl: Table,
+    claves: np.ndarray,
+    key_cols: List[str],
+    hash_field: str,
+    modo: str = "DELETE",
+    columna_soft: str = COLUMNA_SOFT,
+    por_sentencia: int = LLAVES_POR_SENTENCIA
+) -> int:
+    """Borra (o marca) en lotes las filas de `claves`; devuelve filas afectadas."""
+    if len(claves) == 0:
+        return 0
+    valores = separar_clave(claves, key_cols)
+    if len(key_cols) == 1:
+        filas = valores[key_cols[0]].tolist()
+        condicion = lambda parte: tbl.c[key_cols[0]].in_(parte)
+    else:
+        filas = list(valores.itertuples(index=False, name=None))
+        columnas = tuple_(*[tbl.c[k] for k in key_cols])
+        condicion = lambda parte: columnas.in_(parte)
+
+    if modo == "SOFT":
+        if columna_soft not in tbl.c:
+            raise ValueError(f"DELETE_MODE=SOFT requiere la columna {columna_soft!r} en {tbl.name}")
+        base = lambda parte: (
+            update(tbl).where(condicion(parte)).values({columna_soft: 1, hash_field: None})
+        )
+    else:
+        base = lambda parte: tbl.delete().where(condicion(parte))
+
+    afectadas = 0
+    for i in range(0, len(filas), por_sentencia):
+        with engine.begin() as conn:
+            afectadas += conn.execute(base(filas[i : i + por_sentencia])).rowcount
+    logging.info(f"{afectadas} filas {'marcadas como borradas' if modo == 'SOFT' else 'borradas'} en {tbl.name}")
+    return afectadas
@@ -1,34 +1,80 @@
 # etl/control.py
+#
+# Estado de sincronización por entrada. Desde la migración a etl/state.py
+# (SQLite) el antiguo config/sync_control.json solo se lee una vez para
+# importarlo; después se renombra a sync_control.json.migrado.
 
 import json
 import os
+import logging
+import threading
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import datetime
 
+from etl import db, state
+
 CONTROL_FILE = "config/sync_control.json"
 
+_LOCK    = threading.Lock()
+_MIGRADO = False
+
+def _migrar_json():
+    """Importa (una vez por proceso) el sync_control.json heredado, si existe."""
+    global _MIGRADO
+    if _MIGRADO:
+        return
+    with _LOCK:
+        if _MIGRADO:
+            return
+        if os.path.exists(CONTROL_FILE):
+            try:
+                with open(CONTROL_FILE, "r", encoding="utf-8") as f:
+                    state.importar(json.load(f))
+                os.replace(CONTROL_FILE, f"{CONTROL_FILE}.migrado")
+                logging.info(f"{CONTROL_FILE} migrado a {state.STATE_FILE}")
+            except FileNotFoundError:
+                # Otro proceso lo migró al mismo tiempo
+                pass
+        _MIGRADO = True
+
 def cargar_control():
-    if not os.path.exists(CONTROL_FILE):
-        return {}
-    with open(CONTROL_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Estado completo {entry: {campo: valor}} (compatibilidad)."""
+    _migrar_json()
+    return state.leer_todo()
 
 def guardar_control(data):
-    with open(CONTROL_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    """Escribe un estado completo {entry: {campo: valor}} (compatibilidad)."""
+    _migrar_json()
+    for nombre_dbf, campos in data.items():
+        campos = dict(campos)
+        registros = campos.pop("registros", None)
+        state.escribir(nombre_dbf, campos)
+        if registros is not None:
+            state.reemplazar_hashes(nombre_dbf, registros)
+
+def _obtener_campo(nombre_dbf, campo, default=None):
+    _migrar_json()
+    return state.leer(nombre_dbf, campo, default)
+
+def _actualizar_campo(nombre_dbf, campo, valor):
+    actualizar_estado(nombre_dbf, **{campo: valor})
+
+def actualizar_estado(nombre_dbf, **campos):
+    """Actualiza varios campos de la entrada de forma atómica."""
+    _migrar_json()
+    state.escribir(nombre_dbf, campos)
 
 def obtener_ultima_fecha(nombre_dbf):
-    control = cargar_control()
-    return control.get(nombre_dbf, {}).get("ultima_fecha", None)
+    return _obtener_campo(nombre_dbf, "ultima_fecha")
+
 
-    
 def obtener_ultima_fecha_db(nombre_dbf: str, mysql_uri: str) -> datetime | None:
     """
     Devuelve la última fecha de sincronización registrada en tbl_sync_log
     para el DBF indicado, o None si no hay registros.
     """
-    engine = create_engine(mysql_uri, connect_args={"charset": "utf8mb4"})
+    engine = db.obtener_engine(mysql_uri)
     sql = text("""
         SELECT MAX(sync_time) AS ultima_fecha
           FROM tbl_sync_log
@@ -39,19 +85,30 @@ def obtener_ultima_fecha_db(nombre_dbf: str, mysql_uri: str) -> datetime | None:
     return result  # será un objeto datetime o None
 
 def actualizar_fecha(nombre_dbf, nueva_fecha):
-    control = cargar_control()
-    if nombre_dbf not in control:
-        control[nombre_dbf] = {}
-    control[nombre_dbf]["ultima_fecha"] = nueva_fecha
-    guardar_control(control)
+    _actualizar_campo(nombre_dbf, "ultima_fecha", nueva_fecha)
 
 def obtener_hashes(nombre_dbf):
-    control = cargar_control()
-    return control.get(nombre_dbf, {}).get("registros", {})
+    _migrar_json()
+    return state.leer_hashes(nombre_dbf)
 
 def actualizar_hashes(nombre_dbf, nuevos_hashes: dict):
-    control = cargar_control()
-    if nombre_dbf not in control:
-        control[nombre_dbf] = {}
-    control[nombre_dbf]["registros"] = nuevos_hashes
-    guardar_control(control)
+    _migrar_json()
+    state.reemplazar_hashes(nombre_dbf, nuevos_hashes)
+
+def obtener_huella(nombre_dbf):
+    return _obtener_campo(nombre_dbf, "huella")
+
+def actualizar_huella(nombre_dbf, huella: dict):
+    _actualizar_campo(nombre_dbf, "huella", huella)
+
+def obtener_cola(nombre_dbf):
+    return _obtener_campo(nombre_dbf, "cola")
+
+def actualizar_cola(nombre_dbf, cola: dict):
+    _actualizar_campo(nombre_dbf, "cola", cola)
+
+def obtener_bloques(nombre_dbf):
+    return _obtener_campo(nombre_dbf, "bloques")
+
+def actualizar_bloques(nombre_dbf, bloques: dict):
+    _actualizar_campo(nombre_dbf, "bloques", bloques)
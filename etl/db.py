@@ -0,0 +1,135 @@
+# etl/db.py
+#
+# Registro de engines de SQLAlchemy por URI para todo el proceso. Cada módulo
+# (etl_core, control, GUI, loader) pide su engine aquí, de modo que las
+# conexiones TCP/TLS/auth hacia MySQL se abren una vez y se reutilizan.
+
+import os
+import logging
+import threading
+from typing import Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
+
+from etl import telemetria
+
+# Parámetros del pool (sobreescribibles con POOL_SIZE, POOL_MAX_OVERFLOW,
+# POOL_RECYCLE y POOL_TIMEOUT en config.json)
+POOL_SIZE         = 5
+POOL_MAX_OVERFLOW = 10
+# Segundos tras los cuales una conexión se recicla (antes del wait_timeout de MySQL)
+POOL_RECYCLE      = 1800
+POOL_TIMEOUT      = 30
+
+_ENGINES = {}
+_STATS   = {}
+_LOCK    = threading.Lock()
+
+
+def _llave(url: URL, extra: dict) -> tuple:
+    return (url.render_as_string(hide_password=False), tuple(sorted(extra.items())))
+
+
+def _instrumentar(engine: Engine, stats: dict):
+    """Cuenta conexiones físicas nuevas frente a préstamos del pool."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        stats["conexiones"] += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        stats["prestamos"] += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        stats["invalidadas"] += 1
+
+    # Round-trips de la corrida activa en este hilo (etl.telemetria)
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        telemetria.contar("round_trips")
+
+    @event.listens_for(engine, "commit")
+    def _on_commit(conn):
+        telemetria.contar("round_trips")
+
+
+def obtener_engine(
+    uri: Union[str, URL],
+    cfg: Optional[dict] = None,
+    **connect_args
+) -> Engine:
+    """
+    Engine compartido para `uri` (y `connect_args` extra, p. ej.
+    local_infile). Se crea en la primera llamada con pre-ping y reciclado;
+    `cfg` (config.json) puede ajustar el tamaño del pool.
+    """
+    url = make_url(uri)
+    key = _llave(url, connect_args)
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is not None:
+            return engine
+
+        cfg    = cfg or {}
+        kwargs = {"pool_pre_ping": True}
+        args   = dict(connect_args)
+        if url.get_backend_name() == "mysql":
+            args.setdefault("charset", "utf8mb4")
+            kwargs.update(
+                pool_size=cfg.get("POOL_SIZE", POOL_SIZE),
+                max_overflow=cfg.get("POOL_MAX_OVERFLOW", POOL_MAX_OVERFLOW),
+                pool_recycle=cfg.get("POOL_RECYCLE", POOL_RECYCLE),
+                pool_timeout=cfg.get("POOL_TIMEOUT", POOL_TIMEOUT)
+            )
+        if args:
+            kwargs["connect_args"] = args
+
+        engine = create_engine(url, **kwargs)
+        stats  = {"conexiones": 0, "prestamos": 0, "invalidadas": 0}
+        _instrumentar(engine, stats)
+        _ENGINES[key] = engine
+        _STATS[key]   = stats
+        return engine
+
+
+def estadisticas() -> list:
+    """Estado de cada engine registrado (URI sin contraseña)."""
+    with _LOCK:
+        salida = []
+        for key, engine in _ENGINES.items():
+            stats = _STATS[key]
+            salida.append({
+                "uri":          repr(engine.url),
+                "motor":        engine.url.get_backend_name(),
+                "base":         os.path.basename(engine.url.database or ""),
+                "conexiones":   stats["conexiones"],
+                "prestamos":    stats["prestamos"],
+                "reutilizadas": max(0, stats["prestamos"] - stats["conexiones"]),
+                "invalidadas":  stats["invalidadas"],
+                "en_uso":       engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else None,
+                "tamano":       engine.pool.size() if hasattr(engine.pool, "size") else None,
+                "pool":         engine.pool.status()
+            })
+        return salida
+
+
+def registrar_estadisticas(nivel: int = logging.INFO):
+    """Escribe en el log la reutilización de conexiones de cada engine."""
+    for s in estadisticas():
+        logging.log(
+            nivel,
+            f"Pool {s['uri']}: {s['prestamos']} préstamos, {s['conexiones']} conexiones nuevas, "
+            f"{s['reutilizadas']} reutilizadas, {s['invalidadas']} invalidadas | {s['pool']}"
+        )
+
+
+def cerrar_todos():
+    """Cierra los pools (p. ej. al salir del daemon o de la GUI)."""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+        _STATS.clear()
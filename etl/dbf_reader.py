@@ -0,0 +1,452 @@
+# etl/dbf_reader.py
+
+import os
+import struct
+import datetime
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from dbfread import DBF
+from dbfread.codepages import guess_encoding
+from dbfread.field_parser import FieldParser
+
+# Tipos que se decodifican en bloque con NumPy. Los memo (M/G/P), moneda (Y)
+# y el resto se dejan a dbfread.
+TIPOS_SOPORTADOS = set("CNFDLITO")
+
+# Tipos cuyo valor vive en el archivo memo (.FPT/.DBT)
+TIPOS_MEMO = set("MGPB")
+
+# Columna booleana que marca registros borrados ('*') cuando se piden
+BORRADO = "_borrado"
+
+# Diferencia entre día juliano (formato FoxPro) y ordinal gregoriano
+_OFFSET_JULIANO = 1721425
+_EPOCH_JULIANO  = datetime.date(1970, 1, 1).toordinal() + _OFFSET_JULIANO
+# Días julianos válidos para T (0001-01-01 a 9999-12-31); un campo en blanco
+# (espacios = 0x20202020) o en ceros queda fuera y se decodifica como NaT
+_DIA_MINIMO = datetime.date.min.toordinal() + _OFFSET_JULIANO
+_DIA_MAXIMO = datetime.date.max.toordinal() + _OFFSET_JULIANO
+
+# Dígitos que float64 representa sin pérdida: N(x,0) más anchos con vacíos
+# se entregan como enteros Python
+_DIGITOS_FLOAT = 15
+
+_LOGICOS = np.full(256, None, dtype=object)
+for _c in b"TtYy":
+    _LOGICOS[_c] = True
+for _c in b"FfNn":
+    _LOGICOS[_c] = False
+
+
+def leer_encabezado(dbf_path: str) -> dict:
+    """
+    Lee el encabezado y los descriptores de campo del DBF:
+    {
+      "version", "fecha", "registros", "header_len", "record_len",
+      "encoding", "campos": [{"name", "type", "length", "decimal_count", "offset"}, ...]
+    }
+    """
+    with open(dbf_path, "rb") as f:
+        head = f.read(32)
+        if len(head) < 32:
+            raise ValueError(f"Encabezado DBF incompleto: {dbf_path}")
+        version, yy, mm, dd, registros, header_len, record_len = struct.unpack("<BBBBIHH", head[:12])
+        try:
+            encoding = guess_encoding(head[29])
+        except LookupError:
+            encoding = "ascii"
+
+        campos = []
+        offset = 1  # byte 0 de cada registro = marca de borrado
+        while True:
+            sep = f.read(1)
+            if sep in (b"\r", b"\n", b""):
+                break
+            raw = sep + f.read(31)
+            name  = raw[:11].split(b"\0")[0].decode(encoding, errors="ignore")
+            tipo  = chr(raw[11])
+            length, decimal_count = raw[16], raw[17]
+            # Campos C de más de 255 bytes guardan el byte alto en decimal_count
+            if tipo == "C":
+                length |= decimal_count << 8
+                decimal_count = 0
+            campos.append({
+                "name":          name,
+                "type":          tipo,
+                "length":        length,
+                "decimal_count": decimal_count,
+                "offset":        offset
+            })
+            offset += length
+
+    try:
+        # Mismo criterio que dbfread: años < 80 se asumen 20xx
+        fecha = datetime.date(2000 + yy if yy < 80 else 1900 + yy, mm, dd)
+    except ValueError:
+        fecha = None
+
+    return {
+        "version":    version,
+        "fecha":      fecha,
+        "registros":  registros,
+        "header_len": header_len,
+        "record_len": record_len,
+        "encoding":   encoding,
+        "campos":     campos
+    }
+
+
+def huella_archivo(dbf_path: str) -> dict:
+    """
+    Huella barata del archivo: conteo y fecha de última actualización del
+    encabezado, más tamaño y mtime del DBF (y de su memo, si existe).
+    """
+    encabezado = leer_encabezado(dbf_path)
+    st = os.stat(dbf_path)
+    huella = {
+        "registros":  encabezado["registros"],
+        "fecha":      encabezado["fecha"].isoformat() if encabezado["fecha"] else None,
+        "size":       st.st_size,
+        "mtime_ns":   st.st_mtime_ns
+    }
+    base = os.path.splitext(dbf_path)[0]
+    for ext in (".FPT", ".fpt", ".DBT", ".dbt"):
+        if os.path.exists(base + ext):
+            st_memo = os.stat(base + ext)
+            huella["memo"] = [st_memo.st_size, st_memo.st_mtime_ns]
+            break
+    return huella
+
+
+def soporta_columnas(encabezado: dict, columns: List[str]) -> bool:
+    """True si todas las columnas pedidas pueden decodificarse con NumPy."""
+    tipos = {c["name"]: c["type"] for c in encabezado["campos"]}
+    return all(tipos.get(c) in TIPOS_SOPORTADOS for c in columns)
+
+
+class _ParserProyectado(FieldParser):
+    """FieldParser que solo decodifica los campos proyectados; el resto queda en None."""
+
+    proyectados = frozenset()
+
+    def parse(self, field, data):
+        if field.name not in self.proyectados:
+            return None
+        return FieldParser.parse(self, field, data)
+
+
+def abrir_dbfread(dbf_path: str, columns: List[str] = None, **kwargs) -> DBF:
+    """
+    Abre el DBF con dbfread decodificando solo `columns` (nombres reales;
+    todas si no se indican). Los demás campos no se decodifican ni consultan
+    el memo, y el archivo memo no se abre si ninguna columna proyectada es
+    de tipo memo. Cada registro se entrega como lista en el orden de `columns`.
+    """
+    parser = type("ParserProyectado", (_ParserProyectado,), {})
+    table  = DBF(dbf_path, load=False, parserclass=parser, **kwargs)
+    columns = list(columns) if columns else list(table.field_names)
+    parser.proyectados = frozenset(columns)
+    if not any(f.type in TIPOS_MEMO for f in table.fields if f.name in parser.proyectados):
+        table.memofilename = None
+    idx = [table.field_names.index(c) for c in columns]
+    # recfactory recibe [(nombre, valor), ...]; conservamos solo lo proyectado
+    table.recfactory = lambda items: [items[i][1] for i in idx]
+    return table
+
+
+def iter_dbfread_rango(
+    dbf_path: str,
+    columns: List[str] = None,
+    start: int = 0,
+    stop: int = None,
+    incluir_borrados: bool = False,
+    **kwargs
+) -> Iterator[Tuple[list, bool]]:
+    """
+    Registros físicos [start, stop) con dbfread, para columnas que el lector
+    NumPy no decodifica (memo...). Salta directo al primer registro y entrega
+    (valores en el orden de `columns`, borrado) en orden físico; los
+    borrados ('*') solo con `incluir_borrados`.
+    """
+    table   = abrir_dbfread(dbf_path, columns, **kwargs)
+    largo   = table.header.recordlen
+    # _iter_records de dbfread siempre empieza en el primer registro; se
+    # reutilizan su parser y su archivo memo (o el falso, si no hay memo)
+    with open(dbf_path, "rb") as infile, table._open_memofile() as memofile:
+        parse = table.parserclass(table, memofile).parse
+        infile.seek(table.header.headerlen + max(0, start) * largo)
+        n = max(0, start)
+        while stop is None or n < stop:
+            registro = infile.read(largo)
+            if len(registro) < largo or registro[:1] == b"\x1a":
+                break
+            n += 1
+            flag = registro[:1]
+            if flag != b" " and not (incluir_borrados and flag == b"*"):
+                continue
+            items, pos = [], 1
+            for field in table.fields:
+                items.append((field.name, parse(field, registro[pos : pos + field.length])))
+                pos += field.length
+            yield table.recfactory(items), flag == b"*"
+
+
+def registros_fisicos(dbf_path: str, encabezado: dict) -> int:
+    """Registros presentes en disco (el encabezado puede declarar más)."""
+    disponibles = (os.path.getsize(dbf_path) - encabezado["header_len"]) // encabezado["record_len"]
+    return max(0, min(encabezado["registros"], disponibles))
+
+
+def leer_registros_crudos(dbf_path: str, encabezado: dict, inicio: int, fin: int) -> bytes:
+    """Bytes crudos de los registros físicos [inicio, fin)."""
+    inicio = max(0, inicio)
+    if fin <= inicio:
+        return b""
+    with open(dbf_path, "rb") as f:
+        f.seek(encabezado["header_len"] + inicio * encabezado["record_len"])
+        return f.read((fin - inicio) * encabezado["record_len"])
+
+
+def abrir_registros(dbf_path: str, encabezado: dict, columns: List[str]) -> np.ndarray:
+    """
+    Mapea en memoria el área de registros como arreglo estructurado.
+    Solo las columnas pedidas (más la marca de borrado) forman parte del dtype.
+    """
+    campos = {c["name"]: c for c in encabezado["campos"]}
+    names, formats, offsets = ["_flag"], ["S1"], [0]
+    for col in columns:
+        c = campos[col]
+        names.append(col)
+        formats.append(f"V{c['length']}")
+        offsets.append(c["offset"])
+    dtype = np.dtype({
+        "names":    names,
+        "formats":  formats,
+        "offsets":  offsets,
+        "itemsize": encabezado["record_len"]
+    })
+
+    n = registros_fisicos(dbf_path, encabezado)
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(dbf_path, dtype=dtype, mode="r", offset=encabezado["header_len"], shape=(n,))
+
+
+def _como_bytes(raw: np.ndarray, length: int) -> np.ndarray:
+    """Copia un campo crudo (void) a un arreglo de bytes S<length>."""
+    return np.ascontiguousarray(raw).view(f"S{length}")
+
+
+def _decodificar_C(raw, campo, encoding):
+    length = campo["length"]
+    buffer = np.ascontiguousarray(raw).tobytes()
+    try:
+        # Codificaciones de un byte: se decodifica todo el bloque de una vez
+        texto = buffer.decode(encoding)
+    except UnicodeDecodeError:
+        texto = None
+    if texto is not None and len(texto) == len(buffer):
+        data = np.frombuffer(texto.encode("utf-32-le"), dtype=f"<U{length}")
+        return np.char.rstrip(data, " \0").astype(object)
+
+    data = np.char.rstrip(_como_bytes(raw, length), b" \0")
+    return np.char.decode(data, encoding, errors="ignore").astype(object)
+
+
+def _decodificar_N(raw, campo, encoding):
+    data = np.char.strip(np.char.strip(_como_bytes(raw, campo["length"])), b"*")
+    data = np.char.replace(data, b",", b".")
+    vacios = data == b""
+    enteros_n = campo["decimal_count"] == 0 and campo["type"] == "N"
+    if enteros_n and not vacios.any():
+        # Directo a int64: pasar por float64 redondea los enteros mayores a 2^53
+        try:
+            return data.astype(np.int64)
+        except (ValueError, OverflowError):
+            pass
+    if enteros_n and campo["length"] > _DIGITOS_FLOAT:
+        # Con vacíos: enteros exactos (int) y NaN, en una columna object
+        try:
+            return np.array([int(v) if v else np.nan for v in data.tolist()], dtype=object)
+        except ValueError:
+            pass
+    valores = np.where(vacios, b"nan", data).astype(np.float64)
+    if enteros_n and not vacios.any():
+        enteros = valores.astype(np.int64)
+        if (enteros == valores).all():
+            return enteros
+    return valores
+
+
+def _decodificar_D(raw, campo, encoding):
+    # Aritmética datetime64[D] (como en T): cubre 0001-9999 sin el límite de
+    # nanosegundos de pd.to_datetime (p. ej. fechas comodín 2999-12-31)
+    data    = _como_bytes(raw, 8)
+    digitos = np.char.isdigit(data) & (np.char.str_len(data) == 8)
+    numeros = np.where(digitos, data, b"19700101").astype(np.int64)
+    anio, mes, dia = numeros // 10000, numeros // 100 % 100, numeros % 100
+    validas = digitos & (anio >= 1) & (mes >= 1) & (mes <= 12) & (dia >= 1)
+    anio, mes, dia = np.where(validas, anio, 1970), np.where(validas, mes, 1), np.where(validas, dia, 1)
+    meses  = ((anio - 1970) * 12 + mes - 1).astype("datetime64[M]")
+    fechas = meses.astype("datetime64[D]") + (dia - 1).astype("timedelta64[D]")
+    # Un día fuera del mes (20240231) cae en el mes siguiente
+    validas &= fechas.astype("datetime64[M]") == meses
+    out = fechas.astype(object)
+    out[~validas] = None
+    return out
+
+
+def _decodificar_L(raw, campo, encoding):
+    return _LOGICOS[np.ascontiguousarray(raw).view(np.uint8)]
+
+
+def _decodificar_I(raw, campo, encoding):
+    return np.ascontiguousarray(raw).view("<i4").astype(np.int64)
+
+
+def _decodificar_O(raw, campo, encoding):
+    return np.ascontiguousarray(raw).view("<f8").copy()
+
+
+def _decodificar_T(raw, campo, encoding):
+    partes = np.ascontiguousarray(raw).view("<u4").reshape(-1, 2).astype(np.int64)
+    dias, msec = partes[:, 0], partes[:, 1]
+    valores = ((dias - _EPOCH_JULIANO) * 86_400_000 + msec).astype("datetime64[ms]")
+    valores[(dias < _DIA_MINIMO) | (dias > _DIA_MAXIMO)] = np.datetime64("NaT")
+    return valores.astype("datetime64[us]")
+
+
+_DECODIFICADORES = {
+    "C": _decodificar_C,
+    "N": _decodificar_N,
+    "F": _decodificar_N,
+    "D": _decodificar_D,
+    "L": _decodificar_L,
+    "I": _decodificar_I,
+    "O": _decodificar_O,
+    "T": _decodificar_T,
+}
+
+
+# Tipos de fecha sobre los que se puede filtrar sin decodificar el registro
+TIPOS_FECHA = set("DT")
+
+
+def llaves_fecha(raw: np.ndarray, campo: dict) -> np.ndarray:
+    """
+    Valores comparables de un campo de fecha sin decodificarlo: bytes
+    'YYYYMMDD' (tipo D) o día juliano (tipo T).
+    """
+    if campo["type"] == "D":
+        return _como_bytes(raw, campo["length"])
+    return np.ascontiguousarray(raw).view("<u4").reshape(-1, 2)[:, 0].astype(np.int64)
+
+
+def limites_fecha(campo: dict, desde: datetime.date, hasta: datetime.date) -> tuple:
+    """Límites [desde, hasta] en la misma representación que llaves_fecha."""
+    if campo["type"] == "D":
+        return desde.strftime("%Y%m%d").encode(), hasta.strftime("%Y%m%d").encode()
+    return desde.toordinal() + _OFFSET_JULIANO, hasta.toordinal() + _OFFSET_JULIANO
+
+
+def fechas_validas(llaves: np.ndarray, campo: dict) -> np.ndarray:
+    """Máscara de llaves que no son fecha vacía (espacios/ceros)."""
+    if campo["type"] == "D":
+        return (llaves >= b"00000101") & (llaves <= b"99991231")
+    return (llaves >= _DIA_MINIMO) & (llaves <= _DIA_MAXIMO)
+
+
+def decodificar_registros(registros: np.ndarray, encabezado: dict, columns: List[str]) -> pd.DataFrame:
+    """
+    Decodifica columna por columna (operaciones vectorizadas) un bloque de
+    registros ya filtrado. Los valores coinciden con los de dbfread.
+    """
+    campos = {c["name"]: c for c in encabezado["campos"]}
+    data = {}
+    for col in columns:
+        campo = campos[col]
+        data[col] = _DECODIFICADORES[campo["type"]](registros[col], campo, encabezado["encoding"])
+    return pd.DataFrame(data, columns=columns).infer_objects()
+
+
+def alinear_tipos(df: pd.DataFrame, encabezado: dict) -> pd.DataFrame:
+    """
+    Lleva un lote de dbfread a los dtypes del lector NumPy: los vacíos de
+    N/F/T llegan como None y, según caiga el lote (todo vacío o mixto),
+    pandas los deja en object o en float/datetime. El hash vería "" o "nan"
+    para la misma fila; aquí quedan siempre como NaN/NaT.
+    """
+    for campo in encabezado["campos"]:
+        col = campo["name"]
+        if col not in df.columns or df[col].dtype != object or campo["type"] not in "NFT":
+            continue
+        vacios = df[col].isna()
+        if not vacios.any():
+            continue
+        if campo["type"] == "T":
+            df[col] = df[col].astype("datetime64[ms]")
+        elif campo["type"] == "N" and campo["decimal_count"] == 0 and campo["length"] > _DIGITOS_FLOAT:
+            df[col] = df[col].where(~vacios, np.nan)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+    return df
+
+
+def _filtrar_activos(registros: np.ndarray, incluir_borrados: bool = False) -> np.ndarray:
+    """Descarta registros borrados ('*') y corta en la marca de fin (0x1A)."""
+    flags = registros["_flag"]
+    fin = np.flatnonzero(flags == b"\x1a")
+    if fin.size:
+        registros, flags = registros[: fin[0]], flags[: fin[0]]
+    if incluir_borrados:
+        return registros[(flags == b" ") | (flags == b"*")]
+    return registros[flags == b" "]
+
+
+def iter_dbf_numpy(
+    dbf_path: str,
+    columns: List[str] = None,
+    batch_size: int = 100000,
+    start: int = 0,
+    stop: int = None,
+    incluir_borrados: bool = False,
+    encoding: str = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Recorre el DBF en lotes de `batch_size` registros físicos (desde el
+    registro `start` hasta `stop`) y entrega DataFrames decodificados.
+    `columns` deben ser nombres reales del DBF. Con `incluir_borrados` también
+    se entregan los registros marcados con '*', con BORRADO = True.
+    `encoding` reemplaza el que indica el encabezado.
+    """
+    encabezado = leer_encabezado(dbf_path)
+    if encoding:
+        encabezado["encoding"] = encoding
+    if columns is None:
+        columns = [c["name"] for c in encabezado["campos"]]
+    registros = abrir_registros(dbf_path, encabezado, columns)
+    total = len(registros) if stop is None else min(stop, len(registros))
+    try:
+        for i in range(start, total, batch_size):
+            bloque = registros[i : min(i + batch_size, total)]
+            fin    = bool((bloque["_flag"] == b"\x1a").any())
+            registros_lote = _filtrar_activos(bloque, incluir_borrados)
+            df = decodificar_registros(registros_lote, encabezado, columns)
+            if incluir_borrados:
+                df[BORRADO] = registros_lote["_flag"] == b"*"
+            yield df
+            if fin:
+                break
+    finally:
+        del registros
+
+
+def leer_dbf_numpy(dbf_path: str, columns: List[str] = None) -> pd.DataFrame:
+    """Lee el DBF completo con el decodificador NumPy."""
+    lotes = list(iter_dbf_numpy(dbf_path, columns, batch_size=1_000_000))
+    if not lotes:
+        encabezado = leer_encabezado(dbf_path)
+        return pd.DataFrame(columns=columns or [c["name"] for c in encabezado["campos"]])
+    return pd.concat(lotes, ignore_index=True)
@@ -0,0 +1,157 @@
+# etl/diff.py
+
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from etl.hashing import normalizar_columna, unir_columnas
+
+# Columna auxiliar con la llave compuesta normalizada
+CLAVE = "_clave"
+# Hash guardado en destino para las filas cambiadas
+HASH_PREVIO = "_hash_previo"
+
+_SEP = "\x1f"
+
+
+class ResultadoDiff(NamedTuple):
+    insertados:  pd.DataFrame   # filas de origen sin llave en destino
+    cambiados:   pd.DataFrame   # filas de origen con hash distinto (+ HASH_PREVIO)
+    sin_cambios: pd.DataFrame   # filas de origen con el mismo hash
+    faltantes:   pd.DataFrame   # llaves de destino ausentes en origen (CLAVE + hash)
+
+
+def construir_clave(df: pd.DataFrame, key_cols: List[str]) -> np.ndarray:
+    """
+    Llave compuesta como texto normalizado (misma normalización que el
+    hash), para que 5, 5.0 y "5" del DBF y de MySQL coincidan.
+    """
+    if CLAVE in df.columns:
+        return df[CLAVE].to_numpy(dtype=object)
+    if len(df) == 0:
+        return np.array([], dtype=object)
+    return unir_columnas([normalizar_columna(df[k]) for k in key_cols], _SEP)
+
+
+def separar_clave(claves: np.ndarray, key_cols: List[str]) -> pd.DataFrame:
+    """Operación inversa de construir_clave (valores como texto)."""
+    if len(claves) == 0:
+        return pd.DataFrame(columns=key_cols)
+    partes = pd.Series(claves, dtype=object).str.split(
+        _SEP, n=len(key_cols) - 1, expand=True, regex=False
+    )
+    partes.columns = key_cols
+    return partes
+
+
+def preparar_destino(destino: pd.DataFrame, key_cols: List[str], hash_field: str) -> pd.DataFrame:
+    """
+    Reduce el destino a (CLAVE, hash) con llaves únicas, indexado por CLAVE.
+    El índice (y su tabla hash) se reutiliza en cada calcular_diff.
+    Un hash NULL (NaN al pasar por pandas) queda como None.
+    """
+    if CLAVE in destino.columns:
+        claves = destino[CLAVE].to_numpy(dtype=object)
+    else:
+        claves = construir_clave(destino, key_cols)
+    # dtype object: con pandas >= 3 una columna de texto volvería a guardar NaN
+    hashes = destino[hash_field].to_numpy(dtype=object)
+    hashes[pd.isna(hashes)] = None
+    out = pd.DataFrame({
+        CLAVE:      claves,
+        hash_field: pd.Series(hashes, dtype=object)
+    })
+    out = out.drop_duplicates(subset=CLAVE, keep="first")
+    out.index = pd.Index(out[CLAVE].to_numpy(dtype=object), name=CLAVE)
+    return out
+
+
+def claves_faltantes(destino: pd.DataFrame, claves_origen) -> pd.DataFrame:
+    """Filas de destino (CLAVE, hash) cuya llave no aparece en origen."""
+    ausentes = ~destino[CLAVE].isin(claves_origen)
+    return destino.loc[ausentes].reset_index(drop=True)
+
+
+class ClavesVistas:
+    """
+    Llaves de origen ya vistas en la corrida (dedupe entre lotes y anti-join
+    de borrados). Las que existen en destino se marcan en una máscara booleana
+    alineada con su índice (1 byte por fila, sin copiar las llaves); solo las
+    llaves nuevas, que no están en destino, se guardan en un set.
+    """
+
+    def __init__(self, destino: pd.DataFrame):
+        self._indice  = destino.index
+        self._mascara = np.zeros(len(destino), dtype=bool)
+        self._nuevas  = set()
+
+    def _ubicar(self, claves) -> tuple:
+        claves = np.asarray(claves, dtype=object)
+        pos = self._indice.get_indexer(claves) if len(claves) else np.array([], dtype=np.intp)
+        return claves, pos, pos >= 0
+
+    def contiene(self, claves) -> np.ndarray:
+        """Máscara de `claves` que ya se vieron."""
+        claves, pos, existe = self._ubicar(claves)
+        vistas = np.zeros(len(claves), dtype=bool)
+        vistas[existe] = self._mascara[pos[existe]]
+        vistas[~existe] = [c in self._nuevas for c in claves[~existe]]
+        return vistas
+
+    def registrar(self, claves) -> np.ndarray:
+        """Marca `claves` como vistas; devuelve la máscara de las que no se habían visto."""
+        claves, pos, existe = self._ubicar(claves)
+        primeras = np.ones(len(claves), dtype=bool)
+        primeras[existe] = ~self._mascara[pos[existe]]
+        primeras[~existe] = [c not in self._nuevas for c in claves[~existe]]
+        self._mascara[pos[existe]] = True
+        self._nuevas.update(claves[~existe].tolist())
+        return primeras
+
+    def faltantes(self, destino: pd.DataFrame) -> np.ndarray:
+        """Llaves de `destino` (indexado por CLAVE) que no se vieron en origen."""
+        claves = destino.index.to_numpy(dtype=object)
+        return claves[~self.contiene(claves)]
+
+
+def calcular_diff(
+    origen: pd.DataFrame,
+    destino: pd.DataFrame,
+    key_cols: List[str],
+    hash_field: str,
+    con_faltantes: bool = True
+) -> ResultadoDiff:
+    """
+    Hash-join vectorizado de origen contra destino por llave.
+    Con lectura por lotes conviene preparar el destino una sola vez
+    (preparar_destino), pasar con_faltantes=False y sacar los faltantes
+    al final de un ClavesVistas (faltantes).
+    """
+    if destino.index.name != CLAVE:
+        destino = preparar_destino(destino, key_cols, hash_field)
+
+    claves = construir_clave(origen, key_cols)
+    indice = destino.index
+    pos    = indice.get_indexer(claves)
+    existe = pos >= 0
+
+    h_dst  = destino[hash_field].to_numpy(dtype=object)
+    previo = np.full(len(origen), None, dtype=object)
+    previo[existe] = h_dst[pos[existe]]
+    igual  = existe & (previo == origen[hash_field].to_numpy(dtype=object))
+
+    cambiados = origen.loc[existe & ~igual].copy()
+    cambiados[HASH_PREVIO] = previo[existe & ~igual]
+
+    if con_faltantes:
+        faltantes = claves_faltantes(destino, claves)
+    else:
+        faltantes = destino.iloc[0:0]
+
+    return ResultadoDiff(
+        insertados  = origen.loc[~existe].copy(),
+        cambiados   = cambiados,
+        sin_cambios = origen.loc[igual].copy(),
+        faltantes   = faltantes
+    )
@@ -4,16 +4,26 @@ import json
 import logging
 import hashlib
 import time
+import threading
 from datetime import datetime
-from typing import Callable, List, Tuple
+from typing import Callable, Iterator, List, Tuple
 
-import psutil
+import numpy as np
 import pandas as pd
-from dbfread import DBF
-from sqlalchemy import create_engine, MetaData, Table, select, text, bindparam
+from sqlalchemy import Table, select, text, bindparam, update, and_
 from sqlalchemy.dialects.mysql import insert as mysql_insert
-
-from etl.control import actualizar_fecha
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from etl.control import actualizar_fecha, actualizar_estado, obtener_huella, obtener_cola, obtener_bloques
+from etl.dbf_reader import (
+    BORRADO, abrir_dbfread, alinear_tipos, huella_archivo, iter_dbf_numpy, iter_dbfread_rango, leer_encabezado, registros_fisicos,
+    soporta_columnas
+)
+from etl.hashing import ALGORITMO_DEFAULT, calcular_hashes, detectar_algoritmo
+from etl import (
+    async_loader, borrados, db, key_index, incremental, loader, lotes, metadata, pipeline, snapshot, telemetria
+)
+from etl.diff import HASH_PREVIO, ClavesVistas, calcular_diff, construir_clave, preparar_destino
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -49,18 +59,168 @@ def calcular_hash_fila(row: dict, cols: List[str]) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+def resolver_columnas(field_names: List[str], columns: List[str] = None) -> List[str]:
+    """
+    Resuelve (sin distinguir mayúsculas) los nombres reales del DBF para
+    las columnas pedidas. Avisa de las que no existen.
+    """
+    if not columns:
+        return list(field_names)
+    lower   = {c.lower(): c for c in field_names}
+    sel     = [lower[c.lower()] for c in columns if c.lower() in lower]
+    missing = [c for c in columns if c.lower() not in lower]
+    if missing:
+        logging.warning(f"Columnas no encontradas y excluidas: {missing}")
+    return sel
+
+
+def dbf_to_batches(
+    dbf_path: str,
+    columns: List[str] = None,
+    batch_size: int = 10000,
+    start: int = 0,
+    stop: int = None,
+    incluir_borrados: bool = False,
+    usar_snapshot: bool = False,
+    snapshot_max_mb: float = snapshot.MAX_MB
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee el DBF en modo streaming y entrega DataFrames de hasta `batch_size`
+    filas con solo las columnas pedidas. La memoria depende del lote, no
+    del tamaño del archivo. `start`/`stop` limitan la lectura a esos
+    registros físicos (con dbfread, vía iter_dbfread_rango). Con `incluir_borrados` se agregan los
+    registros marcados como borrados, con la columna BORRADO = True.
+    Con `usar_snapshot`, una lectura completa sale del snapshot Parquet
+    vigente; si no existe, se escribe durante esta lectura (etl/snapshot.py).
+    """
+    encabezado = leer_encabezado(dbf_path)
+    sel = resolver_columnas([c["name"] for c in encabezado["campos"]], columns)
+
+    completo = not start and (stop is None or stop >= registros_fisicos(dbf_path, encabezado))
+    if usar_snapshot and completo and not incluir_borrados:
+        lotes = snapshot.iter_lotes(dbf_path, sel, batch_size, generar=True, max_mb=snapshot_max_mb)
+        if lotes is not None:
+            yield from lotes
+            return
+
+    logging.info(f"Leyendo DBF (streaming, lote={batch_size}): {dbf_path}")
+
+    # Decodificador NumPy (memory-map) si todos los tipos proyectados lo permiten
+    if soporta_columnas(encabezado, sel):
+        yield from iter_dbf_numpy(
+            dbf_path, sel, batch_size=batch_size, start=start, stop=stop,
+            incluir_borrados=incluir_borrados
+        )
+        return
+    logging.info("Campos no soportados por el lector NumPy; se usa dbfread")
+    opciones = {"ignore_missing_memofile": True, "char_decode_errors": "ignore"}
+    if start or stop is not None:
+        # APPEND/BLOCKS con memo: salta al rango pedido, con BORRADO por registro
+        batch, marcas = [], []
+        for rec, borrado in iter_dbfread_rango(dbf_path, sel, start, stop, incluir_borrados, **opciones):
+            batch.append(rec)
+            marcas.append(borrado)
+            if len(batch) >= batch_size:
+                yield _lote_dbfread(batch, sel, marcas, incluir_borrados, encabezado)
+                batch, marcas = [], []
+        if batch:
+            yield _lote_dbfread(batch, sel, marcas, incluir_borrados, encabezado)
+        return
+
+    table = abrir_dbfread(dbf_path, sel, **opciones)
+
+    fuentes = [(table, False)] + ([(table.deleted, True)] if incluir_borrados else [])
+    for registros, borrado in fuentes:
+        batch = []
+        for rec in registros:
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                yield _lote_dbfread(batch, sel, borrado, incluir_borrados, encabezado)
+                batch = []
+        if batch:
+            yield _lote_dbfread(batch, sel, borrado, incluir_borrados, encabezado)
+
+
+def _lote_dbfread(batch: list, sel: List[str], borrado, marcar: bool, encabezado: dict) -> pd.DataFrame:
+    """`borrado`: un bool para todo el lote o uno por registro."""
+    df = alinear_tipos(pd.DataFrame.from_records(batch, columns=sel), encabezado)
+    if marcar:
+        df[BORRADO] = borrado
+    return df
+
+
+def contar_registros_dbf(dbf_path: str) -> int:
+    """Número de registros según el encabezado (incluye borrados)."""
+    return leer_encabezado(dbf_path)["registros"]
+
+
 def dbf_to_dataframe(dbf_path: str, columns: List[str] = None) -> pd.DataFrame:
     logging.info(f"Leyendo DBF: {dbf_path}")
-    table = DBF(dbf_path, load=True, ignore_missing_memofile=True, char_decode_errors="ignore")
-    df = pd.DataFrame(iter(table))
-    if columns:
-        lower = {c.lower(): c for c in df.columns}
-        sel   = [lower[c.lower()] for c in columns if c.lower() in lower]
-        missing = [c for c in columns if c.lower() not in lower]
-        if missing:
-            logging.warning(f"Columnas no encontradas y excluidas: {missing}")
-        df = df[sel]
-    return df
+    batches = list(dbf_to_batches(dbf_path, columns, batch_size=100000))
+    if not batches:
+        campos = [c["name"] for c in leer_encabezado(dbf_path)["campos"]]
+        return pd.DataFrame(columns=resolver_columnas(campos, columns))
+    return pd.concat(batches, ignore_index=True)
+
+
+def cargar_hashes_existentes(
+    engine,
+    tbl: Table,
+    key_cols: List[str],
+    hash_field: str
+) -> pd.DataFrame:
+    """
+    Devuelve (KEYS) -> row_hash de la tabla destino como DataFrame
+    indexado por la llave normalizada (ver etl.diff.preparar_destino).
+    """
+    cols = [tbl.c[k] for k in key_cols] + [tbl.c[hash_field]]
+    stmt = select(*cols)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).fetchall()
+    destino = pd.DataFrame.from_records(rows, columns=key_cols + [hash_field])
+    return preparar_destino(destino, key_cols, hash_field)
+
+
+def clasificar_lote(
+    df: pd.DataFrame,
+    destino: pd.DataFrame,
+    key_cols: List[str],
+    hash_field: str,
+    hash_cols: List[str] = None,
+    algoritmo: str = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separa el lote en (a_sincronizar, a_migrar) con el motor de diff.
+    Si el row_hash guardado fue generado con otro algoritmo, se recalcula
+    con ese algoritmo solo para esas filas: si coincide la fila no cambió
+    y únicamente hay que reescribir su row_hash (migración).
+    """
+    if df.empty:
+        return df, df.iloc[0:0]
+    diff      = calcular_diff(df, destino, key_cols, hash_field, con_faltantes=False)
+    cambiados = diff.cambiados
+    previos   = cambiados.pop(HASH_PREVIO).to_numpy(dtype=object)
+
+    migrar = np.zeros(len(cambiados), dtype=bool)
+    if algoritmo and hash_cols and len(cambiados):
+        algos = np.array([detectar_algoritmo(p) for p in previos], dtype=object)
+        for legado in set(algos) - {None, algoritmo}:
+            sel = algos == legado
+            migrar[sel] = calcular_hashes(cambiados.loc[sel], hash_cols, legado) == previos[sel]
+
+    # Se conserva el orden original del lote
+    a_sync = pd.concat([diff.insertados, cambiados.loc[~migrar]]).sort_index()
+    return a_sync, cambiados.loc[migrar]
+
+
+def filtrar_lote(
+    df: pd.DataFrame,
+    destino: pd.DataFrame,
+    key_cols: List[str],
+    hash_field: str
+) -> pd.DataFrame:
+    """Conserva solo las filas nuevas o cuyo hash difiere del destino."""
+    return clasificar_lote(df, destino, key_cols, hash_field)[0]
 
 
 def filter_new_or_changed(
@@ -71,27 +231,103 @@ def filter_new_or_changed(
     hash_field: str,
     hash_cols: List[str]
 ) -> pd.DataFrame:
-    # 1) Calcular row_hash
-    df[hash_field] = [calcular_hash_fila(r, hash_cols) for r in df.to_dict("records")]
+    # 1) Calcular row_hash (si el llamador no lo trae ya calculado)
+    if hash_field not in df.columns:
+        df[hash_field] = calcular_hashes(df, hash_cols)
 
     # 2) Dedupe interno por key_cols
     df = df.drop_duplicates(subset=key_cols, keep="first")
 
-    # 3) Cargar mapping completo key->hash de MySQL
-    meta = MetaData()
-    tbl  = Table(table_name, meta, autoload_with=engine)
-    cols = [tbl.c[k] for k in key_cols] + [tbl.c[hash_field]]
-    stmt = select(*cols)
-    with engine.connect() as conn:
-        rows = conn.execute(stmt).mappings().all()
-    existing = {
-        tuple(row[k] for k in key_cols): row[hash_field]
-        for row in rows
+    # 3) Cargar key->hash de MySQL (indexado por llave normalizada)
+    tbl     = metadata.obtener_tabla(engine, table_name)
+    destino = cargar_hashes_existentes(engine, tbl, key_cols, hash_field)
+
+    # 4) Hash-join vectorizado: nuevas + cambiadas
+    return filtrar_lote(df, destino, key_cols, hash_field)
+
+
+def upsert_chunks(
+    engine,
+    tbl: Table,
+    df: pd.DataFrame,
+    key_cols: List[str],
+    hash_field: str,
+    chunk_size: int,
+    on_chunk: Callable[[int], None] = None,
+    ajuste: "lotes.TamanoAdaptativo" = None
+):
+    """
+    Upsert por lotes sobre una tabla ya reflejada. `on_chunk` recibe el
+    número de filas acumuladas tras cada lote. Con `ajuste` el tamaño de
+    cada lote lo decide etl.lotes en lugar de `chunk_size`.
+    """
+    recs  = df.to_dict("records")
+    total = len(recs)
+    if not total:
+        return
+    # SQLite (base local de benchmarks/) usa ON CONFLICT; el resto, MySQL
+    sqlite = engine.dialect.name == "sqlite"
+    stmt   = sqlite_insert(tbl) if sqlite else mysql_insert(tbl)
+    nuevos = stmt.excluded if sqlite else stmt.inserted
+    upd    = {
+        c.name: nuevos[c.name]
+        for c in tbl.columns
+        if c.name not in key_cols and c.name in df.columns
     }
+    if hash_field in df.columns:
+        upd[hash_field] = nuevos[hash_field]
+    if sqlite:
+        stmt = stmt.on_conflict_do_update(index_elements=key_cols, set_=upd)
+    else:
+        stmt = stmt.on_duplicate_key_update(**upd)
 
-    # 4) Filtrar en memoria
-    mask = df.apply(lambda r: existing.get(tuple(r[k] for k in key_cols)) != r[hash_field], axis=1)
-    return df.loc[mask].copy()
+    if ajuste:
+        ajuste.calibrar(r.values() for r in recs)
+    i = 0
+    while i < total:
+        chunk = recs[i : i + (ajuste.tamano() if ajuste else chunk_size)]
+        t0    = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(stmt, chunk)
+                with telemetria.medir("commit", len(chunk)):
+                    conn.commit()
+        except Exception as e:
+            if ajuste and ajuste.retroceder(e):
+                telemetria.contar("reintentos")
+                continue
+            raise
+        if ajuste:
+            ajuste.registrar(len(chunk), time.perf_counter() - t0)
+        i += len(chunk)
+        if on_chunk:
+            on_chunk(i)
+
+
+def actualizar_row_hash(
+    engine,
+    tbl: Table,
+    df: pd.DataFrame,
+    key_cols: List[str],
+    hash_field: str,
+    chunk_size: int
+):
+    """
+    Reescribe solo row_hash (UPDATE por llave) para filas cuyo contenido no
+    cambió pero cuyo hash guardado usa otro algoritmo.
+    """
+    stmt = (
+        update(tbl)
+        .where(and_(*[tbl.c[k] == bindparam(f"k_{k}") for k in key_cols]))
+        .values({hash_field: bindparam("h_new")})
+    )
+    recs = [
+        {**{f"k_{k}": r[k] for k in key_cols}, "h_new": r[hash_field]}
+        for r in df[key_cols + [hash_field]].to_dict("records")
+    ]
+    for i in range(0, len(recs), chunk_size):
+        with engine.begin() as conn:
+            conn.execute(stmt, recs[i : i + chunk_size])
 
 
 def upsert_dataframe_con_progreso(
@@ -101,33 +337,33 @@ def upsert_dataframe_con_progreso(
     key_cols: List[str],
     hash_field: str,
     chunk_size: int,
-    progress_callback: Callable[[int], None]
+    progress_callback: Callable[[int], None],
+    concurrencia: int = 1
 ):
-    engine = create_engine(mysql_uri, connect_args={"charset": "utf8mb4"})
-    meta   = MetaData()
-    tbl    = Table(table_name, meta, autoload_with=engine)
-
-    recs  = df.to_dict("records")
-    total = len(recs)
+    """
+    Upsert de `df` con progreso. Con `concurrencia` > 1 (y aiomysql) se
+    mantienen varios chunks en vuelo; si no, INSERT multi-fila secuencial.
+    """
+    engine = db.obtener_engine(mysql_uri)
+    tbl    = metadata.obtener_tabla(engine, table_name)
+
+    total = len(df)
     if total == 0:
         progress_callback(100)
         return
 
-    for i in range(0, total, chunk_size):
-        chunk = recs[i : i + chunk_size]
-        stmt  = mysql_insert(tbl)
-        upd   = {
-            c.name: stmt.inserted[c.name]
-            for c in tbl.columns
-            if c.name not in key_cols and c.name in df.columns
-        }
-        if hash_field in df.columns:
-            upd[hash_field] = stmt.inserted[hash_field]
-
-        stmt = stmt.on_duplicate_key_update(**upd)
-        with engine.begin() as conn:
-            conn.execute(stmt, chunk)
-        progress_callback(int(((i + len(chunk)) / total) * 100))
+    on_chunk = lambda n: progress_callback(int((n / total) * 100))
+    cargador = (
+        async_loader.crear_cargador_async(engine, tbl, key_cols, chunk_size, concurrencia)
+        or loader.crear_cargador(engine, tbl, key_cols, filas_por_commit=chunk_size)
+    )
+    if cargador:
+        try:
+            cargador.upsert(df, on_chunk=on_chunk)
+        finally:
+            cargador.cerrar()
+    else:
+        upsert_chunks(engine, tbl, df, key_cols, hash_field, chunk_size, on_chunk=on_chunk)
 
 
 def log_sync_history(
@@ -140,7 +376,7 @@ def log_sync_history(
     chunk_size: int,
     mem_used_mb: float
 ):
-    engine = create_engine(mysql_uri, connect_args={"charset": "utf8mb4"})
+    engine = db.obtener_engine(mysql_uri)
     stmt = text("""
       INSERT INTO tbl_sync_log
         (dbf_name, sync_time, rows_processed, rows_upserted,
@@ -158,10 +394,131 @@ def log_sync_history(
             "mem": mem_used_mb
         })
 
+def preparar_lote(
+    lote: pd.DataFrame,
+    rename_map: dict,
+    destino: pd.DataFrame,
+    key_cols: List[str],
+    hash_cols: List[str],
+    algoritmo: str,
+    vistos: ClavesVistas,
+    totales: dict,
+    marcadas: set = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Parte CPU de un lote leído del DBF: renombra, hashea, deduplica (también
+    contra lotes previos vía `vistos`) y compara contra `destino`.
+    Devuelve (a sincronizar, a migrar) y acumula los conteos en `totales`.
+    Si el lote trae la columna BORRADO, las llaves de esos registros se
+    agregan a `marcadas` y no se sincronizan.
+    Debe llamarse en orden de lectura para respetar la primera aparición.
+    """
+    # Renombra columnas según TARGET.COLUMNS
+    lote = lote.rename(columns={c: rename_map[c.lower()] for c in lote.columns if c != BORRADO})
+
+    if BORRADO in lote.columns:
+        borrado = lote[BORRADO].to_numpy(dtype=bool)
+        if marcadas is not None and borrado.any():
+            marcadas.update(construir_clave(lote.loc[borrado], key_cols))
+        lote = lote.loc[~borrado].drop(columns=BORRADO)
+
+    totales["procesadas"] += len(lote)
+
+    # Siempre calculamos y filtramos por row_hash
+    with telemetria.medir("hash", len(lote)):
+        lote["row_hash"] = calcular_hashes(lote, hash_cols, algoritmo)
+    lote = lote.drop_duplicates(subset=key_cols, keep="first")
+
+    # Dedupe entre lotes: se conserva la primera aparición de cada llave
+    claves = construir_clave(lote, key_cols)
+    lote   = lote.loc[vistos.registrar(claves)]
+
+    with telemetria.medir("diff", len(lote)):
+        lote_to_sync, lote_migrar = clasificar_lote(
+            lote, destino, key_cols, "row_hash", hash_cols, algoritmo
+        )
+    totales["sincronizadas"] += len(lote_to_sync)
+    totales["migradas"]      += len(lote_migrar)
+    return lote_to_sync, lote_migrar
+
+
+def escribir_lote(
+    engine,
+    tbl: Table,
+    lote_to_sync: pd.DataFrame,
+    lote_migrar: pd.DataFrame,
+    key_cols: List[str],
+    chunk_size: int,
+    entry_indice: str = None,
+    cargador: "loader.CargadorMasivo" = None,
+    ajuste: "lotes.TamanoAdaptativo" = None
+):
+    """
+    Parte de red de un lote: upsert (masivo si se pasa `cargador`),
+    migración de row_hash y, si `entry_indice` se indica, índice local.
+    `ajuste` activa el tamaño de lote adaptativo del upsert genérico.
+    """
+    with telemetria.medir("upsert", len(lote_to_sync) + len(lote_migrar)):
+        if cargador:
+            cargador.upsert(lote_to_sync)
+        else:
+            upsert_chunks(engine, tbl, lote_to_sync, key_cols, "row_hash", chunk_size, ajuste=ajuste)
+        if not lote_migrar.empty:
+            actualizar_row_hash(engine, tbl, lote_migrar, key_cols, "row_hash", chunk_size)
+    if entry_indice:
+        sincronizadas = pd.concat([lote_to_sync, lote_migrar])
+        with telemetria.medir("indice", len(sincronizadas)):
+            key_index.aplicar_cambios(
+                entry_indice,
+                construir_clave(sincronizadas, key_cols),
+                sincronizadas["row_hash"].to_numpy(dtype=object)
+            )
+
+
+def calcular_huella(dbf_path: str, entry: dict, algoritmo: str) -> dict:
+    """
+    Huella del archivo más un resumen de la definición de la entrada: si
+    cambia el mapeo de columnas, llaves o algoritmo ya no coincide.
+    """
+    huella = huella_archivo(dbf_path)
+    definicion = json.dumps([entry, algoritmo], sort_keys=True, default=str)
+    huella["entry"] = hashlib.sha256(definicion.encode("utf-8")).hexdigest()[:16]
+    return huella
+
+
 def ejecutar_etl_con_progreso(
     dbf_name: str,
     chunk_size: int,
-    progress_callback: Callable[[int], None]
+    progress_callback: Callable[[int], None],
+    forzar: bool = False,
+    stage_callback: Callable[[str, int, int], None] = None,
+    perfil_callback: Callable[[dict], None] = None
+) -> str:
+    """
+    Sincroniza una entrada. `progress_callback` recibe el porcentaje global
+    (registros ya cargados); `stage_callback`, si se indica, recibe
+    (etapa, registros, total) para "lectura", "hash" y "carga";
+    `perfil_callback` recibe al final el perfil de la corrida (etl.telemetria).
+    """
+    tele = telemetria.Telemetria().iniciar()
+    telemetria.activar(tele)
+    try:
+        return _sincronizar_entrada(
+            dbf_name, chunk_size, progress_callback, forzar, stage_callback, tele, perfil_callback
+        )
+    finally:
+        telemetria.activar(None)
+        tele.detener()
+
+
+def _sincronizar_entrada(
+    dbf_name: str,
+    chunk_size: int,
+    progress_callback: Callable[[int], None],
+    forzar: bool,
+    stage_callback: Callable[[str, int, int], None],
+    tele: "telemetria.Telemetria",
+    perfil_callback: Callable[[dict], None] = None
 ) -> str:
     start_time = time.time()
 
@@ -174,50 +531,228 @@ def ejecutar_etl_con_progreso(
     # Determina KEY_COLUMNS y HASH_COLUMNS, ya sea al nivel top o dentro de TARGET
     key_cols  = entry.get("KEYS") or entry["TARGET"].get("KEYS", [])
     hash_cols = entry.get("HASHES") or entry["TARGET"].get("HASHES", [])
+    algoritmo = entry.get("HASH_ALGORITHM") or cfg.get("HASH_ALGORITHM", ALGORITMO_DEFAULT)
 
-    engine     = create_engine(cfg["MYSQL_URI"], connect_args={"charset":"utf8mb4"})
+    # Fast path: si el DBF no cambió desde la última sincronización exitosa
+    # no se lee, ni se hashea, ni se compara. Solo se registra el no-op.
+    dbf_path = os.path.join(cfg["DBF_DIR"], f"{dbf_name}.DBF")
+    huella   = calcular_huella(dbf_path, entry, algoritmo)
+    if not forzar and obtener_huella(dbf_name) == huella:
+        progress_callback(100)
+        time_elapsed = int(time.time() - start_time)
+        sync_time    = datetime.now()
+        tele.detener()
+        mem_used_mb  = tele.pico_rss_mb
+        # No-op: rows_processed = 0 y chunk_size = 0 lo distinguen en tbl_sync_log
+        log_sync_history(cfg["MYSQL_URI"], dbf_name, sync_time, 0, 0, time_elapsed, 0, mem_used_mb)
+        actualizar_fecha(dbf_name, sync_time.isoformat(sep=" ", timespec="seconds"))
+        logging.info(f"{dbf_name}.DBF sin cambios (huella idéntica); se omite la sincronización")
+        return f"Sin cambios en {dbf_name}.DBF; sincronización omitida, duración: {time_elapsed}s."
+
+    engine     = db.obtener_engine(cfg["MYSQL_URI"], cfg)
+    tbl        = metadata.obtener_tabla(engine, entry["TARGET"]["TABLE"])
     src_cols   = [c["SOURCE"] for c in entry["TARGET"]["COLUMNS"]]
-    df         = dbf_to_dataframe(os.path.join(cfg["DBF_DIR"], f"{dbf_name}.DBF"), src_cols)
-    rows_processed = len(df)
-
-    # Renombra columnas según TARGET.COLUMNS
-    lower = {c.lower(): c for c in df.columns}
-    rename_map = {
-        lower[c["SOURCE"].lower()]: c["TARGET"]
-        for c in entry["TARGET"]["COLUMNS"]
-        if c["SOURCE"].lower() in lower
-    }
-    df = df.rename(columns=rename_map)
-
-    # Siempre calculamos y filtramos por row_hash
-    df["row_hash"] = [calcular_hash_fila(r, hash_cols) for r in df.to_dict("records")]
-    df = df.drop_duplicates(subset=key_cols, keep="first")
-    df_to_sync = filter_new_or_changed(
-        df, engine,
-        entry["TARGET"]["TABLE"],
-        key_cols,
-        "row_hash",
-        hash_cols
-    )
-
-    rows_upserted = len(df_to_sync)
-
-    upsert_dataframe_con_progreso(
-        df_to_sync,
-        cfg["MYSQL_URI"],
-        entry["TARGET"]["TABLE"],
-        key_cols,
-        "row_hash",
-        chunk_size,
-        progress_callback
-    )
+    encabezado = leer_encabezado(dbf_path)
+    total_recs = encabezado["registros"]
+
+    # key->hash del destino (una sola vez por ejecución, indexado por llave).
+    # Con KEY_INDEX se usa el índice local y solo se relee MySQL si hay desfase.
+    usar_indice = entry.get("KEY_INDEX", cfg.get("KEY_INDEX", True))
+    rescan = lambda: cargar_hashes_existentes(engine, tbl, key_cols, "row_hash")
+    t0 = time.perf_counter()
+    if usar_indice:
+        destino = key_index.cargar_o_reconciliar(entry["DBF"], engine, tbl, key_cols, "row_hash", rescan)
+    else:
+        destino = rescan()
+    tele.registrar("destino", time.perf_counter() - t0, len(destino))
+
+    # Plan de lectura: rangos [inicio, fin) de registros físicos.
+    # FULL lee todo; APPEND solo la cola; BLOCKS solo los bloques cambiados.
+    modo   = (entry.get("SYNC_MODE") or cfg.get("SYNC_MODE", "FULL")).upper()
+    rangos = [(0, None)]
+    completa = True
+    estado_incremental = None
+    corridas_max = cfg.get("FULL_RECONCILE_EVERY", incremental.CORRIDAS_ENTRE_COMPLETAS)
+    if modo == "APPEND":
+        estado_incremental = obtener_cola(dbf_name)
+        inicio, fin, firma_cola, motivo = incremental.planear_cola(
+            dbf_path, estado_incremental, corridas_max=corridas_max
+        )
+        rangos, completa = [(inicio, fin)], inicio == 0
+        logging.info(f"Modo APPEND: {motivo}")
+    elif modo == "BLOCKS":
+        estado_incremental = obtener_bloques(dbf_name)
+        tam_bloque = entry.get("BLOCK_RECORDS") or cfg.get("BLOCK_RECORDS", incremental.REGISTROS_BLOQUE)
+        rangos, sumas, completa, motivo = incremental.planear_bloques(
+            dbf_path, estado_incremental, tam=tam_bloque, corridas_max=corridas_max
+        )
+        logging.info(f"Modo BLOCKS: {motivo}")
+    if not completa:
+        total_recs = sum(fin - ini for ini, fin in rangos)
+
+    # Upsert masivo (INSERT multi-fila vía pymysql); COMMIT_ROWS agrupa transacciones.
+    # LOAD_MODE = INFILE/AUTO usa LOAD DATA LOCAL INFILE + staging para lotes grandes.
+    # ADAPTIVE_CHUNK: el tamaño de cada upsert parte de CHUNK_TARGET_BYTES y se
+    # ajusta según la latencia medida (CHUNK_TARGET_SECONDS) entre CHUNK_MIN_ROWS y CHUNK_MAX_ROWS.
+    ajuste = None
+    if entry.get("ADAPTIVE_CHUNK", cfg.get("ADAPTIVE_CHUNK", False)):
+        ajuste = lotes.TamanoAdaptativo(
+            bytes_objetivo=cfg.get("CHUNK_TARGET_BYTES", lotes.BYTES_OBJETIVO),
+            minimo=cfg.get("CHUNK_MIN_ROWS", lotes.MIN_FILAS),
+            maximo=cfg.get("CHUNK_MAX_ROWS", lotes.MAX_FILAS),
+            latencia_objetivo=cfg.get("CHUNK_TARGET_SECONDS", lotes.LATENCIA_OBJETIVO)
+        )
+    cargador = None
+    if entry.get("BULK_UPSERT", cfg.get("BULK_UPSERT", True)):
+        cargador = loader.crear_cargador(
+            engine, tbl, key_cols,
+            filas_por_commit=entry.get("COMMIT_ROWS", cfg.get("COMMIT_ROWS", chunk_size)),
+            modo=entry.get("LOAD_MODE") or cfg.get("LOAD_MODE", "UPSERT"),
+            umbral_infile=entry.get("LOAD_INFILE_MIN_ROWS") or cfg.get("LOAD_INFILE_MIN_ROWS", loader.UMBRAL_INFILE),
+            ajuste=ajuste
+        )
+    # ASYNC_UPSERT = N: hasta N chunks en vuelo con aiomysql (enlaces de alta latencia)
+    cargador = async_loader.crear_cargador_async(
+        engine, tbl, key_cols, chunk_size, entry.get("ASYNC_UPSERT", cfg.get("ASYNC_UPSERT", 0))
+    ) or cargador
+
+    # Streaming: cada lote se renombra, hashea, filtra y sube por separado.
+    # Fuera de los lotes solo quedan `destino` (llave + hash de cada fila) y
+    # `vistos`: una máscara sobre su índice más un set con las llaves nuevas.
+    rename_map   = {c["SOURCE"].lower(): c["TARGET"] for c in entry["TARGET"]["COLUMNS"]}
+    vistos       = ClavesVistas(destino)
+    totales      = {"procesadas": 0, "sincronizadas": 0, "migradas": 0}
+    entry_indice = entry["DBF"] if usar_indice else None
+
+    # Avance por etapa (registros): lectura, hash/diff y carga
+    avance      = {"lectura": 0, "hash": 0, "carga": 0}
+    avance_lock = threading.Lock()
+
+    def reportar(etapa: str, n: int):
+        with avance_lock:
+            avance[etapa] += n
+            if stage_callback:
+                stage_callback(etapa, avance[etapa], total_recs)
+            if etapa == "carga" and total_recs:
+                progress_callback(min(99, int((avance["carga"] / total_recs) * 100)))
+
+    # Borrados: con lectura completa basta el anti-join; en lecturas parciales
+    # se leen también los registros marcados '*' de los rangos procesados.
+    modo_borrado = (entry.get("DELETE_MODE") or cfg.get("DELETE_MODE", "NONE")).upper()
+    if modo_borrado not in borrados.MODOS_BORRADO:
+        raise ValueError(f"DELETE_MODE no soportado: {modo_borrado!r} (opciones: {borrados.MODOS_BORRADO})")
+    columna_soft = entry.get("SOFT_DELETE_COLUMN") or cfg.get("SOFT_DELETE_COLUMN", borrados.COLUMNA_SOFT)
+    leer_marcados = modo_borrado != "NONE" and not completa
+    marcadas      = set()
+    usar_snapshot = entry.get("SNAPSHOT_CACHE", cfg.get("SNAPSHOT_CACHE", False))
+
+    # Con PIPELINE cada etapa corre en su hilo: se asocia ahí la telemetría
+    def leer():
+        telemetria.activar(tele)
+        for inicio, fin in rangos:
+            for lote in tele.medir_iter("lectura", dbf_to_batches(
+                dbf_path, src_cols, batch_size=chunk_size, start=inicio, stop=fin,
+                incluir_borrados=leer_marcados, usar_snapshot=usar_snapshot,
+                snapshot_max_mb=cfg.get("SNAPSHOT_MAX_MB", snapshot.MAX_MB)
+            )):
+                tele.contar("bytes_leidos", len(lote) * encabezado["record_len"])
+                reportar("lectura", len(lote))
+                yield lote
+
+    # Los resultados de varios lotes leídos se juntan hasta el tamaño de envío
+    # del upsert: el del cargador (COMMIT_ROWS o adaptativo), si no CHUNK_SIZE
+    def tamano_envio() -> int:
+        if cargador:
+            return cargador.filas_por_envio() or chunk_size
+        return ajuste.tamano() if ajuste else chunk_size
+
+    acumulador = lotes.Acumulador(tamano_envio)
+
+    def procesar(lote):
+        telemetria.activar(tele)
+        lote_to_sync, lote_migrar = preparar_lote(
+            lote, rename_map, destino, key_cols, hash_cols, algoritmo, vistos, totales, marcadas
+        )
+        reportar("hash", len(lote))
+        return acumulador.agregar(lote_to_sync, lote_migrar, len(lote))
+
+    def escribir(trabajo):
+        telemetria.activar(tele)
+        (lote_to_sync, lote_migrar), n = trabajo
+        if modo_borrado == "SOFT" and columna_soft in tbl.c and not lote_to_sync.empty:
+            # Una llave que reaparece en el DBF deja de estar marcada
+            lote_to_sync = lote_to_sync.assign(**{columna_soft: 0})
+        escribir_lote(engine, tbl, lote_to_sync, lote_migrar, key_cols, chunk_size, entry_indice, cargador, ajuste)
+        reportar("carga", n)
+
+    try:
+        if entry.get("PIPELINE", cfg.get("PIPELINE", False)):
+            # Lectura, hash/diff y upsert concurrentes con colas acotadas
+            pipeline.ejecutar(
+                leer, procesar, escribir,
+                escritores=cfg.get("PIPELINE_WRITERS", pipeline.ESCRITORES),
+                profundidad=cfg.get("PIPELINE_QUEUE", pipeline.PROFUNDIDAD_COLA)
+            )
+        else:
+            for lote in leer():
+                trabajo = procesar(lote)
+                if trabajo:
+                    escribir(trabajo)
+        resto = acumulador.vaciar()
+        if resto:
+            escribir(resto)
+    finally:
+        if cargador:
+            cargador.cerrar()
+
+    rows_processed = totales["procesadas"]
+    rows_upserted  = totales["sincronizadas"]
+    rows_migrated  = totales["migradas"]
+    progress_callback(100)
+
+    # Llaves en MySQL que ya no están en el DBF
+    por_borrar   = borrados.claves_a_borrar(destino, vistos, marcadas, completa)
+    vigentes     = destino
+    if len(por_borrar) and modo_borrado == "SOFT":
+        # Las ya marcadas en corridas previas siguen faltando en el DBF: se excluyen
+        vigentes   = borrados.descartar_marcadas(
+            destino, borrados.claves_marcadas(engine, tbl, key_cols, columna_soft)
+        )
+        por_borrar = borrados.claves_a_borrar(vigentes, vistos, marcadas, completa)
+    rows_deleted = 0
+    if len(por_borrar):
+        logging.info(f"{len(por_borrar)} llaves de {tbl.name} no existen en {dbf_name}.DBF")
+    if len(por_borrar) and modo_borrado != "NONE":
+        borrados.verificar_umbral(
+            len(por_borrar), len(vigentes),
+            entry.get("MAX_DELETE_RATIO", cfg.get("MAX_DELETE_RATIO", borrados.MAX_PROPORCION))
+        )
+        with telemetria.medir("borrados", len(por_borrar)):
+            rows_deleted = borrados.aplicar_borrados(
+                engine, tbl, por_borrar, key_cols, "row_hash", modo_borrado, columna_soft
+            )
+        if usar_indice:
+            with telemetria.medir("indice", len(por_borrar)):
+                if modo_borrado == "SOFT":
+                    key_index.aplicar_cambios(entry["DBF"], por_borrar, np.full(len(por_borrar), None, dtype=object))
+                else:
+                    key_index.eliminar(entry["DBF"], por_borrar)
+    if rows_migrated:
+        logging.info(f"row_hash migrado a {algoritmo} en {rows_migrated} filas sin cambios")
 
     # Log y actualización de fecha
     end_time     = time.time()
     time_elapsed = int(end_time - start_time)
-    proc         = psutil.Process()
-    mem_used_mb  = round(proc.memory_info().rss / (1024**2), 2)
     sync_time    = datetime.now()
+    # Pico de RSS del hilo de muestreo (no la muestra final)
+    tele.detener()
+    mem_used_mb  = tele.pico_rss_mb
+
+    # Con lote adaptativo se registra el tamaño con el que se subió la mayoría de filas
+    chunk_usado = chunk_size
+    if ajuste and rows_upserted:
+        chunk_usado = ajuste.representativo()
+        logging.info(f"Lote adaptativo de {tbl.name}: {chunk_usado} filas (final {ajuste.tamano()})")
 
     log_sync_history(
         cfg["MYSQL_URI"],
@@ -226,13 +761,43 @@ def ejecutar_etl_con_progreso(
         rows_processed,
         rows_upserted,
         time_elapsed,
-        chunk_size,
+        chunk_usado,
         mem_used_mb
     )
 
-    actualizar_fecha(dbf_name, sync_time.isoformat(sep=" ", timespec="seconds"))
-
+    # Desglose por etapa en tbl_sync_perfil (SYNC_PROFILE: false lo desactiva)
+    tele.contar("filas_procesadas", rows_processed)
+    tele.contar("filas_sincronizadas", rows_upserted)
+    tele.contar("filas_eliminadas", rows_deleted)
+    perfil = tele.resumen()
+    logging.info(telemetria.formatear(dbf_name, perfil))
+    if cfg.get("SYNC_PROFILE", True):
+        try:
+            telemetria.guardar(engine, dbf_name, sync_time, perfil)
+        except Exception as e:
+            logging.warning(f"No se pudo guardar el perfil en tbl_sync_perfil: {e}")
+    if perfil_callback:
+        perfil_callback(perfil)
+
+    # Fecha, huella y marca incremental en una sola transacción: una corrida
+    # interrumpida no deja la huella nueva con la marca anterior
+    estado = {
+        "ultima_fecha": sync_time.isoformat(sep=" ", timespec="seconds"),
+        "huella":       huella
+    }
+    if modo == "APPEND" and rangos[0][1] is not None:
+        estado["cola"] = incremental.nuevo_estado_cola(
+            dbf_path, rangos[0][1], firma_cola, completa, estado_incremental
+        )
+    elif modo == "BLOCKS" and rangos[:1] != [(0, None)]:
+        estado["bloques"] = incremental.nuevo_estado_bloques(
+            dbf_path, sumas, completa, estado_incremental, tam=tam_bloque
+        )
+    actualizar_estado(dbf_name, **estado)
+    db.registrar_estadisticas()
+
+    eliminadas = f"eliminadas: {rows_deleted}, " if modo_borrado != "NONE" else ""
     return (
         f"Procesadas: {rows_processed}, conciliaciones: {rows_upserted}, "
-        f"duración: {time_elapsed}s."
+        f"{eliminadas}duración: {time_elapsed}s."
     )
\ No newline at end of file
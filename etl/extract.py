@@ -1,28 +1,236 @@
 # etl/extract.py
+#
+# Extracción por ventana de fechas. El predicado se evalúa al decodificar:
+# de cada registro solo se leen los bytes del campo de fecha (YYYYMMDD en
+# campos D, día juliano en campos T) y únicamente los registros que caen en
+# el rango se decodifican completos.
+#
+# Con `indice_bloques=True` se guarda en state/fechas/ el mínimo y máximo de
+# la fecha por bloque de registros; los bloques cuyo rango no se traslapa con
+# la ventana se saltan sin leerlos. Junto a cada bloque se guarda su CRC32
+# (como SYNC_MODE=BLOCKS, incremental.sumas_bloques): un bloque editado en
+# sitio se vuelve a leer y a indexar; si cambia la estructura del DBF se
+# descarta el índice completo.
 
-from dbfread import DBF
-import pandas as pd
 import os
-from datetime import datetime
+import json
+import logging
+from datetime import datetime, time as dtime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from etl.dbf_reader import (
+    TIPOS_FECHA, abrir_dbfread, abrir_registros, decodificar_registros, fechas_validas,
+    leer_encabezado, limites_fecha, llaves_fecha, soporta_columnas
+)
+from etl import snapshot
+from etl.incremental import REGISTROS_BLOQUE, sumas_bloques
+from etl.state import STATE_DIR
+
+FECHAS_DIR = os.path.join(STATE_DIR, "fechas")
+
+
+def _nombre_campo(nombres, campo: str) -> str:
+    """Nombre real del campo (sin distinguir mayúsculas)."""
+    for n in nombres:
+        if n.lower() == campo.lower():
+            return n
+    raise KeyError(f"El DBF no tiene el campo {campo!r}")
+
+
+def _ruta_indice(ruta_dbf: str, campo: str) -> str:
+    base = os.path.splitext(os.path.basename(ruta_dbf))[0].upper()
+    return os.path.join(FECHAS_DIR, f"{base}_{campo.upper()}.json")
+
+
+def _cargar_indice(ruta_dbf: str, encabezado: dict, campo: dict, tam: int, sumas: list) -> dict:
+    """
+    Mínimo/máximo guardados de los bloques cuyo CRC sigue igual a `sumas`
+    ({bloque: [min, max]}, o None si el bloque no tiene fechas). {} si no
+    hay índice o cambió la estructura.
+    """
+    try:
+        with open(_ruta_indice(ruta_dbf, campo["name"]), "r", encoding="utf-8") as f:
+            indice = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+    if (indice.get("record_len") != encabezado["record_len"]
+            or indice.get("header_len") != encabezado["header_len"]
+            or indice.get("tipo") != campo["type"]
+            or indice.get("tam") != tam):
+        logging.info(f"Índice de fechas de {ruta_dbf} descartado: cambió la estructura")
+        return {}
+
+    vigentes = {
+        b: rango
+        for b, (rango, suma) in enumerate(zip(indice.get("bloques", []), indice.get("sumas", [])))
+        if b < len(sumas) and sumas[b] == suma
+    }
+    if len(vigentes) < len(indice.get("bloques", [])):
+        logging.info(
+            f"Índice de fechas de {ruta_dbf}: {len(indice['bloques']) - len(vigentes)} bloques cambiaron; se vuelven a leer"
+        )
+    if campo["type"] == "D":
+        return {b: None if r is None else [r[0].encode(), r[1].encode()] for b, r in vigentes.items()}
+    return vigentes
+
+
+def _guardar_indice(ruta_dbf: str, encabezado: dict, campo: dict, tam: int, bloques: list, sumas: list):
+    if campo["type"] == "D":
+        bloques = [None if b is None else [b[0].decode(), b[1].decode()] for b in bloques]
+    elif campo["type"] == "T":
+        bloques = [None if b is None else [int(b[0]), int(b[1])] for b in bloques]
+    indice = {
+        "record_len": encabezado["record_len"],
+        "header_len": encabezado["header_len"],
+        "tipo":       campo["type"],
+        "tam":        tam,
+        "sumas":      sumas,
+        "bloques":    bloques
+    }
+    ruta = _ruta_indice(ruta_dbf, campo["name"])
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(indice, f)
+    os.replace(tmp, ruta)
 
-def leer_dbf_como_dataframe(ruta_dbf: str, campo_fecha: str = None, fecha_inicio: str = None, fecha_fin: str = None):
+
+def _leer_ventana(
+    ruta_dbf: str,
+    encabezado: dict,
+    columnas: list,
+    campo: dict,
+    desde,
+    hasta,
+    indice_bloques: bool,
+    tam: int = REGISTROS_BLOQUE
+) -> pd.DataFrame:
+    """Recorre el DBF por bloques evaluando la fecha antes de decodificar."""
+    lo, hi = limites_fecha(campo, desde, hasta)
+    registros = abrir_registros(ruta_dbf, encabezado, columnas)
+    total = len(registros)
+
+    # CRC de cada bloque: una pasada de bytes, mucho más barata que decodificar
+    sumas    = sumas_bloques(ruta_dbf, encabezado, tam) if indice_bloques else []
+    indice   = _cargar_indice(ruta_dbf, encabezado, campo, tam, sumas) if indice_bloques else {}
+    nuevos   = {}
+    lotes    = []
+    saltados = 0
+    try:
+        for b, ini in enumerate(range(0, total, tam)):
+            if b in indice:
+                rango = indice[b]
+                if rango is None or rango[1] < lo or rango[0] > hi:
+                    saltados += 1
+                    continue
+
+            bloque = registros[ini : min(ini + tam, total)]
+            flags  = bloque["_flag"]
+            fin    = (flags == b"\x1a").nonzero()[0]
+            if fin.size:
+                bloque, flags = bloque[: fin[0]], flags[: fin[0]]
+
+            # Solo el campo de fecha; el resto del registro no se toca aún
+            llaves  = llaves_fecha(bloque[campo["name"]], campo)
+            validas = fechas_validas(llaves, campo)
+            if indice_bloques and b not in indice and len(bloque) == tam and not fin.size:
+                # El índice incluye los borrados por si se recuperan
+                presentes = np.sort(llaves[validas])
+                nuevos[b] = [presentes[0], presentes[-1]] if presentes.size else None
+
+            mascara = (flags == b" ") & validas & (llaves >= lo) & (llaves <= hi)
+            if mascara.any():
+                lotes.append(decodificar_registros(bloque[mascara], encabezado, columnas))
+            if fin.size:
+                break
+    finally:
+        del registros
+
+    if indice_bloques:
+        logging.info(f"{saltados} de {-(-total // tam)} bloques de {ruta_dbf} descartados por el índice de fechas")
+        if nuevos:
+            # Se guardan los bloques completos indexados de corrido desde el primero
+            rangos  = {**indice, **nuevos}
+            n       = next(b for b in range(len(rangos) + 1) if b not in rangos)
+            bloques = [rangos[b] for b in range(n)]
+            _guardar_indice(ruta_dbf, encabezado, campo, tam, bloques, sumas[:n])
+
+    if not lotes:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(lotes, ignore_index=True)
+
+
+def _filtros_snapshot(campo: dict, desde, hasta) -> list:
+    """Ventana [desde, hasta] como filtro de pyarrow (días completos en campos T)."""
+    if campo["type"] == "D":
+        return [(campo["name"], ">=", desde), (campo["name"], "<=", hasta)]
+    return [
+        (campo["name"], ">=", datetime.combine(desde, dtime.min)),
+        (campo["name"], "<", datetime.combine(hasta + timedelta(days=1), dtime.min))
+    ]
+
+
+def leer_dbf_como_dataframe(
+    ruta_dbf: str,
+    campo_fecha: str = None,
+    fecha_inicio: str = None,
+    fecha_fin: str = None,
+    columnas: list = None,
+    indice_bloques: bool = False,
+    usar_snapshot: bool = False
+):
     """
     Carga un archivo DBF como DataFrame y aplica filtro por fechas si se indica.
-    
+
     Args:
         ruta_dbf (str): Ruta al archivo .dbf
         campo_fecha (str): Nombre del campo de fecha para filtrar
         fecha_inicio (str): Fecha inicial (formato YYYY-MM-DD)
         fecha_fin (str): Fecha final (formato YYYY-MM-DD)
-    
+        columnas (list): Campos a leer (todos si no se indica)
+        indice_bloques (bool): Usar y mantener el índice min/max de fechas por bloque
+        usar_snapshot (bool): Leer del snapshot Parquet (etl/snapshot.py); sin
+            filtro de fechas, lo genera si no existe
+
     Returns:
         pd.DataFrame: DataFrame con los datos cargados y filtrados (si aplica)
     """
     if not os.path.exists(ruta_dbf):
         raise FileNotFoundError(f"No se encontró el archivo DBF: {ruta_dbf}")
 
-    tabla = DBF(ruta_dbf, load=True, encoding='latin1')
-    df = pd.DataFrame(iter(tabla))
+    encabezado = leer_encabezado(ruta_dbf)
+    encabezado["encoding"] = "latin1"
+    nombres  = [c["name"] for c in encabezado["campos"]]
+    columnas = [_nombre_campo(nombres, c) for c in columnas] if columnas else nombres
+
+    if campo_fecha and fecha_inicio:
+        campo_fecha = _nombre_campo(nombres, campo_fecha)
+        if campo_fecha not in columnas:
+            columnas = columnas + [campo_fecha]
+        campo = next(c for c in encabezado["campos"] if c["name"] == campo_fecha)
+        desde = pd.to_datetime(fecha_inicio).date()
+        hasta = pd.to_datetime(fecha_fin).date() if fecha_fin else datetime.today().date()
+        if usar_snapshot and campo["type"] in TIPOS_FECHA:
+            df = snapshot.leer(ruta_dbf, columnas, _filtros_snapshot(campo, desde, hasta), encoding='latin1')
+            if df is not None:
+                df[campo_fecha] = pd.to_datetime(df[campo_fecha], errors='coerce')
+                return df
+        if campo["type"] in TIPOS_FECHA and soporta_columnas(encabezado, columnas):
+            df = _leer_ventana(ruta_dbf, encabezado, columnas, campo, desde, hasta, indice_bloques)
+            df[campo_fecha] = pd.to_datetime(df[campo_fecha], errors='coerce')
+            return df
+
+    elif usar_snapshot:
+        df = snapshot.obtener(ruta_dbf, columnas, encoding='latin1')
+        if df is not None:
+            return df
+
+    # Sin filtro, o con tipos que el lector NumPy no cubre: dbfread (proyectado)
+    tabla = abrir_dbfread(ruta_dbf, columnas, encoding='latin1', ignore_missing_memofile=True)
+    df = pd.DataFrame.from_records(iter(tabla), columns=columnas)
 
     if campo_fecha and fecha_inicio:
         df[campo_fecha] = pd.to_datetime(df[campo_fecha], errors='coerce')
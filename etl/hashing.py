@@ -0,0 +1,167 @@
+# etl/hashing.py
+
+import hashlib
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Algoritmos disponibles para row_hash. sha256 es el histórico (64 hex);
+# fast64/fast128 usan el hash vectorizado de pandas (SipHash) con 16/32 hex.
+ALGORITMOS = ("sha256", "fast64", "fast128")
+ALGORITMO_DEFAULT = "sha256"
+
+_LONGITUDES = {64: "sha256", 16: "fast64", 32: "fast128"}
+_HASH_KEYS  = ("AlphaETL-rowhash", "AlphaETL-rowh128")
+_HEX        = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+# Tipos inferidos por pandas que se pueden convertir con astype(str)
+_INFERIDOS_DIRECTOS = {"string", "date", "datetime", "boolean", "integer", "empty"}
+
+
+def _norm(v) -> str:
+    """Normalización escalar; idéntica a la de calcular_hash_fila."""
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else str(v)
+    return str(v).strip()
+
+
+def _textos(valores) -> np.ndarray:
+    """Arreglo object de str (una llamada a str por valor, sin pasar por pandas)."""
+    out = np.empty(len(valores), dtype=object)
+    out[:] = list(map(str, valores))
+    return out
+
+
+def _por_valor_unico(valores: np.ndarray, normalizar) -> np.ndarray:
+    """
+    Aplica `normalizar` solo a los valores distintos y expande el resultado:
+    fechas, claves, importes y banderas de un DBF se repiten mucho.
+    """
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=False)
+    return normalizar(np.asarray(unicos))[codigos]
+
+
+def _texto_flotantes(valores: np.ndarray) -> np.ndarray:
+    # repr(float) == str(float) y evita el despacho genérico de str()
+    out = np.empty(len(valores), dtype=object)
+    out[:] = list(map(float.__repr__, valores.tolist()))
+    # Enteros representables en int64: se imprimen sin ".0"
+    integral = np.isfinite(valores) & (np.floor(valores) == valores)
+    enteros  = integral & (np.abs(valores) < 2**63)
+    if enteros.any():
+        out[enteros] = list(map(str, valores[enteros].astype(np.int64).tolist()))
+    grandes = integral & ~enteros
+    if grandes.any():
+        out[grandes] = [_norm(float(v)) for v in valores[grandes]]
+    return out
+
+
+def _texto_sin_espacios(valores: np.ndarray) -> np.ndarray:
+    out = np.empty(len(valores), dtype=object)
+    out[:] = [str(v).strip() for v in valores]
+    return out
+
+
+def normalizar_columna(serie: pd.Series) -> np.ndarray:
+    """
+    Normaliza una columna completa a texto (arreglo object de str) con la
+    misma semántica que calcular_hash_fila: None -> "", flotantes enteros
+    sin decimales y cadenas sin espacios al inicio/fin.
+    """
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return _por_valor_unico(serie.to_numpy(), lambda u: _textos(u.tolist()))
+
+    if pd.api.types.is_float_dtype(serie):
+        return _por_valor_unico(serie.to_numpy(dtype=np.float64), _texto_flotantes)
+
+    if pd.api.types.is_datetime64_dtype(serie):
+        # Equivalente a str(Timestamp) / str(NaT), que es lo que ve to_dict()
+        valores  = serie.to_numpy()
+        nat      = np.isnat(valores)
+        fraccion = (valores.astype("datetime64[us]") != valores.astype("datetime64[s]")) & ~nat
+        unidad   = "us" if fraccion.any() else "s"
+        out = np.char.replace(np.datetime_as_string(valores, unit=unidad), "T", " ").astype(object)
+        if unidad == "us":
+            # str(Timestamp) solo muestra microsegundos cuando existen
+            enteros = ~fraccion & ~nat
+            out[enteros] = [v[:19] for v in out[enteros]]
+        out[nat] = "NaT"
+        return out
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.map(str).to_numpy(dtype=object)
+
+    valores = serie.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(valores, skipna=True) not in _INFERIDOS_DIRECTOS:
+        return np.array([_norm(v) for v in valores], dtype=object)
+
+    nulos     = np.equal(valores, None)
+    # Faltantes que no son None (NaN de columnas string) se imprimen "nan"
+    faltantes = pd.isna(valores) & ~nulos
+    limpios   = valores.copy()
+    limpios[nulos]     = ""
+    limpios[faltantes] = "nan"
+    return _por_valor_unico(limpios, _texto_sin_espacios)
+
+
+def unir_columnas(columnas: List[np.ndarray], sep: str = "|") -> np.ndarray:
+    """Une fila a fila arreglos de texto ya normalizados, en una sola pasada."""
+    out = np.empty(len(columnas[0]), dtype=object)
+    out[:] = list(map(sep.join, zip(*columnas)))
+    return out
+
+
+def concatenar_columnas(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """Une las columnas normalizadas con "|" (solo las presentes en df)."""
+    presentes = [c for c in cols if c in df.columns]
+    if not presentes:
+        return np.full(len(df), "", dtype=object)
+    return unir_columnas([normalizar_columna(df[c]) for c in presentes])
+
+
+def _hex64(valores: np.ndarray) -> np.ndarray:
+    """Convierte uint64 a texto hexadecimal de 16 caracteres, sin bucles."""
+    shifts  = np.arange(60, -4, -4, dtype=np.uint64)
+    nibbles = (valores[:, None] >> shifts) & np.uint64(0xF)
+    chars   = _HEX[nibbles.astype(np.intp)]
+    return np.ascontiguousarray(chars).view("S16").ravel().astype("U16").astype(object)
+
+
+def hashear_texto(textos: np.ndarray, algoritmo: str = ALGORITMO_DEFAULT) -> np.ndarray:
+    """Aplica el algoritmo indicado a un arreglo de textos ya concatenados."""
+    if algoritmo == "sha256":
+        return np.array(
+            [hashlib.sha256(s.encode("utf-8")).hexdigest() for s in textos],
+            dtype=object
+        )
+    if algoritmo == "fast64":
+        return _hex64(pd.util.hash_array(textos, hash_key=_HASH_KEYS[0], categorize=False))
+    if algoritmo == "fast128":
+        alto = _hex64(pd.util.hash_array(textos, hash_key=_HASH_KEYS[0], categorize=False))
+        bajo = _hex64(pd.util.hash_array(textos, hash_key=_HASH_KEYS[1], categorize=False))
+        return alto + bajo
+    raise ValueError(f"Algoritmo de hash no soportado: {algoritmo!r} (opciones: {ALGORITMOS})")
+
+
+def calcular_hashes(
+    df: pd.DataFrame,
+    cols: List[str],
+    algoritmo: str = ALGORITMO_DEFAULT
+) -> np.ndarray:
+    """
+    Calcula row_hash para todo el DataFrame de una sola vez. Con "sha256"
+    el resultado es idéntico al de calcular_hash_fila fila por fila.
+    """
+    if len(df) == 0:
+        return np.array([], dtype=object)
+    return hashear_texto(concatenar_columnas(df, cols), algoritmo)
+
+
+def detectar_algoritmo(valor: str) -> str:
+    """Deduce con qué algoritmo se generó un row_hash guardado (por longitud)."""
+    if not valor or not isinstance(valor, str):
+        return None
+    return _LONGITUDES.get(len(valor))
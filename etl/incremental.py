@@ -0,0 +1,172 @@
+# etl/incremental.py
+#
+# Sincronización incremental de DBF.
+# - SYNC_MODE = "APPEND": para archivos que crecen por anexión. Se guarda el
+#   último registro físico procesado y una firma de los N registros previos;
+#   si la firma sigue igual solo se leen los registros nuevos a partir de
+#   header_len + recno * record_len.
+# - SYNC_MODE = "BLOCKS": para catálogos editados en sitio. El área de
+#   registros se divide en bloques de tamaño fijo con un checksum cada uno;
+#   solo se decodifican los bloques cuyo checksum cambió.
+
+import mmap
+import zlib
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+
+from etl.dbf_reader import leer_encabezado, leer_registros_crudos, registros_fisicos
+
+# Registros previos a la marca que se firman para detectar ediciones en la cola
+REGISTROS_FIRMA = 100
+# Cada cuántas ejecuciones incrementales se fuerza una conciliación completa
+CORRIDAS_ENTRE_COMPLETAS = 48
+# Registros por bloque en el modo BLOCKS
+REGISTROS_BLOQUE = 4096
+
+
+def firma_registros(dbf_path: str, encabezado: dict, inicio: int, fin: int) -> str:
+    """Firma (blake2b) de los bytes crudos de los registros [inicio, fin)."""
+    crudo = leer_registros_crudos(dbf_path, encabezado, inicio, fin)
+    return hashlib.blake2b(crudo, digest_size=16).hexdigest()
+
+
+def planear_cola(
+    dbf_path: str,
+    estado: Optional[dict],
+    corridas_max: int = CORRIDAS_ENTRE_COMPLETAS,
+    n_firma: int = REGISTROS_FIRMA
+) -> Tuple[int, int, str, str]:
+    """
+    Decide desde qué registro físico leer. Devuelve (inicio, fin, firma,
+    motivo); inicio = 0 significa conciliación completa. `firma` es la de
+    los registros [fin - n_firma, fin) tal como estaban al planear: es la
+    que se guarda al terminar, no la del archivo después de la carga.
+    """
+    encabezado = leer_encabezado(dbf_path)
+    fin   = registros_fisicos(dbf_path, encabezado)
+    firma = firma_registros(dbf_path, encabezado, fin - n_firma, fin)
+
+    if not estado:
+        return 0, fin, firma, "sin marca previa"
+    if estado.get("record_len") != encabezado["record_len"] or estado.get("header_len") != encabezado["header_len"]:
+        return 0, fin, firma, "cambió la estructura del DBF"
+    if estado.get("corridas", 0) >= corridas_max:
+        return 0, fin, firma, f"conciliación periódica ({corridas_max} corridas incrementales)"
+
+    recno = estado.get("recno", 0)
+    if fin < recno:
+        return 0, fin, firma, f"el DBF tiene menos registros ({fin}) que la marca ({recno})"
+
+    previa = firma if recno == fin else firma_registros(dbf_path, encabezado, recno - n_firma, recno)
+    if previa != estado.get("firma"):
+        return 0, fin, firma, "los últimos registros procesados fueron modificados"
+
+    return recno, fin, firma, f"cola desde el registro {recno}"
+
+
+def nuevo_estado_cola(
+    dbf_path: str,
+    fin: int,
+    firma: str,
+    completa: bool,
+    estado_previo: Optional[dict] = None
+) -> dict:
+    """Estado a guardar tras una ejecución exitosa que leyó hasta `fin`
+    (`firma`: la calculada por planear_cola)."""
+    encabezado = leer_encabezado(dbf_path)
+    corridas = 0 if completa else (estado_previo or {}).get("corridas", 0) + 1
+    estado = {
+        "recno":      fin,
+        "firma":      firma,
+        "record_len": encabezado["record_len"],
+        "header_len": encabezado["header_len"],
+        "corridas":   corridas
+    }
+    logging.debug(f"Nueva marca de cola: {estado}")
+    return estado
+
+
+def sumas_bloques(dbf_path: str, encabezado: dict, tam: int = REGISTROS_BLOQUE) -> List[int]:
+    """CRC32 de los bytes crudos de cada bloque de `tam` registros físicos."""
+    n = registros_fisicos(dbf_path, encabezado)
+    if n == 0:
+        return []
+    inicio_datos = encabezado["header_len"]
+    paso = tam * encabezado["record_len"]
+    fin_datos = inicio_datos + n * encabezado["record_len"]
+    sumas = []
+    with open(dbf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        vista = memoryview(mm)
+        try:
+            for pos in range(inicio_datos, fin_datos, paso):
+                sumas.append(zlib.crc32(vista[pos : min(pos + paso, fin_datos)]))
+        finally:
+            vista.release()
+    return sumas
+
+
+def _agrupar_rangos(bloques: List[int], tam: int, fin: int) -> List[Tuple[int, int]]:
+    """Une bloques consecutivos en rangos [inicio, fin) de registros físicos."""
+    rangos = []
+    for b in bloques:
+        ini, fin_b = b * tam, min((b + 1) * tam, fin)
+        if rangos and rangos[-1][1] == ini:
+            rangos[-1] = (rangos[-1][0], fin_b)
+        else:
+            rangos.append((ini, fin_b))
+    return rangos
+
+
+def planear_bloques(
+    dbf_path: str,
+    estado: Optional[dict],
+    tam: int = REGISTROS_BLOQUE,
+    corridas_max: int = CORRIDAS_ENTRE_COMPLETAS
+) -> Tuple[List[Tuple[int, int]], List[int], bool, str]:
+    """
+    Compara los checksums actuales con los guardados.
+    Devuelve (rangos a leer, sumas actuales, completa, motivo).
+    """
+    encabezado = leer_encabezado(dbf_path)
+    fin   = registros_fisicos(dbf_path, encabezado)
+    sumas = sumas_bloques(dbf_path, encabezado, tam)
+    completo = [(0, fin)]
+
+    if not estado:
+        return completo, sumas, True, "sin checksums previos"
+    if (estado.get("record_len") != encabezado["record_len"]
+            or estado.get("header_len") != encabezado["header_len"]
+            or estado.get("tam") != tam):
+        return completo, sumas, True, "cambió la estructura del DBF o el tamaño de bloque"
+    if estado.get("corridas", 0) >= corridas_max:
+        return completo, sumas, True, f"conciliación periódica ({corridas_max} corridas incrementales)"
+
+    previas = estado.get("sumas", [])
+    if len(sumas) < len(previas):
+        return completo, sumas, True, "el DBF tiene menos bloques que en la última ejecución"
+
+    cambiados = [
+        i for i, s in enumerate(sumas)
+        if i >= len(previas) or previas[i] != s
+    ]
+    rangos = _agrupar_rangos(cambiados, tam, fin)
+    return rangos, sumas, False, f"{len(cambiados)} de {len(sumas)} bloques cambiaron"
+
+
+def nuevo_estado_bloques(
+    dbf_path: str,
+    sumas: List[int],
+    completa: bool,
+    estado_previo: Optional[dict] = None,
+    tam: int = REGISTROS_BLOQUE
+) -> dict:
+    """Estado a guardar tras una ejecución exitosa en modo BLOCKS."""
+    encabezado = leer_encabezado(dbf_path)
+    return {
+        "tam":        tam,
+        "sumas":      sumas,
+        "record_len": encabezado["record_len"],
+        "header_len": encabezado["header_len"],
+        "corridas":   0 if completa else (estado_previo or {}).get("corridas", 0) + 1
+    }
@@ -0,0 +1,222 @@
+# etl/key_index.py
+#
+# Índice local del último estado sincronizado llave -> row_hash por entrada
+# (tablas key_hash* dentro del almacén de etl/state.py). Evita traer por la
+# red toda la tabla destino en cada ejecución: solo se hace un SELECT
+# completo cuando el conteo o el checksum remoto no coinciden con los locales.
+
+import zlib
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from etl import state
+from etl.diff import CLAVE, preparar_destino
+
+# aplicar_cambios lee y reescribe el checksum: se serializa entre hilos de upsert
+_LOCK_CAMBIOS = threading.Lock()
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS key_hash (
+        entry    TEXT NOT NULL,
+        clave    TEXT NOT NULL,
+        row_hash TEXT,
+        PRIMARY KEY (entry, clave)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS key_hash_meta (
+        entry       TEXT PRIMARY KEY,
+        filas       INTEGER NOT NULL,
+        checksum    INTEGER NOT NULL,
+        actualizado TEXT
+    )
+    """,
+)
+
+
+def _conectar() -> sqlite3.Connection:
+    conn = state.conectar()
+    for ddl in _DDL:
+        conn.execute(ddl)
+    return conn
+
+
+def _crc(valor) -> int:
+    # CRC32(NULL) es NULL y BIT_XOR lo ignora: None/NaN (filas SOFT) aportan 0
+    if not isinstance(valor, str):
+        return 0
+    return zlib.crc32(valor.encode("utf-8"))
+
+
+def checksum_hashes(hashes) -> int:
+    """
+    XOR de CRC32(row_hash); equivale a BIT_XOR(CRC32(row_hash)) en MySQL,
+    que omite los NULL (None o NaN aquí).
+    """
+    acc = 0
+    for h in hashes:
+        acc ^= _crc(h)
+    return acc
+
+
+def estado_local(entry: str) -> Optional[Tuple[int, int]]:
+    """(filas, checksum) del índice local, o None si no existe."""
+    with closing(_conectar()) as conn:
+        row = conn.execute(
+            "SELECT filas, checksum FROM key_hash_meta WHERE entry = ?", (entry,)
+        ).fetchone()
+    return tuple(row) if row else None
+
+
+def estado_remoto(engine, table_name: str, hash_field: str) -> Optional[Tuple[int, int]]:
+    """
+    (filas, checksum) calculados en el servidor con una sola consulta.
+    Devuelve None si el motor no es MySQL/MariaDB.
+    """
+    if engine.dialect.name != "mysql":
+        return None
+    sql = text(
+        f"SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(`{hash_field}`)), 0) FROM `{table_name}`"
+    )
+    with engine.connect() as conn:
+        filas, checksum = conn.execute(sql).one()
+    return int(filas), int(checksum)
+
+
+def cargar(entry: str, hash_field: str) -> pd.DataFrame:
+    """Estado local como DataFrame listo para etl.diff (indexado por CLAVE)."""
+    with closing(_conectar()) as conn:
+        rows = conn.execute(
+            "SELECT clave, row_hash FROM key_hash WHERE entry = ?", (entry,)
+        ).fetchall()
+    destino = pd.DataFrame.from_records(rows, columns=[CLAVE, hash_field])
+    return preparar_destino(destino, [], hash_field)
+
+
+def reemplazar(entry: str, destino: pd.DataFrame, hash_field: str):
+    """Reescribe por completo el índice local de la entrada (tras un rescan)."""
+    claves = destino[CLAVE].to_numpy(dtype=object)
+    hashes = [h if isinstance(h, str) else None for h in destino[hash_field].to_numpy(dtype=object)]
+    with closing(_conectar()) as conn, conn:
+        conn.execute("DELETE FROM key_hash WHERE entry = ?", (entry,))
+        conn.executemany(
+            "INSERT INTO key_hash (entry, clave, row_hash) VALUES (?, ?, ?)",
+            zip([entry] * len(claves), claves, hashes)
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO key_hash_meta (entry, filas, checksum, actualizado) VALUES (?, ?, ?, ?)",
+            (entry, len(claves), checksum_hashes(hashes), datetime.now().isoformat(timespec="seconds"))
+        )
+
+
+def aplicar_cambios(entry: str, claves: np.ndarray, hashes: np.ndarray):
+    """
+    Registra en una sola transacción las llaves recién sincronizadas con su
+    nuevo row_hash y ajusta conteo y checksum de forma incremental.
+    """
+    if len(claves) == 0:
+        return
+    with _LOCK_CAMBIOS, closing(_conectar()) as conn, conn:
+        # Toma el bloqueo de escritura antes de leer el checksum (otros procesos)
+        conn.execute("BEGIN IMMEDIATE")
+        meta = conn.execute(
+            "SELECT filas, checksum FROM key_hash_meta WHERE entry = ?", (entry,)
+        ).fetchone()
+        if meta is None:
+            # Sin estado base no hay checksum confiable; se reconstruye luego
+            return
+        filas, checksum = meta
+
+        previos = {}
+        claves  = list(claves)
+        hashes  = [h if isinstance(h, str) else None for h in hashes]
+        for i in range(0, len(claves), 500):
+            parte = claves[i : i + 500]
+            marcas = ",".join("?" * len(parte))
+            previos.update(conn.execute(
+                f"SELECT clave, row_hash FROM key_hash WHERE entry = ? AND clave IN ({marcas})",
+                [entry] + parte
+            ).fetchall())
+
+        for c, h in zip(claves, hashes):
+            if c in previos:
+                checksum ^= _crc(previos[c])
+            else:
+                filas += 1
+            checksum ^= _crc(h)
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO key_hash (entry, clave, row_hash) VALUES (?, ?, ?)",
+            zip([entry] * len(claves), claves, hashes)
+        )
+        conn.execute(
+            "UPDATE key_hash_meta SET filas = ?, checksum = ?, actualizado = ? WHERE entry = ?",
+            (filas, checksum, datetime.now().isoformat(timespec="seconds"), entry)
+        )
+
+
+def eliminar(entry: str, claves: np.ndarray):
+    """Quita llaves borradas en destino y ajusta conteo y checksum."""
+    if len(claves) == 0:
+        return
+    with _LOCK_CAMBIOS, closing(_conectar()) as conn, conn:
+        # Toma el bloqueo de escritura antes de leer el checksum (otros procesos)
+        conn.execute("BEGIN IMMEDIATE")
+        meta = conn.execute(
+            "SELECT filas, checksum FROM key_hash_meta WHERE entry = ?", (entry,)
+        ).fetchone()
+        if meta is None:
+            return
+        filas, checksum = meta
+
+        claves = list(claves)
+        for i in range(0, len(claves), 500):
+            parte = claves[i : i + 500]
+            marcas = ",".join("?" * len(parte))
+            for _, h in conn.execute(
+                f"SELECT clave, row_hash FROM key_hash WHERE entry = ? AND clave IN ({marcas})",
+                [entry] + parte
+            ).fetchall():
+                checksum ^= _crc(h)
+                filas -= 1
+            conn.execute(
+                f"DELETE FROM key_hash WHERE entry = ? AND clave IN ({marcas})", [entry] + parte
+            )
+        conn.execute(
+            "UPDATE key_hash_meta SET filas = ?, checksum = ?, actualizado = ? WHERE entry = ?",
+            (filas, checksum, datetime.now().isoformat(timespec="seconds"), entry)
+        )
+
+
+def invalidar(entry: str):
+    """Descarta el índice local; la siguiente ejecución hará un rescan."""
+    with closing(_conectar()) as conn, conn:
+        conn.execute("DELETE FROM key_hash WHERE entry = ?", (entry,))
+        conn.execute("DELETE FROM key_hash_meta WHERE entry = ?", (entry,))
+
+
+def cargar_o_reconciliar(entry: str, engine, tbl, key_cols, hash_field, rescan) -> pd.DataFrame:
+    """
+    Usa el índice local si conteo y checksum coinciden con MySQL; si no
+    (o si no hay índice), ejecuta `rescan()` y reconstruye el índice.
+    """
+    local = estado_local(entry)
+    if local is not None:
+        remoto = estado_remoto(engine, tbl.name, hash_field)
+        if remoto == local:
+            logging.info(f"Índice local de {entry} vigente ({local[0]} llaves); sin rescan remoto")
+            return cargar(entry, hash_field)
+        logging.info(f"Índice local de {entry} desfasado (local={local}, remoto={remoto}); rescan")
+
+    destino = rescan()
+    reemplazar(entry, destino, hash_field)
+    return destino
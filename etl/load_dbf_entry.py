@@ -2,10 +2,11 @@
 
 import os
 import pandas as pd
-from dbfread import DBF
-from sqlalchemy import create_engine
 import json
 
+from etl import db, snapshot
+from etl.dbf_reader import abrir_dbfread
+
 CONFIG_PATH = "config/config.json"
 
 def cargar_config():
@@ -13,11 +14,13 @@ def cargar_config():
         return json.load(f)
 
 def dbf_to_dataframe(path, fields=None):
-    table = DBF(path, encoding='latin1', load=True)
-    df = pd.DataFrame(iter(table))
-    if fields:
-        df = df[fields]
-    return df
+    # Snapshot Parquet vigente, si existe (etl/snapshot.py)
+    df = snapshot.leer(path, fields, encoding='latin1')
+    if df is not None:
+        return df
+    # Solo se decodifican los campos pedidos
+    table = abrir_dbfread(path, fields, encoding='latin1')
+    return pd.DataFrame.from_records(iter(table), columns=fields or table.field_names)
 
 def map_columns(df, columns_map):
     renamed = {}
@@ -26,7 +29,7 @@ def map_columns(df, columns_map):
     return df.rename(columns=renamed)
 
 def cargar_df_a_mysql(df, tabla_destino, mysql_uri):
-    engine = create_engine(mysql_uri)
+    engine = db.obtener_engine(mysql_uri)
     with engine.begin() as conn:
         df.to_sql(tabla_destino, con=conn, if_exists="replace", index=False)
     print(f"Datos insertados en {tabla_destino} correctamente.")
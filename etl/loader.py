@@ -0,0 +1,295 @@
+# etl/loader.py
+#
+# Carga masiva a MySQL para el upsert de filas nuevas/cambiadas.
+# El INSERT ... ON DUPLICATE KEY UPDATE se arma una sola vez por entrada y se
+# envía con executemany de pymysql, que reescribe el lote como un INSERT
+# multi-fila (VALUES (...), (...), ...) partido según max_allowed_packet.
+#
+# Para cargas iniciales y conjuntos de cambios grandes (LOAD_MODE = "INFILE"
+# o "AUTO" sobre el umbral) las filas se escriben a un TSV temporal, se cargan
+# con LOAD DATA LOCAL INFILE a una tabla de staging y se fusionan con un solo
+# INSERT ... SELECT ... ON DUPLICATE KEY UPDATE.
+
+import os
+import csv
+import time
+import logging
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import Table, text
+
+from etl import db, lotes, telemetria
+
+# Límite superior de bytes por sentencia aunque el servidor acepte más
+MAX_BYTES_SENTENCIA = 16 * 1024 * 1024
+# Margen para encabezados del protocolo y el texto del ON DUPLICATE
+_MARGEN_PAQUETE = 64 * 1024
+
+MODOS_CARGA = ("UPSERT", "INFILE", "AUTO")
+# Con LOAD_MODE = "AUTO", filas por lote a partir de las cuales se usa INFILE
+UMBRAL_INFILE = 5000
+# LOAD DATA LOCAL deshabilitado (1148: sin soporte; 3948: local_infile en OFF)
+ERRORES_SIN_INFILE = (1148, 3948)
+
+_NULO_TSV = "\\N"
+
+
+def _quote(nombre: str) -> str:
+    return "`" + nombre.replace("`", "``") + "`"
+
+
+def sql_upsert(tabla: str, columnas: List[str], key_cols: List[str]) -> str:
+    """INSERT ... VALUES (%s, ...) ON DUPLICATE KEY UPDATE en formato pymysql."""
+    cols   = ", ".join(_quote(c) for c in columnas)
+    marcas = ", ".join(["%s"] * len(columnas))
+    upd    = [c for c in columnas if c not in key_cols] or columnas[:1]
+    sets   = ", ".join(f"{_quote(c)} = VALUES({_quote(c)})" for c in upd)
+    return f"INSERT INTO {_quote(tabla)} ({cols}) VALUES ({marcas}) ON DUPLICATE KEY UPDATE {sets}"
+
+
+def filas_como_tuplas(df: pd.DataFrame, columnas: List[str]) -> List[tuple]:
+    """Filas como tuplas de tipos Python; NaN/NaT pasan a None."""
+    datos = df[columnas].astype(object)
+    datos = datos.where(df[columnas].notna(), None)
+    return list(datos.itertuples(index=False, name=None))
+
+
+def sql_merge_staging(tabla: str, staging: str, columnas: List[str], key_cols: List[str]) -> str:
+    """Fusión set-based de la tabla de staging hacia la tabla destino."""
+    cols = ", ".join(_quote(c) for c in columnas)
+    upd  = [c for c in columnas if c not in key_cols] or columnas[:1]
+    sets = ", ".join(f"{_quote(c)} = VALUES({_quote(c)})" for c in upd)
+    return (
+        f"INSERT INTO {_quote(tabla)} ({cols}) "
+        f"SELECT {cols} FROM {_quote(staging)} "
+        f"ON DUPLICATE KEY UPDATE {sets}"
+    )
+
+
+def _campo_tsv(serie: pd.Series) -> pd.Series:
+    """Columna como texto en el formato por defecto de LOAD DATA (\\N = NULL)."""
+    nulos = serie.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(serie):
+        txt = serie.map({True: "1", False: "0"}).astype(object)
+    elif pd.api.types.infer_dtype(serie, skipna=True) == "boolean":
+        txt = serie.map(lambda v: "1" if v else "0").astype(object)
+    else:
+        txt = serie.astype(str).astype(object)
+        txt = (
+            txt.str.replace("\\", "\\\\", regex=False)
+               .str.replace("\t", "\\t", regex=False)
+               .str.replace("\n", "\\n", regex=False)
+               .str.replace("\r", "\\r", regex=False)
+        )
+    txt[nulos] = _NULO_TSV
+    return txt
+
+
+def escribir_tsv(df: pd.DataFrame, columnas: List[str], ruta: str):
+    """Escribe `df` como TSV (utf-8, sin encabezado) listo para LOAD DATA."""
+    datos = pd.DataFrame({c: _campo_tsv(df[c]) for c in columnas}, columns=columnas)
+    datos.to_csv(
+        ruta, sep="\t", header=False, index=False, encoding="utf-8",
+        quoting=csv.QUOTE_NONE, lineterminator="\n"
+    )
+
+
+def max_allowed_packet(engine) -> Optional[int]:
+    """Valor de @@max_allowed_packet del servidor (None si no se puede leer)."""
+    try:
+        with engine.connect() as conn:
+            return int(conn.execute(text("SELECT @@max_allowed_packet")).scalar())
+    except Exception as e:
+        logging.warning(f"No se pudo leer max_allowed_packet: {e}")
+        return None
+
+
+class CargadorMasivo:
+    """
+    Upsert masivo para una tabla ya reflejada. Se crea una vez por entrada
+    y se reutiliza en todos los lotes de la ejecución.
+
+    `filas_por_commit` agrupa transacciones: cada N filas se hace COMMIT
+    (0 = una sola transacción por llamada a upsert).
+
+    `modo` elige la vía de carga: "UPSERT" (INSERT multi-fila), "INFILE"
+    (LOAD DATA LOCAL INFILE + merge) o "AUTO" (INFILE desde `umbral_infile`
+    filas por envío; ver filas_por_envio).
+
+    `ajuste` (etl.lotes.TamanoAdaptativo) reemplaza `filas_por_commit` por un
+    tamaño medido lote a lote; los lotes que fallan por bloqueo o paquete se
+    reintentan más chicos.
+    """
+
+    def __init__(
+        self,
+        engine,
+        tbl: Table,
+        key_cols: List[str],
+        filas_por_commit: int = 10000,
+        max_bytes: Optional[int] = None,
+        modo: str = "UPSERT",
+        umbral_infile: int = UMBRAL_INFILE,
+        ajuste=None
+    ):
+        if modo not in MODOS_CARGA:
+            raise ValueError(f"LOAD_MODE no soportado: {modo!r} (opciones: {MODOS_CARGA})")
+        self.engine   = engine
+        self.tbl      = tbl
+        self.key_cols = key_cols
+        self.filas_por_commit = filas_por_commit
+        self.modo     = modo
+        self.umbral_infile = umbral_infile
+        self.ajuste   = ajuste
+        paquete = max_bytes or max_allowed_packet(engine) or MAX_BYTES_SENTENCIA
+        self.max_bytes = max(_MARGEN_PAQUETE, min(paquete - _MARGEN_PAQUETE, MAX_BYTES_SENTENCIA))
+        self._sql = {}
+        self._engine_infile = None
+
+    def _sentencia(self, columnas: Tuple[str, ...]) -> str:
+        if columnas not in self._sql:
+            self._sql[columnas] = sql_upsert(self.tbl.name, list(columnas), self.key_cols)
+        return self._sql[columnas]
+
+    def filas_por_envio(self) -> int:
+        """
+        Filas que conviene juntar antes de cada upsert (etl.lotes.Acumulador):
+        el tamaño adaptativo o `filas_por_commit`, para que COMMIT_ROWS mayor
+        que CHUNK_SIZE agrupe varios lotes leídos en una transacción. En
+        "AUTO" al menos `umbral_infile`, que así se compara contra las filas
+        acumuladas y no contra un solo lote leído.
+        """
+        filas = self.ajuste.tamano() if self.ajuste else self.filas_por_commit
+        if self.modo == "AUTO":
+            # Se junta al menos el umbral: usar_infile decide con lo acumulado
+            filas = max(filas, self.umbral_infile)
+        return filas
+
+    def usar_infile(self, filas: int) -> bool:
+        if self.modo == "INFILE":
+            return True
+        return self.modo == "AUTO" and filas >= self.umbral_infile
+
+    def upsert(self, df: pd.DataFrame, on_chunk: Callable[[int], None] = None) -> int:
+        """Inserta/actualiza `df`; `on_chunk` recibe las filas acumuladas tras cada COMMIT."""
+        if df.empty:
+            return 0
+        columnas = tuple(c.name for c in self.tbl.columns if c.name in df.columns)
+        if self.usar_infile(len(df)):
+            try:
+                return self.upsert_infile(df, columnas, on_chunk)
+            except Exception as e:
+                # Solo sin local_infile se sigue con INSERT multi-fila el resto de la corrida;
+                # cualquier otro error (bloqueos, conexión, datos) se propaga
+                if lotes.codigo_error(e) not in ERRORES_SIN_INFILE:
+                    raise
+                logging.warning(f"LOAD DATA LOCAL INFILE no disponible para {self.tbl.name} ({e}); se usa UPSERT")
+                self.modo = "UPSERT"
+        return self.upsert_valores(df, columnas, on_chunk)
+
+    def upsert_valores(self, df: pd.DataFrame, columnas: Tuple[str, ...], on_chunk=None) -> int:
+        """INSERT multi-fila vía executemany, con COMMIT cada `filas_por_commit` (o lote adaptativo)."""
+        sql      = self._sentencia(columnas)
+        filas    = filas_como_tuplas(df, list(columnas))
+        if self.ajuste:
+            self.ajuste.calibrar(filas)
+        paso     = self.filas_por_commit or len(filas)
+
+        raw = self.engine.raw_connection()
+        try:
+            i = 0
+            while i < len(filas):
+                if self.ajuste:
+                    paso = self.ajuste.tamano()
+                lote = filas[i : i + paso]
+                cur  = raw.cursor()
+                # pymysql parte el INSERT multi-fila en sentencias de hasta max_stmt_length bytes
+                cur.max_stmt_length = self.max_bytes
+                t0 = time.perf_counter()
+                try:
+                    cur.executemany(sql, lote)
+                    # Conexión cruda: los eventos del engine no la ven, se cuenta aquí
+                    telemetria.contar("round_trips", 2)
+                    with telemetria.medir("commit", len(lote)):
+                        raw.commit()
+                except Exception as e:
+                    if not (self.ajuste and self.ajuste.retroceder(e)):
+                        raise
+                    telemetria.contar("reintentos")
+                    # La conexión pudo quedar cortada (2006/2013): se descarta y se reintenta el lote
+                    raw.invalidate()
+                    raw = self.engine.raw_connection()
+                    continue
+                finally:
+                    cur.close()
+                if self.ajuste:
+                    self.ajuste.registrar(len(lote), time.perf_counter() - t0)
+                i += len(lote)
+                if on_chunk:
+                    on_chunk(i)
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        return len(filas)
+
+    def upsert_infile(self, df: pd.DataFrame, columnas: Tuple[str, ...], on_chunk=None) -> int:
+        """
+        TSV temporal -> LOAD DATA LOCAL INFILE a una tabla temporal de staging
+        -> INSERT ... SELECT ... ON DUPLICATE KEY UPDATE, en una transacción.
+        """
+        if self._engine_infile is None:
+            # local_infile solo se puede habilitar al abrir la conexión
+            self._engine_infile = db.obtener_engine(self.engine.url, local_infile=True)
+        staging = f"_stg_{self.tbl.name}_{os.getpid()}"
+        cols    = ", ".join(_quote(c) for c in columnas)
+
+        fd, ruta = tempfile.mkstemp(prefix="alphaetl_", suffix=".tsv")
+        os.close(fd)
+        try:
+            escribir_tsv(df, list(columnas), ruta)
+            ruta_sql = ruta.replace("\\", "/").replace("'", "\\'")
+            with self._engine_infile.begin() as conn:
+                conn.exec_driver_sql(
+                    f"CREATE TEMPORARY TABLE IF NOT EXISTS {_quote(staging)} LIKE {_quote(self.tbl.name)}"
+                )
+                conn.exec_driver_sql(f"DELETE FROM {_quote(staging)}")
+                conn.exec_driver_sql(
+                    f"LOAD DATA LOCAL INFILE '{ruta_sql}' INTO TABLE {_quote(staging)} "
+                    "CHARACTER SET utf8mb4 "
+                    "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                    f"LINES TERMINATED BY '\\n' ({cols})"
+                )
+                conn.exec_driver_sql(
+                    sql_merge_staging(self.tbl.name, staging, list(columnas), self.key_cols)
+                )
+                conn.exec_driver_sql(f"DROP TEMPORARY TABLE {_quote(staging)}")
+        finally:
+            os.remove(ruta)
+        if on_chunk:
+            on_chunk(len(df))
+        return len(df)
+
+    def cerrar(self):
+        """Sin recursos propios (usa el pool del engine); simetría con CargadorAsync."""
+
+
+def crear_cargador(
+    engine,
+    tbl: Table,
+    key_cols: List[str],
+    filas_por_commit: int = 10000,
+    modo: str = "UPSERT",
+    umbral_infile: int = UMBRAL_INFILE,
+    ajuste=None
+) -> Optional[CargadorMasivo]:
+    """CargadorMasivo si el driver es pymysql; None para usar el upsert genérico."""
+    if engine.dialect.name != "mysql" or engine.dialect.driver != "pymysql":
+        return None
+    return CargadorMasivo(
+        engine, tbl, key_cols, filas_por_commit,
+        modo=(modo or "UPSERT").upper(), umbral_infile=umbral_infile, ajuste=ajuste
+    )
@@ -0,0 +1,210 @@
+# etl/lotes.py
+#
+# Tamaño de lote adaptativo para el upsert (ADAPTIVE_CHUNK en config.json o
+# por entrada). El primer tamaño sale de un presupuesto de bytes por lote y
+# del ancho medio de las filas; luego se mide la latencia y las filas/s de
+# cada lote y el tamaño crece o se reduce dentro de [mínimo, máximo]. Ante
+# lock wait timeout, deadlock o errores de tamaño de paquete el lote se
+# reduce a la mitad y se reintenta.
+#
+# La lectura entrega a lo sumo CHUNK_SIZE registros por lote y tras el diff
+# quedan menos; Acumulador junta esos resultados hasta el tamaño de envío
+# (el adaptativo u otro) para que cada upsert reciba lotes completos.
+
+import time
+import logging
+import threading
+from typing import Callable, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Presupuesto inicial de bytes (SQL) por lote
+BYTES_OBJETIVO = 4 * 1024 * 1024
+MIN_FILAS = 100
+MAX_FILAS = 50_000
+# Latencia por lote que se busca (segundos): por encima se reduce
+LATENCIA_OBJETIVO = 2.0
+# Reintentos seguidos de un mismo lote antes de propagar el error
+REINTENTOS = 5
+
+_CRECIMIENTO = 1.5
+# Errores MySQL que reducen el lote: lock wait timeout, deadlock,
+# paquete demasiado grande y conexión cortada (típico al exceder el paquete)
+_ERRORES_BLOQUEO = {1205, 1213}
+_ERRORES_PAQUETE = {1153, 1301, 2006, 2013}
+
+
+def codigo_error(error: Exception) -> Optional[int]:
+    """Código de error MySQL de una excepción de pymysql o SQLAlchemy."""
+    orig = getattr(error, "orig", None) or error
+    args = getattr(orig, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def bytes_por_fila(filas: Iterable[tuple], muestra: int = 1000) -> float:
+    """Estimación del tamaño de cada fila como literal SQL."""
+    total = n = 0
+    for fila in filas:
+        total += sum(len(str(v)) + 3 for v in fila) + 4
+        n += 1
+        if n >= muestra:
+            break
+    return total / n if n else 0.0
+
+
+class TamanoAdaptativo:
+    """
+    Controlador de tamaño de lote, compartido por los escritores de una
+    entrada (seguro entre hilos).
+    """
+
+    def __init__(
+        self,
+        bytes_objetivo: int = BYTES_OBJETIVO,
+        minimo: int = MIN_FILAS,
+        maximo: int = MAX_FILAS,
+        latencia_objetivo: float = LATENCIA_OBJETIVO,
+        reintentos: int = REINTENTOS
+    ):
+        self.bytes_objetivo    = bytes_objetivo
+        self.minimo            = max(1, minimo)
+        self.maximo            = max(self.minimo, maximo)
+        self.latencia_objetivo = latencia_objetivo
+        self.reintentos        = reintentos
+        self.actual: Optional[int] = None
+        self._mejor  = (0, 0.0)   # (tamaño, filas/s)
+        self._fallos = 0
+        self._usados = {}         # tamaño -> filas enviadas con él
+        self._lock   = threading.Lock()
+
+    def _acotar(self, filas: float) -> int:
+        return int(min(self.maximo, max(self.minimo, filas)))
+
+    def calibrar(self, filas: Iterable[tuple]):
+        """Fija el tamaño inicial con el presupuesto de bytes (solo la primera vez)."""
+        with self._lock:
+            if self.actual is not None:
+                return
+            ancho = bytes_por_fila(filas)
+            self.actual = self._acotar(self.bytes_objetivo / ancho if ancho else self.maximo)
+            logging.info(f"Lote adaptativo: ~{ancho:.0f} bytes/fila, tamaño inicial {self.actual}")
+
+    def tamano(self) -> int:
+        with self._lock:
+            return self.actual or self.minimo
+
+    def registrar(self, filas: int, segundos: float):
+        """Ajusta el tamaño tras un lote exitoso de `filas` en `segundos`."""
+        with self._lock:
+            self._fallos = 0
+            self._usados[filas] = self._usados.get(filas, 0) + filas
+            if filas < (self.actual or 0):
+                # Último lote parcial: no es representativo
+                return
+            tasa = filas / max(segundos, 1e-6)
+            mejor_tam, mejor_tasa = self._mejor
+            if tasa >= mejor_tasa:
+                self._mejor = (filas, tasa)
+
+            if segundos > self.latencia_objetivo:
+                nuevo = self.actual * self.latencia_objetivo / segundos
+            elif filas > mejor_tam and tasa < 0.9 * mejor_tasa:
+                # Crecer ya no mejora el rendimiento: se vuelve al mejor tamaño
+                nuevo = mejor_tam
+            elif segundos < self.latencia_objetivo / 2:
+                nuevo = self.actual * _CRECIMIENTO
+            else:
+                return
+            anterior, self.actual = self.actual, self._acotar(nuevo)
+            if self.actual != anterior:
+                logging.debug(
+                    f"Lote adaptativo: {anterior} -> {self.actual} ({segundos:.2f}s, {tasa:.0f} filas/s)"
+                )
+
+    def retroceder(self, error: Exception) -> bool:
+        """
+        Reduce el lote a la mitad si el error es de bloqueo o de tamaño de
+        paquete. Devuelve True si se debe reintentar el lote.
+        """
+        codigo = codigo_error(error)
+        paquete = codigo in _ERRORES_PAQUETE or "max_allowed_packet" in str(error)
+        if not paquete and codigo not in _ERRORES_BLOQUEO:
+            return False
+        with self._lock:
+            self._fallos += 1
+            if self._fallos > self.reintentos:
+                return False
+            anterior    = self.actual or self.minimo
+            self.actual = self._acotar(anterior / 2)
+            if paquete:
+                # El techo baja para no volver a crecer hasta el tamaño que falló
+                self.maximo = max(self.minimo, min(self.maximo, anterior - 1))
+            espera = 0.0 if paquete else 0.5 * 2 ** (self._fallos - 1)
+        logging.warning(
+            f"Lote de {anterior} filas falló ({codigo or error}); reintento {self._fallos} con {self.actual}"
+        )
+        if espera:
+            time.sleep(espera)
+        return True
+
+    def representativo(self) -> int:
+        """Tamaño con el que se envió la mayor parte de las filas (para tbl_sync_log)."""
+        with self._lock:
+            if not self._usados:
+                return self.actual or 0
+            return max(self._usados.items(), key=lambda t: t[1])[0]
+
+
+class Acumulador:
+    """
+    Junta (a sincronizar, a migrar) de varios lotes leídos y los entrega en
+    múltiplos exactos de `objetivo()` filas; el resto espera al siguiente
+    lote o a vaciar(). No es seguro entre hilos: se usa desde la etapa que
+    procesa los lotes en orden de lectura.
+    """
+
+    def __init__(self, objetivo: Callable[[], int]):
+        self.objetivo = objetivo
+        self._sync    = []
+        self._migrar  = []
+        self._filas   = 0
+        self._leidas  = 0
+        self._vacios  = None
+
+    def agregar(
+        self, lote_to_sync: pd.DataFrame, lote_migrar: pd.DataFrame, leidas: int
+    ) -> Optional[Tuple[Tuple[pd.DataFrame, pd.DataFrame], int]]:
+        """
+        Agrega el resultado de un lote (`leidas` registros del DBF). Devuelve
+        ((a sincronizar, a migrar), registros) cuando hay al menos un envío
+        completo, o None.
+        """
+        self._vacios = (lote_to_sync.iloc[0:0], lote_migrar.iloc[0:0])
+        if not lote_to_sync.empty:
+            self._sync.append(lote_to_sync)
+            self._filas += len(lote_to_sync)
+        if not lote_migrar.empty:
+            self._migrar.append(lote_migrar)
+        self._leidas += leidas
+        objetivo = max(1, self.objetivo())
+        if self._filas < objetivo:
+            return None
+        return self._entregar(self._filas - self._filas % objetivo)
+
+    def vaciar(self) -> Optional[Tuple[Tuple[pd.DataFrame, pd.DataFrame], int]]:
+        """Todo lo pendiente (None si no queda nada)."""
+        if not (self._filas or self._migrar or self._leidas):
+            return None
+        return self._entregar(self._filas)
+
+    def _entregar(self, filas: int):
+        sync_vacio, migrar_vacio = self._vacios
+        sync   = pd.concat(self._sync) if self._sync else sync_vacio
+        migrar = pd.concat(self._migrar) if self._migrar else migrar_vacio
+        resto  = sync.iloc[filas:]
+        trabajo = ((sync.iloc[:filas], migrar), self._leidas)
+        self._sync   = [resto] if len(resto) else []
+        self._migrar = []
+        self._filas  = len(resto)
+        self._leidas = 0
+        return trabajo
@@ -0,0 +1,137 @@
+# etl/metadata.py
+#
+# Caché de tablas reflejadas (columnas, PK, tipos). Reflejar una tabla son
+# varias consultas a information_schema; sobre un enlace lento eso pesa en
+# cada corrida. Aquí la definición se guarda en memoria y en disco
+# (state/metadata/) y solo se vuelve a reflejar cuando cambia la firma del
+# esquema (una consulta ligera) o se pide explícitamente (run.py refresh-metadata).
+
+import os
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import MetaData, Table, text
+
+from etl.state import STATE_DIR
+
+METADATA_DIR = os.path.join(STATE_DIR, "metadata")
+# Segundos durante los cuales una tabla en memoria se usa sin revisar la firma
+TTL_MEMORIA = 300
+
+_CACHE = {}   # (uri, tabla) -> (Table, firma, validado_en)
+_LOCKS = {}   # (uri, tabla) -> Lock: la firma y la reflexión de una tabla no frenan a las demás
+_LOCK  = threading.Lock()   # solo para recorrer/modificar _CACHE y _LOCKS
+
+_SQL_FIRMA = text("""
+    SELECT COUNT(*),
+           COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE,
+                                             IS_NULLABLE, COLUMN_KEY, COALESCE(COLUMN_DEFAULT, '')))), 0)
+      FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla
+""")
+
+
+def _uri(engine) -> str:
+    return engine.url.render_as_string(hide_password=True)
+
+
+def _ruta(engine, table_name: str) -> str:
+    prefijo = hashlib.sha256(_uri(engine).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(METADATA_DIR, f"{prefijo}_{table_name}.pkl")
+
+
+def _bloqueo(llave: tuple) -> threading.Lock:
+    with _LOCK:
+        return _LOCKS.setdefault(llave, threading.Lock())
+
+
+def _cachear(llave: tuple, tbl: Table, firma: Optional[str], validado: float):
+    with _LOCK:
+        _CACHE[llave] = (tbl, firma, validado)
+
+
+def firma_esquema(engine, table_name: str) -> Optional[str]:
+    """
+    Firma barata de la definición de columnas (una sola consulta).
+    None si el motor no es MySQL/MariaDB: en ese caso no se usa el disco.
+    """
+    if engine.dialect.name != "mysql":
+        return None
+    with engine.connect() as conn:
+        columnas, checksum = conn.execute(_SQL_FIRMA, {"tabla": table_name}).one()
+    return f"{int(columnas)}:{int(checksum)}"
+
+
+def _leer_disco(ruta: str) -> Optional[dict]:
+    try:
+        with open(ruta, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Caché de metadata ilegible ({ruta}): {e}; se vuelve a reflejar")
+        return None
+
+
+def _guardar_disco(ruta: str, tbl: Table, firma: str):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"firma": firma, "metadata": tbl.metadata, "tabla": tbl.name}, f)
+    os.replace(tmp, ruta)
+
+
+def obtener_tabla(engine, table_name: str, refrescar: bool = False) -> Table:
+    """
+    Tabla reflejada desde la caché. Orden: memoria (dentro de TTL_MEMORIA),
+    disco (si la firma coincide) y, por último, reflexión completa.
+    """
+    llave = (_uri(engine), table_name)
+    ahora = time.monotonic()
+    with _bloqueo(llave):
+        cacheada = None if refrescar else _CACHE.get(llave)
+        if cacheada:
+            tbl, firma, validado = cacheada
+            if firma is None or ahora - validado < TTL_MEMORIA:
+                return tbl
+
+        firma = firma_esquema(engine, table_name)
+        if cacheada and cacheada[1] == firma:
+            _cachear(llave, cacheada[0], firma, ahora)
+            return cacheada[0]
+
+        ruta = _ruta(engine, table_name)
+        if not refrescar and firma is not None:
+            guardado = _leer_disco(ruta)
+            if guardado and guardado["firma"] == firma:
+                tbl = guardado["metadata"].tables[guardado["tabla"]]
+                _cachear(llave, tbl, firma, ahora)
+                logging.info(f"Metadata de {table_name} desde caché (firma {firma})")
+                return tbl
+
+        tbl = Table(table_name, MetaData(), autoload_with=engine)
+        logging.info(f"Tabla {table_name} reflejada (firma {firma})")
+        _cachear(llave, tbl, firma, ahora)
+        if firma is not None:
+            try:
+                _guardar_disco(ruta, tbl, firma)
+            except Exception as e:
+                logging.warning(f"No se pudo guardar la metadata de {table_name}: {e}")
+        return tbl
+
+
+def invalidar(table_name: str = None):
+    """Descarta la caché (de una tabla o de todas), en memoria y en disco."""
+    with _LOCK:
+        for llave in [k for k in _CACHE if table_name is None or k[1] == table_name]:
+            del _CACHE[llave]
+        if not os.path.isdir(METADATA_DIR):
+            return
+        for nombre in os.listdir(METADATA_DIR):
+            # Nombre de _ruta(): "<prefijo de la URI>_<tabla>.pkl" (el prefijo no lleva "_")
+            if table_name is None or nombre.split("_", 1)[-1] == f"{table_name}.pkl":
+                os.remove(os.path.join(METADATA_DIR, nombre))
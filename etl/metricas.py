@@ -0,0 +1,201 @@
+# etl/metricas.py
+#
+# Métricas en formato de texto de Prometheus/OpenMetrics, armadas a mano a
+# partir del resultado de cada corrida (runner.ResultadoEntrada y el perfil
+# de etl/telemetria.py). Los acumulados por entrada (corridas, filas, bytes,
+# histogramas de duración) se guardan en el almacén de estado (campo
+# "metricas" de etl/state.py), así los contadores no se reinician con cada
+# proceso de `run.py` y cualquier proceso puede exportar todas las entradas.
+#
+# Salidas: METRICS_TEXTFILE (archivo .prom para el textfile collector de
+# node_exporter) y, en `run.py daemon`, un endpoint HTTP /metrics en
+# METRICS_PORT.
+
+import os
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from etl import db, state
+
+PREFIJO = "alphaetl"
+# Límites (segundos) de los histogramas de duración
+BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+CAMPO_ESTADO = "metricas"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Por defecto /metrics solo escucha en la máquina local
+HOST_DEFAULT = "127.0.0.1"
+
+
+def _histograma_vacio() -> dict:
+    return {"buckets": [0] * len(BUCKETS), "suma": 0.0, "cuenta": 0}
+
+
+def _observar(hist: dict, valor: float):
+    for i, limite in enumerate(BUCKETS):
+        if valor <= limite:
+            hist["buckets"][i] += 1
+    hist["suma"]   += valor
+    hist["cuenta"] += 1
+
+
+def registrar(res) -> Optional[dict]:
+    """
+    Suma una corrida (ResultadoEntrada) a los acumulados de la entrada.
+    La lectura y la escritura van en una sola transacción del almacén
+    (state.actualizar), así procesos en paralelo no pierden incrementos.
+    Un fallo al guardar solo se registra en el log: no afecta la sincronización.
+    """
+    def sumar(m: Optional[dict]) -> dict:
+        m = m or {}
+        ahora = time.time()
+        m["corridas"] = m.get("corridas", 0) + 1
+        m["ultima_corrida"] = ahora
+        if not res.ok:
+            m["fallos"] = m.get("fallos", 0) + 1
+        else:
+            m["ultimo_exito"] = ahora
+        perfil = res.perfil or {}
+        for campo in ("filas_procesadas", "filas_sincronizadas", "filas_eliminadas", "bytes_leidos", "reintentos"):
+            m[campo] = m.get(campo, 0) + perfil.get(campo, 0)
+        if perfil:
+            m["pico_rss_mb"] = perfil["pico_rss_mb"]
+            m["filas_s"] = round(perfil.get("filas_procesadas", 0) / perfil["segundos"], 1) if perfil["segundos"] else 0
+        _observar(m.setdefault("duracion", _histograma_vacio()), res.duracion)
+        etapas = m.setdefault("etapas", {})
+        for etapa, d in perfil.get("etapas", {}).items():
+            _observar(etapas.setdefault(etapa, _histograma_vacio()), d["segundos"])
+        return m
+
+    try:
+        return state.actualizar(res.entry, CAMPO_ESTADO, sumar)
+    except Exception as e:
+        logging.warning(f"No se pudieron registrar las métricas de {res.entry}: {e}")
+        return None
+
+
+def _etiquetas(**labels) -> str:
+    if not labels:
+        return ""
+    pares = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{k}="{v}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _numero(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Texto:
+    def __init__(self):
+        self.lineas: List[str] = []
+
+    def familia(self, nombre: str, tipo: str, ayuda: str, muestras: list):
+        """muestras: [(labels, valor)]; se omite la familia si no hay muestras."""
+        if not muestras:
+            return
+        nombre = f"{PREFIJO}_{nombre}"
+        self.lineas.append(f"# HELP {nombre} {ayuda}")
+        self.lineas.append(f"# TYPE {nombre} {tipo}")
+        for labels, valor in muestras:
+            self.lineas.append(f"{nombre}{_etiquetas(**labels)} {_numero(valor)}")
+
+    def histograma(self, nombre: str, ayuda: str, series: list):
+        """series: [(labels, {"buckets", "suma", "cuenta"})]."""
+        if not series:
+            return
+        nombre = f"{PREFIJO}_{nombre}"
+        self.lineas.append(f"# HELP {nombre} {ayuda}")
+        self.lineas.append(f"# TYPE {nombre} histogram")
+        for labels, h in series:
+            for limite, n in zip(BUCKETS, h["buckets"]):
+                self.lineas.append(f"{nombre}_bucket{_etiquetas(**labels, le=limite)} {n}")
+            self.lineas.append(f"{nombre}_bucket{_etiquetas(**labels, le='+Inf')} {h['cuenta']}")
+            self.lineas.append(f"{nombre}_sum{_etiquetas(**labels)} {_numero(float(h['suma']))}")
+            self.lineas.append(f"{nombre}_count{_etiquetas(**labels)} {h['cuenta']}")
+
+
+def exponer() -> str:
+    """Todas las métricas (entradas del almacén + pools de este proceso) en texto."""
+    por_entry = {
+        entry: campos[CAMPO_ESTADO]
+        for entry, campos in sorted(state.leer_todo().items())
+        if CAMPO_ESTADO in campos
+    }
+    t = _Texto()
+
+    def serie(campo):
+        return [({"entry": e}, m[campo]) for e, m in por_entry.items() if campo in m]
+
+    t.familia("runs_total", "counter", "Corridas terminadas (con o sin error).", serie("corridas"))
+    t.familia("failures_total", "counter", "Corridas terminadas con error.",
+              [({"entry": e}, m.get("fallos", 0)) for e, m in por_entry.items()])
+    t.familia("rows_processed_total", "counter", "Filas leídas del DBF.", serie("filas_procesadas"))
+    t.familia("rows_upserted_total", "counter", "Filas nuevas o cambiadas enviadas a MySQL.", serie("filas_sincronizadas"))
+    t.familia("rows_deleted_total", "counter", "Filas borradas o marcadas (DELETE_MODE).", serie("filas_eliminadas"))
+    t.familia("bytes_read_total", "counter", "Bytes de registros leídos del DBF.", serie("bytes_leidos"))
+    t.familia("retries_total", "counter", "Lotes reintentados por bloqueo o tamaño de paquete.", serie("reintentos"))
+    t.familia("last_run_timestamp_seconds", "gauge", "Fin de la última corrida (epoch).", serie("ultima_corrida"))
+    t.familia("last_success_timestamp_seconds", "gauge", "Fin de la última corrida exitosa (epoch).", serie("ultimo_exito"))
+    t.familia("last_run_rows_per_second", "gauge", "Filas procesadas por segundo en la última corrida con datos.", serie("filas_s"))
+    t.familia("last_run_peak_rss_bytes", "gauge", "Pico de RSS del proceso en la última corrida.",
+              [({"entry": e}, int(m["pico_rss_mb"] * 1024**2)) for e, m in por_entry.items() if "pico_rss_mb" in m])
+    t.histograma("run_duration_seconds", "Duración de cada corrida.",
+                 [({"entry": e}, m["duracion"]) for e, m in por_entry.items() if "duracion" in m])
+    t.histograma("stage_duration_seconds", "Duración de cada etapa por corrida (etl/telemetria.py).",
+                 [({"entry": e, "stage": etapa}, h) for e, m in por_entry.items() for etapa, h in m.get("etapas", {}).items()])
+
+    # Etiqueta `database` (motor y base): la URI completa expondría host y usuario
+    pools = [dict(s, database=f"{s['motor']}/{s['base']}") for s in db.estadisticas()]
+    t.familia("db_connections_total", "counter", "Conexiones físicas abiertas por el pool.",
+              [({"database": s["database"]}, s["conexiones"]) for s in pools])
+    t.familia("db_checkouts_total", "counter", "Préstamos de conexión del pool.",
+              [({"database": s["database"]}, s["prestamos"]) for s in pools])
+    t.familia("db_invalidated_total", "counter", "Conexiones invalidadas.",
+              [({"database": s["database"]}, s["invalidadas"]) for s in pools])
+    t.familia("db_pool_checked_out", "gauge", "Conexiones del pool en uso.",
+              [({"database": s["database"]}, s["en_uso"]) for s in pools if s["en_uso"] is not None])
+    t.familia("db_pool_size", "gauge", "Tamaño configurado del pool.",
+              [({"database": s["database"]}, s["tamano"]) for s in pools if s["tamano"] is not None])
+    return "\n".join(t.lineas) + "\n"
+
+
+def escribir_textfile(ruta: str):
+    """Escribe las métricas en `ruta` de forma atómica (textfile collector)."""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(exponer())
+        os.replace(tmp, ruta)
+    except Exception as e:
+        logging.warning(f"No se pudieron escribir las métricas en {ruta}: {e}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        cuerpo = exponer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        logging.debug(f"[metricas] {self.address_string()} {format % args}")
+
+
+def servir(puerto: int, host: str = HOST_DEFAULT) -> ThreadingHTTPServer:
+    """Levanta /metrics en un hilo de fondo; se detiene con .shutdown()."""
+    servidor = ThreadingHTTPServer((host, puerto), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="etl-metricas", daemon=True).start()
+    logging.info(f"Métricas en http://{host}:{puerto}/metrics")
+    return servidor
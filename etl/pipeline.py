@@ -0,0 +1,116 @@
+# etl/pipeline.py
+#
+# Ejecución en tubería (PIPELINE = true): lectura -> hash/diff -> upsert en
+# hilos separados unidos por colas acotadas. Mientras MySQL responde un lote,
+# el siguiente ya se está decodificando y hasheando; el tamaño de las colas
+# limita cuántos lotes pueden estar en memoria a la vez.
+
+import queue
+import logging
+import threading
+from typing import Callable, Iterable
+
+# Lotes en espera entre etapas
+PROFUNDIDAD_COLA = 4
+# Hilos de upsert (cada uno toma su propia conexión del pool)
+ESCRITORES = 2
+
+_FIN = object()
+_ESPERA = 0.2
+
+
+class _Tuberia:
+    def __init__(self, profundidad: int):
+        self.lotes     = queue.Queue(maxsize=profundidad)
+        self.trabajos  = queue.Queue(maxsize=profundidad)
+        self.cancelado = threading.Event()
+        self.errores   = []
+
+    def poner(self, cola: queue.Queue, item) -> bool:
+        while not self.cancelado.is_set():
+            try:
+                cola.put(item, timeout=_ESPERA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def tomar(self, cola: queue.Queue):
+        while True:
+            try:
+                return cola.get(timeout=_ESPERA)
+            except queue.Empty:
+                if self.cancelado.is_set():
+                    return _FIN
+
+    def fallo(self, etapa: str, error: BaseException):
+        logging.error(f"Pipeline: error en la etapa {etapa}: {error}")
+        self.errores.append(error)
+        self.cancelado.set()
+
+
+def ejecutar(
+    leer: Callable[[], Iterable],
+    procesar: Callable,
+    escribir: Callable,
+    escritores: int = ESCRITORES,
+    profundidad: int = PROFUNDIDAD_COLA
+):
+    """
+    Corre `leer()` (generador de lotes), `procesar(lote)` (un solo hilo, en
+    orden de lectura) y `escribir(trabajo)` (en `escritores` hilos).
+    Si `procesar` devuelve None el lote no pasa a escritura.
+    El primer error de cualquier etapa cancela las demás y se relanza aquí.
+    """
+    escritores = max(1, escritores)
+    t = _Tuberia(max(1, profundidad))
+
+    def lector():
+        try:
+            for lote in leer():
+                if not t.poner(t.lotes, lote):
+                    return
+        except BaseException as e:
+            t.fallo("lectura", e)
+        finally:
+            t.poner(t.lotes, _FIN)
+
+    def procesador():
+        try:
+            while True:
+                lote = t.tomar(t.lotes)
+                if lote is _FIN:
+                    break
+                trabajo = procesar(lote)
+                if trabajo is not None and not t.poner(t.trabajos, trabajo):
+                    break
+        except BaseException as e:
+            t.fallo("hash/diff", e)
+        finally:
+            for _ in range(escritores):
+                t.poner(t.trabajos, _FIN)
+
+    def escritor():
+        try:
+            while True:
+                trabajo = t.tomar(t.trabajos)
+                if trabajo is _FIN:
+                    break
+                escribir(trabajo)
+        except BaseException as e:
+            t.fallo("upsert", e)
+
+    hilos = [
+        threading.Thread(target=lector, name="etl-lectura", daemon=True),
+        threading.Thread(target=procesador, name="etl-hash", daemon=True),
+    ] + [
+        threading.Thread(target=escritor, name=f"etl-upsert-{i}", daemon=True)
+        for i in range(escritores)
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    if t.errores:
+        raise t.errores[0]
@@ -0,0 +1,146 @@
+# etl/runner.py
+#
+# Ejecución de varias entradas en un solo proceso (run.py --all / --group /
+# varios --entry). Con hilos todas las entradas comparten el pool de
+# conexiones de etl_core.obtener_engine; con procesos cada worker tiene el
+# suyo y la decodificación/hash (CPU) no compite por el GIL.
+
+import sys
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Callable, List, NamedTuple, Optional
+
+from etl import metricas
+
+GRUPOS = ("CATALOGS", "TRANSACTIONAL")
+# Entradas simultáneas por defecto
+MAX_WORKERS = 4
+# Mismo formato que run.configurar_logger
+FORMATO_LOG = "%(asctime)s %(levelname)s %(message)s"
+
+
+class ResultadoEntrada(NamedTuple):
+    entry:    str
+    ok:       bool
+    resumen:  str
+    duracion: float
+    perfil:   Optional[dict] = None
+
+
+def listar_entradas(schemas: dict, grupo: Optional[str] = None) -> List[str]:
+    """Nombres DBF de un grupo de schemas.json (o de todos, en orden)."""
+    grupos = [grupo] if grupo else list(GRUPOS)
+    return [
+        e["DBF"].upper()
+        for g in grupos
+        for e in schemas.get("ENTRIES", {}).get(g, [])
+        if e.get("DBF")
+    ]
+
+
+class _ReporteProgreso:
+    """Callback de progreso con umbral de 5%; se puede enviar a otro proceso."""
+
+    def __init__(self, entry: str):
+        self.entry = entry
+        self.ultimo = -1
+
+    def __call__(self, pct: int):
+        if pct == 100 or pct - self.ultimo >= 5:
+            self.ultimo = pct
+            logging.info(f"[{self.entry}] Progreso: {pct}%")
+
+
+def ejecutar_entrada(entry: str, chunk_size: int, forzar: bool = False) -> ResultadoEntrada:
+    """Sincroniza una entrada y captura el error en vez de propagarlo."""
+    from etl.etl_core import ejecutar_etl_con_progreso
+
+    inicio = time.time()
+    perfil = {}
+    try:
+        resumen = ejecutar_etl_con_progreso(
+            dbf_name=entry,
+            chunk_size=chunk_size,
+            progress_callback=_ReporteProgreso(entry),
+            forzar=forzar,
+            perfil_callback=perfil.update
+        )
+        res = ResultadoEntrada(entry, True, resumen, round(time.time() - inicio, 1), perfil or None)
+    except Exception as ex:
+        logging.exception(f"[{entry}] Error durante la ejecucion del ETL:")
+        res = ResultadoEntrada(entry, False, repr(ex), round(time.time() - inicio, 1))
+    # Acumulados para el exportador de métricas (también desde procesos worker)
+    metricas.registrar(res)
+    return res
+
+
+def _iniciar_worker(log_path: Optional[str], nivel: int):
+    """
+    initializer de los procesos worker: con spawn (Windows) arrancan sin
+    handlers y su log se perdería. Se agregan al mismo archivo (y a consola)
+    que configuró el proceso principal.
+    """
+    raiz = logging.getLogger()
+    for h in raiz.handlers[:]:
+        raiz.removeHandler(h)
+    formato = logging.Formatter(FORMATO_LOG)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_path:
+        handlers.append(logging.FileHandler(log_path))
+    for h in handlers:
+        h.setFormatter(formato)
+        raiz.addHandler(h)
+    raiz.setLevel(nivel)
+
+
+def ejecutar_entradas(
+    entries: List[str],
+    chunk_size: int,
+    workers: int = MAX_WORKERS,
+    procesos: bool = False,
+    forzar: bool = False,
+    on_resultado: Callable[[ResultadoEntrada], None] = None,
+    log_path: Optional[str] = None
+) -> List[ResultadoEntrada]:
+    """
+    Corre las entradas en un pool de `workers` hilos (o procesos si
+    `procesos`). Devuelve los resultados en el orden de `entries`.
+    Con procesos, cada worker escribe en `log_path` (el log de run.py).
+    """
+    workers = max(1, min(workers, len(entries) or 1))
+    opciones = {"max_workers": workers}
+    if procesos:
+        opciones.update(initializer=_iniciar_worker, initargs=(log_path, logging.getLogger().level))
+    Pool = ProcessPoolExecutor if procesos else ThreadPoolExecutor
+    logging.info(
+        f"Ejecutando {len(entries)} entradas con {workers} "
+        f"{'procesos' if procesos else 'hilos'}: {', '.join(entries)}"
+    )
+
+    resultados = {}
+    with Pool(**opciones) as pool:
+        futuros = {pool.submit(ejecutar_entrada, e, chunk_size, forzar): e for e in entries}
+        for fut in as_completed(futuros):
+            entry = futuros[fut]
+            try:
+                res = fut.result()
+            except Exception as ex:
+                # Falla del worker en sí (p. ej. proceso terminado)
+                res = ResultadoEntrada(entry, False, repr(ex), 0.0)
+            resultados[entry] = res
+            if on_resultado:
+                on_resultado(res)
+    return [resultados[e] for e in entries]
+
+
+def formatear_resumen(resultados: List[ResultadoEntrada]) -> str:
+    """Tabla de texto con el estado por entrada."""
+    ancho  = max([len(r.entry) for r in resultados] + [5])
+    lineas = [f"{'ENTRY':<{ancho}}  ESTADO  SEG     RESUMEN"]
+    for r in resultados:
+        estado = "OK" if r.ok else "ERROR"
+        lineas.append(f"{r.entry:<{ancho}}  {estado:<6}  {r.duracion:<6}  {r.resumen}")
+    fallidas = sum(not r.ok for r in resultados)
+    lineas.append(f"Total: {len(resultados)}, OK: {len(resultados) - fallidas}, con error: {fallidas}")
+    return "\n".join(lineas)
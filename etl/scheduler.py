@@ -0,0 +1,157 @@
+# etl/scheduler.py
+#
+# Modo daemon (run.py daemon): un solo proceso de larga vida que programa
+# las entradas con sus intervalos y ventanas de operación. El pool de
+# conexiones y la metadata de tablas se mantienen en memoria entre corridas.
+#
+# Configuración en config.json (valores por defecto equivalentes a rutinas.bat):
+#   "SCHEDULE": {
+#       "WINDOW":   ["06:00", "22:00"],
+#       "JITTER_S": 60,
+#       "CATALOGS":      {"INTERVAL_MIN": 120},
+#       "TRANSACTIONAL": {"INTERVAL_MIN": 30}
+#   }
+# Cada entrada de schemas.json puede sobreescribir con su propio "SCHEDULE".
+
+import random
+import logging
+import threading
+from datetime import datetime, time as dtime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from etl.runner import GRUPOS, MAX_WORKERS, ResultadoEntrada, ejecutar_entrada
+
+VENTANA_DEFAULT   = ("06:00", "22:00")
+JITTER_DEFAULT    = 60
+INTERVALO_DEFAULT = {"CATALOGS": 120, "TRANSACTIONAL": 30}
+# Máximo que duerme el ciclo principal antes de revisar la agenda
+_TICK = 30
+
+
+def _hora(valor: str) -> dtime:
+    h, m = valor.split(":")
+    return dtime(int(h), int(m))
+
+
+class Programacion:
+    """Intervalo, ventana y jitter de una entrada."""
+
+    def __init__(self, entry: str, intervalo_min: float, ventana: Tuple[str, str], jitter_s: float):
+        self.entry     = entry
+        self.intervalo = timedelta(minutes=intervalo_min)
+        self.inicio    = _hora(ventana[0])
+        self.fin       = _hora(ventana[1])
+        self.jitter_s  = jitter_s
+        self.lock      = threading.Lock()
+        self.siguiente: Optional[datetime] = None
+
+    def en_ventana(self, momento: datetime) -> bool:
+        t = momento.time()
+        if self.inicio <= self.fin:
+            return self.inicio <= t < self.fin
+        # Ventana que cruza la medianoche (p. ej. 22:00-06:00)
+        return t >= self.inicio or t < self.fin
+
+    def _jitter(self) -> timedelta:
+        return timedelta(seconds=random.uniform(0, self.jitter_s))
+
+    def programar(self, desde: datetime, primera: bool = False):
+        """Calcula la siguiente ejecución a partir de `desde`."""
+        candidato = desde + (self._jitter() if primera else self.intervalo + self._jitter())
+        if not self.en_ventana(candidato):
+            apertura = datetime.combine(candidato.date(), self.inicio)
+            if apertura <= candidato:
+                apertura += timedelta(days=1)
+            candidato = apertura + self._jitter()
+        self.siguiente = candidato
+
+
+def construir_programaciones(cfg: dict, schemas: dict, entries: List[str] = None) -> Dict[str, Programacion]:
+    """Programación por entrada combinando config.json y el SCHEDULE de cada entrada."""
+    sched   = cfg.get("SCHEDULE", {})
+    ventana = tuple(sched.get("WINDOW", VENTANA_DEFAULT))
+    jitter  = sched.get("JITTER_S", JITTER_DEFAULT)
+    filtro  = {e.upper() for e in entries} if entries else None
+
+    programaciones = {}
+    for grupo in GRUPOS:
+        por_grupo = sched.get(grupo, {})
+        for e in schemas.get("ENTRIES", {}).get(grupo, []):
+            nombre = e.get("DBF", "").upper()
+            if not nombre or (filtro and nombre not in filtro):
+                continue
+            propio = e.get("SCHEDULE", {})
+            if propio.get("ENABLED", por_grupo.get("ENABLED", True)) is False:
+                continue
+            programaciones[nombre] = Programacion(
+                nombre,
+                propio.get("INTERVAL_MIN", por_grupo.get("INTERVAL_MIN", INTERVALO_DEFAULT[grupo])),
+                tuple(propio.get("WINDOW", por_grupo.get("WINDOW", ventana))),
+                propio.get("JITTER_S", por_grupo.get("JITTER_S", jitter))
+            )
+    return programaciones
+
+
+class Daemon:
+    """
+    Agenda en proceso. Cada entrada tiene su propio lock: si la corrida
+    anterior sigue en curso cuando vence la siguiente, esa se omite en lugar
+    de encimarse.
+    """
+
+    def __init__(
+        self,
+        programaciones: Dict[str, Programacion],
+        chunk_size: int,
+        workers: int = MAX_WORKERS,
+        on_resultado: Callable[[ResultadoEntrada], None] = None
+    ):
+        self.programaciones = programaciones
+        self.chunk_size     = chunk_size
+        self.workers        = max(1, workers)
+        self.on_resultado   = on_resultado
+        self.detener        = threading.Event()
+
+    def _correr(self, prog: Programacion):
+        try:
+            res = ejecutar_entrada(prog.entry, self.chunk_size)
+            if self.on_resultado:
+                self.on_resultado(res)
+        finally:
+            prog.lock.release()
+
+    def _despachar(self, pool: ThreadPoolExecutor, ahora: datetime):
+        for prog in self.programaciones.values():
+            if prog.siguiente is None or prog.siguiente > ahora:
+                continue
+            if prog.lock.acquire(blocking=False):
+                logging.info(f"[daemon] Lanzando {prog.entry}")
+                pool.submit(self._correr, prog)
+            else:
+                logging.warning(f"[daemon] {prog.entry} sigue en curso; se omite esta ejecución")
+            prog.programar(ahora)
+            logging.info(f"[daemon] Siguiente {prog.entry}: {prog.siguiente:%Y-%m-%d %H:%M:%S}")
+
+    def ejecutar(self):
+        """Bucle principal; termina con detener.set() (o Ctrl+C)."""
+        if not self.programaciones:
+            raise ValueError("No hay entradas programadas para el daemon")
+        ahora = datetime.now()
+        for prog in self.programaciones.values():
+            prog.programar(ahora, primera=True)
+            logging.info(f"[daemon] {prog.entry}: cada {prog.intervalo}, primera {prog.siguiente:%H:%M:%S}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="daemon") as pool:
+            try:
+                while not self.detener.is_set():
+                    ahora = datetime.now()
+                    self._despachar(pool, ahora)
+                    proxima = min(p.siguiente for p in self.programaciones.values())
+                    espera  = min(_TICK, max(0.0, (proxima - datetime.now()).total_seconds()))
+                    self.detener.wait(espera)
+            except KeyboardInterrupt:
+                logging.info("[daemon] Interrupción recibida")
+            finally:
+                self.detener.set()
+                logging.info("[daemon] Esperando a que terminen las corridas en curso…")
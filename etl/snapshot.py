@@ -0,0 +1,319 @@
+# etl/snapshot.py
+#
+# Caché de DBF ya decodificados en Parquet (pyarrow, dependencia opcional).
+# Cada snapshot guarda todas las columnas con tipos explícitos y se nombra
+# con la huella del archivo (etl.dbf_reader.huella_archivo): si el DBF
+# cambia, el snapshot anterior deja de coincidir y se reemplaza. Los lectores
+# abren el Parquet con memory-map y leen solo las columnas que necesitan.
+#
+# El tamaño total se limita con SNAPSHOT_MAX_MB (config.json); se desalojan
+# primero los snapshots usados hace más tiempo (LRU por mtime).
+# Con SNAPSHOT_CACHE la sincronización lo escribe en su lectura completa;
+# `python run.py warm-cache` / `purge-cache` los generan o eliminan.
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from etl.dbf_reader import (
+    abrir_dbfread, alinear_tipos, huella_archivo, iter_dbf_numpy, leer_encabezado, soporta_columnas
+)
+from etl.state import STATE_DIR
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = pq = None
+
+SNAPSHOT_DIR = os.path.join(STATE_DIR, "snapshots")
+# Tamaño máximo de la caché en disco (MB)
+MAX_MB = 2048
+# Registros por row group al escribir
+REGISTROS_GRUPO = 100_000
+
+_LOCK = threading.Lock()
+
+
+def disponible() -> bool:
+    return pq is not None
+
+
+def _base(dbf_path: str) -> str:
+    return os.path.splitext(os.path.basename(dbf_path))[0].upper()
+
+
+def _de_dbf(nombre: str, base: str) -> bool:
+    """True si el archivo de la caché corresponde al DBF `base`."""
+    return nombre.rsplit("_", 1)[0] == base
+
+
+def ruta_snapshot(dbf_path: str, encoding: str = None) -> str:
+    """Ruta del snapshot que corresponde al estado actual del DBF (y al encoding)."""
+    huella = json.dumps({"huella": huella_archivo(dbf_path), "encoding": encoding}, sort_keys=True)
+    digest = hashlib.blake2b(huella.encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, f"{_base(dbf_path)}_{digest}.parquet")
+
+
+def _tipo_arrow(campo: dict):
+    """Tipo Arrow equivalente al que produce el decodificador (None si no se cachea)."""
+    tipo = campo["type"]
+    if tipo in "CM":
+        return pa.string()
+    if tipo == "N":
+        return pa.int64() if campo["decimal_count"] == 0 else pa.float64()
+    if tipo in "FO":
+        return pa.float64()
+    if tipo == "I":
+        return pa.int64()
+    if tipo == "D":
+        return pa.date32()
+    if tipo == "T":
+        return pa.timestamp("us")
+    if tipo == "L":
+        return pa.bool_()
+    return None
+
+
+def _esquema(encabezado: dict):
+    campos = []
+    for c in encabezado["campos"]:
+        tipo = _tipo_arrow(c)
+        if tipo is None:
+            return None
+        campos.append(pa.field(c["name"], tipo))
+    return pa.schema(campos)
+
+
+def _lotes_dbf(dbf_path: str, encabezado: dict, batch_size: int, encoding: str) -> Iterator[pd.DataFrame]:
+    columnas = [c["name"] for c in encabezado["campos"]]
+    if soporta_columnas(encabezado, columnas):
+        yield from iter_dbf_numpy(dbf_path, columnas, batch_size=batch_size, encoding=encoding)
+        return
+    table = abrir_dbfread(
+        dbf_path, columnas, encoding=encoding, ignore_missing_memofile=True, char_decode_errors="ignore"
+    )
+    batch = []
+    for rec in table:
+        batch.append(rec)
+        if len(batch) >= batch_size:
+            yield alinear_tipos(pd.DataFrame.from_records(batch, columns=columnas), encabezado)
+            batch = []
+    if batch:
+        yield alinear_tipos(pd.DataFrame.from_records(batch, columns=columnas), encabezado)
+
+
+def _tocar(ruta: str):
+    """Marca el snapshot como usado (el LRU se basa en mtime)."""
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+
+def buscar(dbf_path: str, encoding: str = None) -> Optional[str]:
+    """Ruta del snapshot vigente del DBF, o None."""
+    if pq is None:
+        return None
+    ruta = ruta_snapshot(dbf_path, encoding)
+    if not os.path.exists(ruta):
+        return None
+    _tocar(ruta)
+    return ruta
+
+
+def _generar(
+    dbf_path: str,
+    ruta: str,
+    encabezado: dict,
+    esquema,
+    max_mb: float,
+    encoding: str,
+    batch_size: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Entrega los lotes decodificados del DBF (todas las columnas) y a la vez
+    los escribe en el snapshot. Solo si se consumen todos se publica `ruta`;
+    un error de escritura deja de generar el snapshot sin cortar la lectura.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    writer = pq.ParquetWriter(tmp, esquema, compression="zstd")
+    filas = 0
+    try:
+        for lote in _lotes_dbf(dbf_path, encabezado, batch_size, encoding):
+            if writer is not None:
+                try:
+                    writer.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+                    filas += len(lote)
+                except Exception as e:
+                    logging.warning(f"No se pudo generar el snapshot de {dbf_path}: {e}")
+                    writer.close()
+                    writer = None
+            yield lote
+        if writer is None:
+            return
+        writer.close()
+        writer = None
+        os.replace(tmp, ruta)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    logging.info(f"Snapshot de {dbf_path}: {filas} registros, {os.path.getsize(ruta) / 1024**2:.1f} MB")
+    with _LOCK:
+        # Los snapshots de versiones anteriores del mismo DBF ya no sirven
+        for nombre in os.listdir(SNAPSHOT_DIR):
+            otro = os.path.join(SNAPSHOT_DIR, nombre)
+            if _de_dbf(nombre, _base(dbf_path)) and nombre.endswith(".parquet") and otro != ruta:
+                os.remove(otro)
+    podar(max_mb)
+
+
+def _preparar(dbf_path: str, encoding: str = None) -> Optional[tuple]:
+    """(ruta, encabezado, esquema) para generar el snapshot, o None si no se cachea."""
+    encabezado = leer_encabezado(dbf_path)
+    esquema = _esquema(encabezado)
+    if esquema is None:
+        logging.info(f"{dbf_path} tiene tipos de campo sin equivalente Arrow; no se genera snapshot")
+        return None
+    return ruta_snapshot(dbf_path, encoding), encabezado, esquema
+
+
+def calentar(
+    dbf_path: str,
+    max_mb: float = MAX_MB,
+    encoding: str = None,
+    batch_size: int = REGISTROS_GRUPO
+) -> Optional[str]:
+    """
+    Decodifica el DBF completo a Parquet en streaming (la memoria depende de
+    `batch_size`). `encoding` None usa el del encabezado, como etl_core.
+    Devuelve la ruta, o None si pyarrow no está instalado o el DBF tiene
+    tipos que no se cachean.
+    """
+    if pq is None:
+        logging.warning("Caché de snapshots configurada pero 'pyarrow' no está instalado")
+        return None
+    ruta = buscar(dbf_path, encoding)
+    if ruta is not None:
+        return ruta
+    plan = _preparar(dbf_path, encoding)
+    if plan is None:
+        return None
+    ruta, encabezado, esquema = plan
+    try:
+        for _ in _generar(dbf_path, ruta, encabezado, esquema, max_mb, encoding, batch_size):
+            pass
+    except Exception as e:
+        logging.warning(f"No se pudo generar el snapshot de {dbf_path}: {e}")
+        return None
+    return ruta if os.path.exists(ruta) else None
+
+
+def leer(
+    dbf_path: str,
+    columns: List[str] = None,
+    filtros: list = None,
+    encoding: str = None
+) -> Optional[pd.DataFrame]:
+    """
+    DataFrame desde el snapshot vigente (None si no existe). `filtros` usa la
+    sintaxis de pyarrow, p. ej. [("FECHA", ">=", date(2024, 1, 1))].
+    """
+    ruta = buscar(dbf_path, encoding)
+    if ruta is None:
+        return None
+    tabla = pq.read_table(ruta, columns=columns, filters=filtros, memory_map=True)
+    return tabla.to_pandas()
+
+
+def iter_lotes(
+    dbf_path: str,
+    columns: List[str],
+    batch_size: int,
+    generar: bool = False,
+    max_mb: float = MAX_MB
+) -> Optional[Iterator[pd.DataFrame]]:
+    """
+    Iterador de lotes desde el snapshot vigente. Si no existe y `generar`,
+    decodifica el DBF y escribe el snapshot durante la misma lectura (así
+    la sincronización deja la caché lista para extract/load_dbf_entry y
+    para la siguiente corrida). None si no hay snapshot ni se puede generar.
+    """
+    ruta = buscar(dbf_path)
+    if ruta is not None:
+        def lotes():
+            archivo = pq.ParquetFile(ruta, memory_map=True)
+            for batch in archivo.iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+
+        logging.info(f"Leyendo desde snapshot: {ruta}")
+        return lotes()
+
+    if not generar or pq is None:
+        return None
+    plan = _preparar(dbf_path)
+    if plan is None:
+        return None
+    ruta, encabezado, esquema = plan
+    logging.info(f"Leyendo DBF y generando snapshot (lote={batch_size}): {dbf_path}")
+    return (
+        lote[columns]
+        for lote in _generar(dbf_path, ruta, encabezado, esquema, max_mb, None, batch_size)
+    )
+
+
+def obtener(
+    dbf_path: str,
+    columns: List[str] = None,
+    max_mb: float = MAX_MB,
+    encoding: str = None
+) -> Optional[pd.DataFrame]:
+    """Lee del snapshot; si no existe lo genera primero. None si no se puede cachear."""
+    if calentar(dbf_path, max_mb, encoding) is None:
+        return None
+    return leer(dbf_path, columns, encoding=encoding)
+
+
+def podar(max_mb: float = MAX_MB):
+    """Desaloja los snapshots menos usados hasta quedar bajo `max_mb`."""
+    with _LOCK:
+        if not os.path.isdir(SNAPSHOT_DIR):
+            return
+        archivos = []
+        for nombre in os.listdir(SNAPSHOT_DIR):
+            if nombre.endswith(".parquet"):
+                st = os.stat(os.path.join(SNAPSHOT_DIR, nombre))
+                archivos.append((st.st_mtime, st.st_size, nombre))
+        total  = sum(a[1] for a in archivos)
+        limite = max_mb * 1024**2
+        for _, size, nombre in sorted(archivos):
+            if total <= limite:
+                break
+            os.remove(os.path.join(SNAPSHOT_DIR, nombre))
+            total -= size
+            logging.info(f"Snapshot {nombre} desalojado (LRU)")
+
+
+def purgar(dbf_name: str = None) -> int:
+    """Elimina los snapshots (de un DBF o todos); devuelve cuántos borró."""
+    with _LOCK:
+        if not os.path.isdir(SNAPSHOT_DIR):
+            return 0
+        borrados = 0
+        for nombre in os.listdir(SNAPSHOT_DIR):
+            # Solo snapshots publicados: los .tmp son de una generación en curso
+            if not nombre.endswith(".parquet"):
+                continue
+            if dbf_name is None or _de_dbf(nombre, dbf_name.upper()):
+                os.remove(os.path.join(SNAPSHOT_DIR, nombre))
+                borrados += 1
+        return borrados
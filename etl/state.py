@@ -0,0 +1,176 @@
+# etl/state.py
+#
+# Almacén de estado local (SQLite en modo WAL, state/state.db). Guarda por
+# entrada la última sincronización, huellas, marcas incrementales y el
+# índice llave -> row_hash (etl/key_index.py). Cada valor es una fila propia,
+# así que leer o actualizar un campo no depende de cuántas entradas o filas
+# haya, y las escrituras son transacciones: varias corridas en paralelo (hilos
+# o procesos) no pierden ni corrompen estado.
+
+import os
+import sys
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+def directorio_base() -> str:
+    """
+    Raíz bajo la que vive state/. En el build PyInstaller onefile __file__
+    apunta a sys._MEIPASS, que se borra al salir: ahí se usa la carpeta del
+    ejecutable para que huellas, marcas e índices sobrevivan entre corridas.
+    """
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(os.path.abspath(sys.executable))
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+STATE_DIR  = os.path.join(directorio_base(), "state")
+STATE_FILE = os.path.join(STATE_DIR, "state.db")
+
+# Segundos que una conexión espera a que se libere un bloqueo de escritura
+ESPERA_BLOQUEO = 30
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS sync_estado (
+        entry       TEXT NOT NULL,
+        campo       TEXT NOT NULL,
+        valor       TEXT,
+        actualizado TEXT,
+        PRIMARY KEY (entry, campo)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_hashes (
+        entry    TEXT NOT NULL,
+        clave    TEXT NOT NULL,
+        row_hash TEXT,
+        PRIMARY KEY (entry, clave)
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def conectar() -> sqlite3.Connection:
+    """
+    Conexión nueva al almacén. WAL permite lectores concurrentes con un
+    escritor; busy_timeout hace que los escritores esperen en lugar de fallar.
+    """
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    conn = sqlite3.connect(STATE_FILE, timeout=ESPERA_BLOQUEO)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for ddl in _DDL:
+        conn.execute(ddl)
+    return conn
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def leer(entry: str, campo: str, default: Any = None) -> Any:
+    """Valor de un campo de la entrada (default si no existe)."""
+    with closing(conectar()) as conn:
+        row = conn.execute(
+            "SELECT valor FROM sync_estado WHERE entry = ? AND campo = ?", (entry, campo)
+        ).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def leer_entrada(entry: str) -> Dict[str, Any]:
+    """Todos los campos de una entrada."""
+    with closing(conectar()) as conn:
+        rows = conn.execute(
+            "SELECT campo, valor FROM sync_estado WHERE entry = ?", (entry,)
+        ).fetchall()
+    return {campo: json.loads(valor) for campo, valor in rows}
+
+
+def escribir(entry: str, campos: Dict[str, Any]):
+    """Actualiza uno o varios campos de la entrada en una sola transacción."""
+    ahora = _ahora()
+    with closing(conectar()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_estado (entry, campo, valor, actualizado) VALUES (?, ?, ?, ?)",
+            [(entry, campo, json.dumps(valor), ahora) for campo, valor in campos.items()]
+        )
+
+
+def actualizar(entry: str, campo: str, funcion: Callable[[Any], Any], default: Any = None) -> Any:
+    """
+    Lee, transforma con `funcion` y guarda un campo dentro de una misma
+    transacción BEGIN IMMEDIATE: dos procesos que actualizan el mismo campo
+    (p. ej. contadores) se serializan y no pierden incrementos.
+    Devuelve el valor guardado.
+    """
+    with closing(conectar()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT valor FROM sync_estado WHERE entry = ? AND campo = ?", (entry, campo)
+            ).fetchone()
+            valor = funcion(json.loads(row[0]) if row else default)
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_estado (entry, campo, valor, actualizado) VALUES (?, ?, ?, ?)",
+                (entry, campo, json.dumps(valor), _ahora())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    return valor
+
+
+def leer_todo() -> Dict[str, Dict[str, Any]]:
+    """Estado completo {entry: {campo: valor}} (diagnóstico y compatibilidad)."""
+    with closing(conectar()) as conn:
+        rows = conn.execute("SELECT entry, campo, valor FROM sync_estado").fetchall()
+    data: Dict[str, Dict[str, Any]] = {}
+    for entry, campo, valor in rows:
+        data.setdefault(entry, {})[campo] = json.loads(valor)
+    return data
+
+
+def leer_hashes(entry: str) -> Dict[str, Optional[str]]:
+    with closing(conectar()) as conn:
+        rows = conn.execute(
+            "SELECT clave, row_hash FROM sync_hashes WHERE entry = ?", (entry,)
+        ).fetchall()
+    return dict(rows)
+
+
+def reemplazar_hashes(entry: str, hashes: Dict[str, Optional[str]]):
+    """Reescribe en una transacción el mapa llave -> hash de la entrada."""
+    with closing(conectar()) as conn, conn:
+        conn.execute("DELETE FROM sync_hashes WHERE entry = ?", (entry,))
+        conn.executemany(
+            "INSERT INTO sync_hashes (entry, clave, row_hash) VALUES (?, ?, ?)",
+            [(entry, str(k), v) for k, v in hashes.items()]
+        )
+
+
+def importar(data: Dict[str, Dict[str, Any]]):
+    """
+    Carga en una transacción un estado con el formato del antiguo
+    sync_control.json ({entry: {campo: valor, "registros": {llave: hash}}}).
+    No sobreescribe campos ni hashes que ya existan en el almacén.
+    """
+    ahora = _ahora()
+    with closing(conectar()) as conn, conn:
+        for entry, campos in data.items():
+            campos = dict(campos)
+            registros = campos.pop("registros", None)
+            conn.executemany(
+                "INSERT OR IGNORE INTO sync_estado (entry, campo, valor, actualizado) VALUES (?, ?, ?, ?)",
+                [(entry, campo, json.dumps(valor), ahora) for campo, valor in campos.items()]
+            )
+            if registros:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO sync_hashes (entry, clave, row_hash) VALUES (?, ?, ?)",
+                    [(entry, str(k), v) for k, v in registros.items()]
+                )
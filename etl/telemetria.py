@@ -0,0 +1,223 @@
+# etl/telemetria.py
+#
+# Telemetría por ejecución: segundos, filas y filas/s por etapa, bytes leídos
+# del DBF, pico de RSS (hilo de muestreo), tiempo de CPU user/sys, consultas
+# a MySQL (round-trips) y reintentos. Se guarda en tbl_sync_perfil (una fila
+# por corrida, detalle por etapa en JSON) y `run.py --profile` lo imprime.
+#
+# La corrida activa se asocia al hilo con activar(); así los módulos de más
+# abajo (db, loader, lotes, borrados) registran con medir()/contar() sin
+# recibir el objeto. Sin telemetría activa ambas funciones no hacen nada.
+# RSS y CPU son del proceso: con varias entradas en hilos se mezclan.
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+import psutil
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, MetaData, String, Table, Text
+
+# Orden de las etapas en el reporte
+ETAPAS = ("destino", "lectura", "hash", "diff", "upsert", "commit", "indice", "borrados")
+# Segundos entre muestras de RSS
+INTERVALO_MUESTREO = 0.1
+
+_LOCAL = threading.local()
+
+_METADATA = MetaData()
+TABLA_PERFIL = Table(
+    "tbl_sync_perfil", _METADATA,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("dbf_name", String(64), nullable=False, index=True),
+    Column("sync_time", DateTime, nullable=False),
+    Column("segundos", Float),
+    Column("bytes_leidos", BigInteger),
+    Column("pico_rss_mb", Float),
+    Column("cpu_user_s", Float),
+    Column("cpu_sys_s", Float),
+    Column("round_trips", Integer),
+    Column("reintentos", Integer),
+    Column("etapas", Text)
+)
+_CREADA = set()
+_LOCK_TABLA = threading.Lock()
+
+
+class Telemetria:
+    """Acumulador de una corrida; seguro entre hilos (pipeline)."""
+
+    def __init__(self, intervalo: float = INTERVALO_MUESTREO):
+        self.intervalo = intervalo
+        self.etapas: Dict[str, list] = {}   # etapa -> [segundos, filas]
+        self.contadores: Dict[str, int] = {"bytes_leidos": 0, "round_trips": 0, "reintentos": 0}
+        self._lock    = threading.Lock()
+        self._proc    = psutil.Process()
+        self._pico    = 0
+        self._parar   = threading.Event()
+        self._hilo    = None
+        self._inicio  = None
+        self._cpu     = None
+        self.segundos = 0.0
+        self.cpu_user = self.cpu_sys = 0.0
+
+    def _muestrear(self):
+        while not self._parar.wait(self.intervalo):
+            self._tomar_muestra()
+
+    def _tomar_muestra(self):
+        try:
+            rss = self._proc.memory_info().rss
+        except psutil.Error:
+            return
+        if rss > self._pico:
+            self._pico = rss
+
+    def iniciar(self) -> "Telemetria":
+        self._inicio = time.perf_counter()
+        self._cpu    = self._proc.cpu_times()
+        self._tomar_muestra()
+        self._hilo = threading.Thread(target=self._muestrear, name="etl-rss", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._parar.set()
+        self._hilo.join()
+        self._hilo = None
+        self._tomar_muestra()
+        cpu = self._proc.cpu_times()
+        self.segundos = time.perf_counter() - self._inicio
+        self.cpu_user = cpu.user - self._cpu.user
+        self.cpu_sys  = cpu.system - self._cpu.system
+
+    @property
+    def pico_rss_mb(self) -> float:
+        return round(self._pico / (1024**2), 2)
+
+    def registrar(self, etapa: str, segundos: float, filas: int = 0):
+        with self._lock:
+            acum = self.etapas.setdefault(etapa, [0.0, 0])
+            acum[0] += segundos
+            acum[1] += filas
+
+    def contar(self, nombre: str, n: int = 1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    @contextmanager
+    def medir(self, etapa: str, filas: int = 0):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - t0, filas)
+
+    def medir_iter(self, etapa: str, iterable):
+        """Itera `iterable` sumando a `etapa` el tiempo de producir cada elemento."""
+        it = iter(iterable)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.registrar(etapa, time.perf_counter() - t0)
+                return
+            self.registrar(etapa, time.perf_counter() - t0, len(item) if hasattr(item, "__len__") else 0)
+            yield item
+
+    def resumen(self) -> dict:
+        """Perfil serializable (JSON) de la corrida."""
+        with self._lock:
+            etapas = {
+                e: {
+                    "segundos": round(s, 4),
+                    "filas":    f,
+                    "filas_s":  round(f / s, 1) if s > 0 and f else None
+                }
+                for e, (s, f) in sorted(
+                    self.etapas.items(),
+                    key=lambda t: ETAPAS.index(t[0]) if t[0] in ETAPAS else len(ETAPAS)
+                )
+            }
+            contadores = dict(self.contadores)
+        return {
+            "segundos":    round(self.segundos, 3),
+            "pico_rss_mb": self.pico_rss_mb,
+            "cpu_user_s":  round(self.cpu_user, 3),
+            "cpu_sys_s":   round(self.cpu_sys, 3),
+            **contadores,
+            "etapas":      etapas
+        }
+
+
+def activar(telemetria: Optional[Telemetria]):
+    """Asocia la corrida al hilo actual (None la desasocia)."""
+    _LOCAL.actual = telemetria
+
+
+def actual() -> Optional[Telemetria]:
+    return getattr(_LOCAL, "actual", None)
+
+
+@contextmanager
+def medir(etapa: str, filas: int = 0):
+    """Mide `etapa` en la corrida del hilo actual (no hace nada si no hay)."""
+    t = actual()
+    if t is None:
+        yield
+        return
+    with t.medir(etapa, filas):
+        yield
+
+
+def contar(nombre: str, n: int = 1):
+    t = actual()
+    if t is not None:
+        t.contar(nombre, n)
+
+
+def guardar(engine, dbf_name: str, sync_time: datetime, perfil: dict):
+    """Inserta el perfil en tbl_sync_perfil (la crea la primera vez)."""
+    clave = str(engine.url)
+    with _LOCK_TABLA:
+        if clave not in _CREADA:
+            _METADATA.create_all(engine, tables=[TABLA_PERFIL], checkfirst=True)
+            _CREADA.add(clave)
+    with engine.begin() as conn:
+        conn.execute(TABLA_PERFIL.insert().values(
+            dbf_name=dbf_name,
+            sync_time=sync_time,
+            segundos=perfil["segundos"],
+            bytes_leidos=perfil.get("bytes_leidos", 0),
+            pico_rss_mb=perfil["pico_rss_mb"],
+            cpu_user_s=perfil["cpu_user_s"],
+            cpu_sys_s=perfil["cpu_sys_s"],
+            round_trips=perfil.get("round_trips", 0),
+            reintentos=perfil.get("reintentos", 0),
+            etapas=json.dumps(perfil["etapas"])
+        ))
+
+
+def formatear(dbf_name: str, perfil: dict) -> str:
+    """Desglose por etapa en texto, para `run.py --profile`."""
+    total  = perfil["segundos"] or 1e-9
+    lineas = [
+        f"Perfil {dbf_name}: {perfil['segundos']}s, pico RSS {perfil['pico_rss_mb']} MB, "
+        f"CPU user {perfil['cpu_user_s']}s / sys {perfil['cpu_sys_s']}s, "
+        f"{perfil.get('bytes_leidos', 0) / 1024**2:.1f} MB leídos, "
+        f"{perfil.get('round_trips', 0)} round-trips, {perfil.get('reintentos', 0)} reintentos",
+        f"  {'ETAPA':<10}  {'SEG':>9}  {'%':>5}  {'FILAS':>10}  {'FILAS/S':>10}"
+    ]
+    for etapa, d in perfil["etapas"].items():
+        tasa = f"{d['filas_s']:.0f}" if d["filas_s"] else "-"
+        lineas.append(
+            f"  {etapa:<10}  {d['segundos']:>9.3f}  {100 * d['segundos'] / total:>5.1f}  "
+            f"{d['filas']:>10}  {tasa:>10}"
+        )
+    lineas.append("  (commit está incluido en upsert; con PIPELINE las etapas se solapan)")
+    return "\n".join(lineas)
@@ -75,8 +75,10 @@ class ConfigDialog(QtWidgets.QDialog):
             "DATABASE": self.databaseTxt.text().strip()
         }
 
-        # Reconstruir el config completo (preservando ENTRIES y CHUNK_SIZE)
+        # Reconstruir el config completo (preservando ENTRIES, CHUNK_SIZE y
+        # cualquier otra clave de ajuste, p. ej. HASH_ALGORITHM)
         nueva_cfg = {
+            **self.cfg,
             "DBF_DIR":  dbf_dir,
             "CHUNK_SIZE": self.cfg.get("CHUNK_SIZE", 1000),
             "MYSQL":    mysql_cfg,
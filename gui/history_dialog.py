@@ -5,7 +5,9 @@ import pandas as pd
 import psutil
 from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtWidgets import QDialog, QVBoxLayout, QTableView, QPushButton
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+
+from etl import db
 
 class HistoryDialog(QDialog):
     def __init__(self, mysql_uri: str, dbf_name: str, parent=None):
@@ -28,8 +30,8 @@ class HistoryDialog(QDialog):
         self.load_data(mysql_uri, dbf_name)
 
     def load_data(self, mysql_uri: str, dbf_name: str):
-        # Build engine and query
-        engine = create_engine(mysql_uri)
+        # Engine compartido: no se abre una conexión nueva en cada consulta
+        engine = db.obtener_engine(mysql_uri)
         query = text("""
             SELECT
               sync_time    AS Fecha,
@@ -1,37 +1,41 @@
 @echo off
 setlocal enabledelayedexpansion
 
+REM Alternativa sin schtasks: "python run.py daemon" mantiene un solo proceso
+REM con la agenda de SCHEDULE (config.json).
+
 REM === CONFIGURACION DEL ENTORNO VIRTUAL ===
 set "PYTHON_PATH=C:\AlphaETL\venv\Scripts\python.exe" 
 set "PROJECT_PATH=C:\AlphaETL\"
 set "SCRIPT=%PROJECT_PATH%\run.py"
 
-for %%D in (AGENTES PRODUCTO CLIENTES) do (
-    schtasks /Delete /TN "AlphaETL_%%D" /F >nul 2>&1
-    call :crear_tarea "AlphaETL_%%D" "HOURLY" "2" "%%D" "06:00" "22:00"
-)
-for %%D in (CREDITOS FACTURAC FACTURAD) do (
+REM Tareas anteriores (una por DBF); ahora cada grupo corre en un solo proceso
+for %%D in (AGENTES PRODUCTO CLIENTES CREDITOS FACTURAC FACTURAD) do (
     schtasks /Delete /TN "AlphaETL_%%D" /F >nul 2>&1
-    call :crear_tarea "AlphaETL_%%D" "MINUTE" "30" "%%D" "06:00" "22:00"
 )
 
+schtasks /Delete /TN "AlphaETL_CATALOGS" /F >nul 2>&1
+call :crear_tarea "AlphaETL_CATALOGS" "HOURLY" "2" "--entry AGENTES --entry PRODUCTO --entry CLIENTES" "06:00" "22:00"
+schtasks /Delete /TN "AlphaETL_TRANSACTIONAL" /F >nul 2>&1
+call :crear_tarea "AlphaETL_TRANSACTIONAL" "MINUTE" "30" "--entry CREDITOS --entry FACTURAC --entry FACTURAD" "06:00" "22:00"
+
 echo.
 echo === Todas las tareas fueron creadas correctamente ===
 pause
 exit /b
 
-REM === FUNCION: crear_tarea nombre frecuencia intervalo entry start end
+REM === FUNCION: crear_tarea nombre frecuencia intervalo args start end
 :crear_tarea
   set "TASK_NAME=%~1"
   set "SCHEDULE=%~2"
   set "INTERVAL=%~3"
-  set "ENTRY=%~4"
+  set "ARGS=%~4"
   set "START_TIME=%~5"
   set "END_TIME=%~6"
 
   schtasks /Create /TN "%TASK_NAME%" ^
     /SC %SCHEDULE% /MO %INTERVAL%       ^
     /ST %START_TIME% /ET %END_TIME%     ^
-    /TR "%PYTHON_PATH% %SCRIPT% --entry %ENTRY%" ^
+    /TR "%PYTHON_PATH% %SCRIPT% %ARGS%" ^
     /RL HIGHEST /F /RU %USERNAME%
 exit /b
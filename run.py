@@ -11,7 +11,10 @@ sys.path.insert(0, BASE_DIR)
 
 # Importa tu core real
 try:
-    from etl.etl_core import ejecutar_etl_con_progreso  # (dbf_name, chunk_size, progress_callback)
+    from etl.etl_core import ejecutar_etl_con_progreso  # (dbf_name, chunk_size, progress_callback, forzar)
+    from etl.runner import GRUPOS, MAX_WORKERS, ResultadoEntrada, listar_entradas, ejecutar_entradas, formatear_resumen
+    from etl.scheduler import Daemon, construir_programaciones
+    from etl import db, metadata, metricas, snapshot, telemetria
 except Exception as ex:
     print("[FATAL] No se pudo importar etl.etl_core.ejecutar_etl_con_progreso:", repr(ex))
     sys.exit(90)
@@ -109,16 +112,184 @@ def resolver_entry(nombre_entry: str, schemas: dict) -> tuple[dict, bool]:
     sys.exit(95)
 
 
+def publicar_metricas(config: dict) -> None:
+    """Reescribe el archivo de METRICS_TEXTFILE (textfile collector), si está configurado."""
+    if config.get("METRICS_TEXTFILE"):
+        metricas.escribir_textfile(config["METRICS_TEXTFILE"])
+
+
+def ejecutar_multiples(args) -> None:
+    """Sincroniza varias entradas en un solo proceso y sale con 0 solo si todas terminaron bien."""
+    config  = cargar_json(CONFIG_PATH)
+    schemas = cargar_json(SCHEMA_PATH)
+
+    if args.all:
+        nombres, etiqueta = listar_entradas(schemas), "ALL"
+    elif args.group:
+        nombres, etiqueta = listar_entradas(schemas, args.group), args.group
+    else:
+        nombres, etiqueta = [], "MULTI"
+    for e in args.entry or []:
+        resolver_entry(e, schemas)
+        if e.upper() not in nombres:
+            nombres.append(e.upper())
+    if not nombres:
+        print(f"[ERROR] No hay entradas que procesar para {etiqueta}.")
+        sys.exit(95)
+
+    log_path = configurar_logger(etiqueta, args.log)
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    workers = args.workers or config.get("MAX_WORKERS", MAX_WORKERS)
+    print(f"[RUN] ENTRIES={nombres}  WORKERS={workers}  CHUNK={args.chunk_size}")
+
+    def on_resultado(res) -> None:
+        estado = "OK" if res.ok else "ERROR"
+        print(f"[RUN] {res.entry} {estado} ({res.duracion}s) -> {res.resumen}")
+
+    logging.info("==== INICIO EJECUCION ETL (multiples entradas) ====")
+    resultados = ejecutar_entradas(
+        nombres, args.chunk_size, workers=workers, procesos=args.processes,
+        forzar=args.force, on_resultado=on_resultado, log_path=log_path
+    )
+    publicar_metricas(config)
+    resumen = formatear_resumen(resultados)
+    logging.info("Resumen por entrada:\n" + resumen)
+    print(resumen)
+    if args.profile:
+        for res in resultados:
+            if res.perfil:
+                print(telemetria.formatear(res.entry, res.perfil))
+    print(f"[RUN] Log en: {log_path}")
+    sys.exit(0 if all(r.ok for r in resultados) else 1)
+
+
+def ejecutar_daemon(args) -> None:
+    """Agenda en proceso: sustituye una tarea de schtasks por entrada."""
+    config  = cargar_json(CONFIG_PATH)
+    schemas = cargar_json(SCHEMA_PATH)
+
+    entries = [e.upper() for e in args.entry or []]
+    if args.group:
+        entries += listar_entradas(schemas, args.group)
+    programaciones = construir_programaciones(config, schemas, entries or None)
+    if not programaciones:
+        print("[ERROR] No hay entradas que programar.")
+        sys.exit(95)
+
+    log_path = configurar_logger("DAEMON", args.log)
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    workers = args.workers or config.get("MAX_WORKERS", MAX_WORKERS)
+    print(f"[RUN] DAEMON ENTRIES={list(programaciones)}  WORKERS={workers}  CHUNK={args.chunk_size}")
+
+    def on_resultado(res) -> None:
+        estado = "OK" if res.ok else "ERROR"
+        logging.info(f"[daemon] {res.entry} {estado} ({res.duracion}s) -> {res.resumen}")
+        publicar_metricas(config)
+
+    # METRICS_PORT: endpoint /metrics (Prometheus) mientras corre el daemon
+    servidor = None
+    if config.get("METRICS_PORT"):
+        servidor = metricas.servir(config["METRICS_PORT"], config.get("METRICS_HOST", metricas.HOST_DEFAULT))
+    try:
+        Daemon(programaciones, args.chunk_size, workers=workers, on_resultado=on_resultado).ejecutar()
+    finally:
+        if servidor:
+            servidor.shutdown()
+        db.registrar_estadisticas()
+        db.cerrar_todos()
+    print(f"[RUN] Daemon detenido. Log en: {log_path}")
+
+
+def refrescar_metadata(args) -> None:
+    """Descarta la caché de metadata y vuelve a reflejar las tablas destino."""
+    config  = cargar_json(CONFIG_PATH)
+    schemas = cargar_json(SCHEMA_PATH)
+
+    if args.entry or args.group:
+        nombres = [e.upper() for e in args.entry or []] + (listar_entradas(schemas, args.group) if args.group else [])
+    else:
+        nombres = listar_entradas(schemas)
+    engine = db.obtener_engine(config["MYSQL_URI"], config)
+    for nombre in nombres:
+        entry, _ = resolver_entry(nombre, schemas)
+        tabla = entry["TARGET"]["TABLE"]
+        metadata.invalidar(tabla)
+        tbl = metadata.obtener_tabla(engine, tabla, refrescar=True)
+        print(f"[RUN] {nombre}: {tabla} reflejada ({len(tbl.columns)} columnas)")
+    sys.exit(0)
+
+
+def gestionar_snapshots(args) -> None:
+    """Genera (warm-cache) o elimina (purge-cache) los snapshots Parquet de los DBF."""
+    config  = cargar_json(CONFIG_PATH)
+    schemas = cargar_json(SCHEMA_PATH)
+
+    if args.entry or args.group:
+        nombres = [e.upper() for e in args.entry or []] + (listar_entradas(schemas, args.group) if args.group else [])
+    else:
+        nombres = listar_entradas(schemas)
+
+    if args.modo == "purge-cache":
+        if args.entry or args.group:
+            total = sum(snapshot.purgar(n) for n in nombres)
+        else:
+            total = snapshot.purgar()
+        print(f"[RUN] {total} snapshots eliminados de {snapshot.SNAPSHOT_DIR}")
+        sys.exit(0)
+
+    if not snapshot.disponible():
+        print("[ERROR] warm-cache requiere el paquete 'pyarrow' (pip install pyarrow).")
+        sys.exit(96)
+    max_mb = config.get("SNAPSHOT_MAX_MB", snapshot.MAX_MB)
+    fallidos = 0
+    for nombre in nombres:
+        resolver_entry(nombre, schemas)
+        ruta = snapshot.calentar(os.path.join(config["DBF_DIR"], f"{nombre}.DBF"), max_mb)
+        if ruta is None:
+            fallidos += 1
+        print(f"[RUN] {nombre}: {ruta or 'sin snapshot'}")
+    sys.exit(0 if not fallidos else 1)
+
+
 # ==== MAIN CLI ====
 def main():
     parser = argparse.ArgumentParser(description="Runner CLI para AlphaETL (ejecucion por DBF/ENTRY).")
-    parser.add_argument("-e", "--entry", required=True, help="DBF a procesar (coincide con 'DBF' en schemas.json).")
+    parser.add_argument(
+        "modo", nargs="?", choices=["daemon", "refresh-metadata", "warm-cache", "purge-cache"],
+        help="'daemon': proceso de larga vida con agenda interna (SCHEDULE en config.json). "
+             "'refresh-metadata': vuelve a reflejar las tablas destino y actualiza la caché. "
+             "'warm-cache' / 'purge-cache': genera o elimina los snapshots Parquet de los DBF."
+    )
+    parser.add_argument("-e", "--entry", action="append", help="DBF a procesar (coincide con 'DBF' en schemas.json). Se puede repetir.")
+    parser.add_argument("--all", action="store_true", help="Procesa todas las entradas (CATALOGS y TRANSACTIONAL).")
+    parser.add_argument("--group", choices=GRUPOS, help="Procesa todas las entradas de un grupo.")
+    parser.add_argument("--workers", type=int, help=f"Entradas en paralelo (default MAX_WORKERS de config.json o {MAX_WORKERS}).")
+    parser.add_argument("--processes", action="store_true", help="Usa procesos en lugar de hilos para las entradas en paralelo.")
     parser.add_argument("--chunk-size", type=int, default=1000, help="Tamaño de lote para upsert (default 1000).")
     parser.add_argument("--log", help="Ruta de log (opcional, si no se da se crea automatica).")
     parser.add_argument("--debug", action="store_true", help="Modo diagnostico (mas salida en consola).")
+    parser.add_argument("--force", action="store_true", help="Sincroniza aunque la huella del DBF no haya cambiado.")
+    parser.add_argument("--profile", action="store_true", help="Imprime al final el desglose por etapa (tiempos, filas/s, memoria, CPU, round-trips).")
     args = parser.parse_args()
 
-    entry_name = args.entry.upper()
+    if args.modo == "daemon":
+        ejecutar_daemon(args)
+        return
+    if args.modo == "refresh-metadata":
+        refrescar_metadata(args)
+        return
+    if args.modo in ("warm-cache", "purge-cache"):
+        gestionar_snapshots(args)
+        return
+    if not (args.entry or args.all or args.group):
+        parser.error("indique --entry, --group o --all")
+    if args.all or args.group or len(args.entry) > 1:
+        ejecutar_multiples(args)
+        return
+
+    entry_name = args.entry[0].upper()
 
     # Prints previos para saber rutas críticas
     print(f"[RUN] BASE_DIR={BASE_DIR}")
@@ -151,6 +322,9 @@ def main():
             logging.info(msg)
 
     # Ejecutar ETL
+    inicio = datetime.now()
+    perfil = {}
+    duracion = lambda: round((datetime.now() - inicio).total_seconds(), 1)
     try:
         logging.info("==== INICIO EJECUCION ETL ====")
         print("[RUN] Ejecutando ETL…")
@@ -158,9 +332,15 @@ def main():
             dbf_name=entry_name,
             chunk_size=args.chunk_size,
             progress_callback=on_progress,
+            forzar=args.force,
+            perfil_callback=perfil.update,
         )
+        metricas.registrar(ResultadoEntrada(entry_name, True, resumen, duracion(), perfil or None))
+        publicar_metricas(config)
         logging.info(resumen)
         print("[RUN] ETL OK ->", resumen)
+        if args.profile and perfil:
+            print(telemetria.formatear(entry_name, perfil))
         logging.info("==== ETL FINALIZADO EXITOSAMENTE ====")
         print(f"[RUN] Log en: {log_path}")
         sys.exit(0)
@@ -168,6 +348,8 @@ def main():
     except SystemExit:
         raise
     except Exception as ex:
+        metricas.registrar(ResultadoEntrada(entry_name, False, repr(ex), duracion()))
+        publicar_metricas(config)
         print("[RUN][ERROR]", repr(ex))
         logging.exception("Error durante la ejecucion del ETL:")
         print(f"[RUN] Revisa el log: {log_path}")
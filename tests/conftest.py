@@ -0,0 +1,70 @@
+# tests/conftest.py
+#
+# Entorno de sincronización aislado: DBF sintético (benchmarks/generador.py),
+# base destino SQLite y estado, snapshots, metadatos y config en tmp_path.
+
+import os
+import shutil
+
+import pytest
+from sqlalchemy import text
+
+from etl import control, db, etl_core, metadata, snapshot, state
+from benchmarks import etapas
+
+
+class Entorno:
+    """Una entrada de schemas.json lista para ejecutar_etl_con_progreso."""
+
+    def __init__(self, ctx: etapas.Contexto):
+        self.ctx    = ctx
+        self.tabla  = ctx.tabla
+        self.ruta   = os.path.join(ctx.dbf_dir, f"{ctx.tabla}.DBF")
+        self.engine = db.obtener_engine(ctx.uri)
+
+    def sincronizar(self, forzar: bool = True) -> str:
+        return etl_core.ejecutar_etl_con_progreso(self.tabla, self.ctx.chunk_size, lambda _: None, forzar=forzar)
+
+    def consultar(self, sql: str, **params) -> list:
+        with self.engine.connect() as conn:
+            return conn.execute(text(sql), params).fetchall()
+
+    def ejecutar(self, sql: str, **params):
+        with self.engine.begin() as conn:
+            conn.execute(text(sql), params)
+        metadata.invalidar()
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    """
+    entorno("AGENTES", filas=300, config={...}, entry={...}) crea la tabla
+    destino vacía y copia el DBF sintético al DBF_DIR de la config.
+    `columna_soft` agrega la columna de DELETE_MODE = "SOFT".
+    """
+    # preparar_entorno reasigna estas rutas; monkeypatch las restaura al final
+    for modulo, nombre in (
+        (state, "STATE_FILE"), (snapshot, "SNAPSHOT_DIR"), (metadata, "METADATA_DIR"),
+        (control, "CONTROL_FILE"), (etl_core, "CONFIG_PATH"), (etl_core, "SCHEMA_PATH")
+    ):
+        monkeypatch.setattr(modulo, nombre, getattr(modulo, nombre))
+
+    def crear(tabla: str = "AGENTES", filas: int = 300, chunk_size: int = 100,
+              config: dict = None, entry: dict = None, columna_soft: str = None) -> Entorno:
+        uri = f"sqlite:///{tmp_path / 'destino.sqlite'}"
+        ctx = etapas.Contexto(tabla, filas, str(tmp_path), uri, chunk_size, config=config)
+        ctx.entry.update(entry or {})
+        etapas.crear_tablas(ctx)
+        if columna_soft:
+            engine = db.obtener_engine(uri)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {ctx.nombre_tabla} ADD COLUMN {columna_soft} INTEGER DEFAULT 0"
+                )
+        etapas.preparar_entorno(ctx)
+        shutil.copyfile(ctx.generar(), os.path.join(ctx.dbf_dir, f"{ctx.tabla}.DBF"))
+        return Entorno(ctx)
+
+    yield crear
+    metadata.invalidar()
+    db.cerrar_todos()
@@ -0,0 +1,76 @@
+# tests/test_async_loader.py
+#
+# Sin aiomysql: el pool se reemplaza por uno simulado que mide cuántas
+# sentencias hay en vuelo a la vez.
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import Column, Integer, MetaData, Table
+
+from etl import async_loader
+
+
+class _Pool:
+    def __init__(self):
+        self.en_vuelo = 0
+        self.maximo   = 0
+        self.filas    = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _Conexion(self)
+
+
+class _Conexion:
+    def __init__(self, pool):
+        self.pool = pool
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def executemany(self, sql, filas):
+        self.pool.en_vuelo += 1
+        self.pool.maximo = max(self.pool.maximo, self.pool.en_vuelo)
+        await asyncio.sleep(0.01)
+        self.pool.filas.append(len(filas))
+        self.pool.en_vuelo -= 1
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def _cargador(pool, filas_por_chunk: int, concurrencia: int) -> async_loader.CargadorAsync:
+    cargador = async_loader.CargadorAsync.__new__(async_loader.CargadorAsync)
+    cargador.tbl             = Table("t", MetaData(), Column("k", Integer, primary_key=True))
+    cargador.filas_por_chunk = filas_por_chunk
+    cargador.concurrencia    = concurrencia
+    cargador.reintentos      = 0
+    cargador._pool           = pool
+    return cargador
+
+
+def test_lote_menor_que_un_chunk_se_reparte():
+    """Un lote de 1000 filas con chunks de 1000 y N = 4 va en 4 sentencias simultáneas."""
+    pool = _Pool()
+    cargador = _cargador(pool, filas_por_chunk=1000, concurrencia=4)
+    avance = []
+
+    asyncio.run(cargador._upsert("INSERT", [(i,) for i in range(1000)], avance.append))
+
+    assert pool.maximo == 4
+    assert sorted(pool.filas) == [250, 250, 250, 250]
+    assert avance[-1] == 1000
+
+
+def test_filas_por_envio_cubre_la_concurrencia():
+    pool = _Pool()
+    cargador = _cargador(pool, filas_por_chunk=1000, concurrencia=4)
+    assert cargador.filas_por_envio() == 4000
+
+    asyncio.run(cargador._upsert("INSERT", [(i,) for i in range(cargador.filas_por_envio())], None))
+    assert pool.maximo == 4 and pool.filas == [1000] * 4
@@ -0,0 +1,21 @@
+# tests/test_control.py
+
+import json
+
+from etl import control, state
+
+
+def test_migra_sync_control_json_una_vez(tmp_path, monkeypatch):
+    heredado = tmp_path / "sync_control.json"
+    heredado.write_text(json.dumps({
+        "MOVS": {"ultima_fecha": "2024-01-01 10:00:00", "registros": {"1": "abc"}}
+    }), encoding="utf-8")
+    monkeypatch.setattr(control, "CONTROL_FILE", str(heredado))
+    monkeypatch.setattr(control, "_MIGRADO", False)
+    monkeypatch.setattr(state, "STATE_FILE", str(tmp_path / "state.db"))
+    state.escribir("CLIENTES", {"ultima_fecha": "2024-02-01 08:00:00"})
+
+    assert control.obtener_ultima_fecha("MOVS") == "2024-01-01 10:00:00"
+    assert control.obtener_hashes("MOVS") == {"1": "abc"}
+    assert control.obtener_ultima_fecha("CLIENTES") == "2024-02-01 08:00:00"
+    assert not heredado.exists() and (tmp_path / "sync_control.json.migrado").exists()
@@ -0,0 +1,119 @@
+# tests/test_dbf_reader.py
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from etl import dbf_reader, hashing
+from benchmarks import generador
+
+CAMPOS = [
+    {"name": "CLAVE",  "type": "N", "length": 8,  "decimal_count": 0},
+    {"name": "NOMBRE", "type": "C", "length": 20, "decimal_count": 0},
+    {"name": "IMPORTE", "type": "N", "length": 12, "decimal_count": 2},
+    {"name": "FECHA",  "type": "D", "length": 8,  "decimal_count": 0},
+    {"name": "ACTIVO", "type": "L", "length": 1,  "decimal_count": 0},
+    {"name": "ENTERO", "type": "I", "length": 4,  "decimal_count": 0},
+    {"name": "MOMENTO", "type": "T", "length": 8, "decimal_count": 0},
+]
+
+
+def _escribir_T(ruta: str, registro: int, dato: bytes, nombre: str = "MOMENTO"):
+    """Reemplaza el campo `nombre` de un registro por `dato` (bytes crudos)."""
+    encabezado = dbf_reader.leer_encabezado(ruta)
+    campo = next(c for c in encabezado["campos"] if c["name"] == nombre)
+    with open(ruta, "r+b") as f:
+        f.seek(encabezado["header_len"] + registro * encabezado["record_len"] + campo["offset"])
+        f.write(dato)
+
+
+def _normalizar(valor):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)) or valor is pd.NaT:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor
+
+
+def test_paridad_numpy_dbfread(tmp_path):
+    ruta = generador.generar_dbf(str(tmp_path / "PRUEBA.DBF"), CAMPOS, 50, ["CLAVE"])
+    _escribir_T(ruta, 3, b" " * 8)                                  # T en blanco
+    _escribir_T(ruta, 4, b"\0" * 8)                                 # T en ceros
+    dia = datetime.date(2024, 2, 29).toordinal() + 1721425
+    _escribir_T(ruta, 5, np.array([dia, 3_600_000], dtype="<u4").tobytes())
+
+    numpy_df = dbf_reader.leer_dbf_numpy(ruta)
+    dbfread  = [list(r) for r in dbf_reader.abrir_dbfread(ruta)]
+
+    assert len(numpy_df) == len(dbfread) == 50
+    for fila, esperada in zip(numpy_df.itertuples(index=False, name=None), dbfread):
+        assert [_normalizar(v) for v in fila] == [_normalizar(v) for v in esperada]
+    assert numpy_df["MOMENTO"].isna().tolist()[3:5] == [True, True]
+    assert numpy_df.loc[5, "MOMENTO"] == pd.Timestamp(2024, 2, 29, 1)
+
+
+def test_enteros_anchos_y_fechas_fuera_de_rango_ns(tmp_path):
+    """N(18,0) sin pasar por float64 y fechas D más allá de 2262 (límite en ns)."""
+    campos = [
+        {"name": "CLAVE", "type": "N", "length": 18, "decimal_count": 0},
+        {"name": "FECHA", "type": "D", "length": 8,  "decimal_count": 0},
+    ]
+    ruta = generador.generar_dbf(str(tmp_path / "ANCHO.DBF"), campos, 6, ["CLAVE"])
+    _escribir_T(ruta, 0, b"123456789012345678", "CLAVE")
+    _escribir_T(ruta, 0, b"29991231", "FECHA")
+    _escribir_T(ruta, 1, b"00010101", "FECHA")
+    _escribir_T(ruta, 2, b"20240231", "FECHA")                     # día inexistente
+    _escribir_T(ruta, 3, b" " * 8, "FECHA")
+
+    df = dbf_reader.leer_dbf_numpy(ruta)
+    assert df.loc[0, "CLAVE"] == 123456789012345678
+    assert df["FECHA"].tolist()[:4] == [datetime.date(2999, 12, 31), datetime.date(1, 1, 1), None, None]
+
+    _escribir_T(ruta, 4, b" " * 18, "CLAVE")                        # con vacíos
+    df = dbf_reader.leer_dbf_numpy(ruta)
+    assert df.loc[0, "CLAVE"] == 123456789012345678
+    assert _normalizar(df.loc[4, "CLAVE"]) is None
+
+
+def test_fechas_validas_T_descarta_blancos():
+    campo = {"type": "T"}
+    dia   = datetime.date(2024, 1, 1).toordinal() + 1721425
+    llaves = np.array([0, dia, 0x20202020], dtype=np.int64)
+    assert dbf_reader.fechas_validas(llaves, campo).tolist() == [False, True, False]
+
+
+def test_rango_dbfread_igual_a_numpy(tmp_path):
+    """iter_dbfread_rango entrega los mismos registros (y marcas '*') que el lector NumPy."""
+    ruta = generador.generar_dbf(str(tmp_path / "PRUEBA.DBF"), CAMPOS, 40, ["CLAVE"])
+    generador.mutar_dbf(ruta, CAMPOS, ["CLAVE"], borrados=0.25, semilla=3)
+    columnas = ["CLAVE", "NOMBRE", "FECHA"]
+
+    numpy_df = pd.concat(list(dbf_reader.iter_dbf_numpy(ruta, columnas, start=7, stop=31, incluir_borrados=True)))
+    rango = list(dbf_reader.iter_dbfread_rango(ruta, columnas, 7, 31, incluir_borrados=True))
+
+    assert [r[0] for r, _ in rango] == numpy_df["CLAVE"].tolist()
+    assert [b for _, b in rango] == numpy_df[dbf_reader.BORRADO].tolist()
+    assert any(b for _, b in rango)
+    activos = list(dbf_reader.iter_dbfread_rango(ruta, columnas, 7, 31))
+    assert len(activos) == len(rango) - sum(b for _, b in rango)
+
+
+def test_lotes_dbfread_con_tipos_del_lector_numpy(tmp_path):
+    """Un N/T vacío hashea igual en un lote todo vacío, en uno mixto y con NumPy."""
+    ruta = generador.generar_dbf(str(tmp_path / "PRUEBA.DBF"), CAMPOS, 20, ["CLAVE"])
+    for registro in range(12):
+        _escribir_T(ruta, registro, b" " * 12, "IMPORTE")
+        _escribir_T(ruta, registro, b" " * 8)
+    encabezado = dbf_reader.leer_encabezado(ruta)
+    columnas   = ["CLAVE", "IMPORTE", "MOMENTO"]
+    registros  = [list(r) for r in dbf_reader.abrir_dbfread(ruta, columnas)]
+
+    textos = []
+    for inicio in (0, 10):                                          # todo vacío / mixto
+        lote = pd.DataFrame.from_records(registros[inicio:inicio + 10], columns=columnas)
+        lote = dbf_reader.alinear_tipos(lote, encabezado)
+        textos.extend(hashing.concatenar_columnas(lote, columnas).tolist())
+
+    numpy_df = dbf_reader.leer_dbf_numpy(ruta, columnas)
+    assert textos == hashing.concatenar_columnas(numpy_df, columnas).tolist()
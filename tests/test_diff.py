@@ -0,0 +1,46 @@
+# tests/test_diff.py
+
+import pandas as pd
+
+from etl.diff import CLAVE, HASH_PREVIO, ClavesVistas, calcular_diff, preparar_destino, separar_clave
+
+
+def _destino(claves: list) -> pd.DataFrame:
+    return preparar_destino(pd.DataFrame({"ID": claves, "row_hash": ["h"] * len(claves)}), ["ID"], "row_hash")
+
+
+def test_claves_vistas_entre_lotes():
+    """Primera aparición por llave (en destino o nueva) y anti-join al final."""
+    vistos = ClavesVistas(_destino([1, 2, 3, 4]))
+    assert vistos.registrar(["1", "9"]).tolist() == [True, True]
+    assert vistos.registrar(["1", "2", "9", "8"]).tolist() == [False, True, False, True]
+    assert vistos.contiene(["3", "8", "7"]).tolist() == [False, True, False]
+    assert sorted(vistos.faltantes(_destino([1, 2, 3, 4]))) == ["3", "4"]
+    assert len(ClavesVistas(_destino([])).registrar([])) == 0
+
+
+def test_calcular_diff_separa_los_cuatro_conjuntos():
+    origen = pd.DataFrame({
+        "ID":       [1, 2, 3, 5],
+        "SUC":      ["A", "A", "B", "B"],
+        "row_hash": ["h1", "h2-nuevo", "h3", "h5"],
+    })
+    destino = pd.DataFrame({
+        "ID":       [1.0, 2.0, 3.0, 4.0],                            # 1 == 1.0 en la llave
+        "SUC":      ["A", "A", "B", "B"],
+        "row_hash": ["h1", "h2", None, "h4"],
+    })
+
+    r = calcular_diff(origen, destino, ["ID", "SUC"], "row_hash")
+
+    assert r.insertados["ID"].tolist() == [5]
+    assert r.cambiados["ID"].tolist() == [2, 3]                      # hash distinto o NULL
+    assert r.cambiados[HASH_PREVIO].iloc[0] == "h2" and pd.isna(r.cambiados[HASH_PREVIO].iloc[1])
+    assert r.sin_cambios["ID"].tolist() == [1]
+    assert separar_clave(r.faltantes[CLAVE].to_numpy(dtype=object), ["ID", "SUC"]).values.tolist() == [["4", "B"]]
+
+
+def test_calcular_diff_por_lotes_sin_faltantes():
+    destino = preparar_destino(pd.DataFrame({"ID": [1, 2], "row_hash": ["a", "b"]}), ["ID"], "row_hash")
+    r = calcular_diff(pd.DataFrame({"ID": [2], "row_hash": ["b"]}), destino, ["ID"], "row_hash", con_faltantes=False)
+    assert r.sin_cambios["ID"].tolist() == [2] and r.faltantes.empty
@@ -0,0 +1,38 @@
+# tests/test_extract.py
+
+import datetime
+
+from etl import dbf_reader, extract
+from benchmarks import generador
+
+CAMPOS = [
+    {"name": "CLAVE", "type": "N", "length": 8, "decimal_count": 0},
+    {"name": "FECHA", "type": "D", "length": 8, "decimal_count": 0},
+]
+
+
+def _escribir_fecha(ruta: str, encabezado: dict, registro: int, fecha: bytes):
+    campo = next(c for c in encabezado["campos"] if c["name"] == "FECHA")
+    with open(ruta, "r+b") as f:
+        f.seek(encabezado["header_len"] + registro * encabezado["record_len"] + campo["offset"])
+        f.write(fecha)
+
+
+def test_indice_de_fechas_relee_bloques_editados(tmp_path, monkeypatch):
+    """Una edición en sitio dentro de un bloque ya indexado no se pierde."""
+    monkeypatch.setattr(extract, "FECHAS_DIR", str(tmp_path / "fechas"))
+    ruta = generador.generar_dbf(str(tmp_path / "MOVS.DBF"), CAMPOS, 50, ["CLAVE"])
+    encabezado = dbf_reader.leer_encabezado(ruta)
+    for registro in range(50):
+        _escribir_fecha(ruta, encabezado, registro, b"20200101")
+    campo = next(c for c in encabezado["campos"] if c["name"] == "FECHA")
+    desde, hasta = datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)
+
+    def ventana():
+        return extract._leer_ventana(ruta, encabezado, ["CLAVE", "FECHA"], campo, desde, hasta, True, tam=10)
+
+    assert len(ventana()) == 0                                       # construye el índice
+    _escribir_fecha(ruta, encabezado, 3, b"20240601")
+    df = ventana()
+    assert df["FECHA"].tolist() == [datetime.date(2024, 6, 1)]
+    assert len(ventana()) == 1                                       # índice actualizado
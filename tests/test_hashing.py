@@ -0,0 +1,34 @@
+# tests/test_hashing.py
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from etl import hashing
+from etl.etl_core import calcular_hash_fila
+
+
+def test_calcular_hashes_igual_a_hash_fila():
+    """sha256 vectorizado = calcular_hash_fila fila por fila (valores repetidos, nulos, fechas)."""
+    df = pd.DataFrame({
+        "entero":  np.array([1, 2, 2, -3, 2**62], dtype=np.int64),
+        "flot":    [1.0, 2.5, np.nan, -0.0, 1e20],
+        "importe": [10.5, 10.5, 3.0, 3.0, 0.1 + 0.2],
+        "texto":   pd.array([" a ", None, "b", " a ", "c"], dtype=object),
+        "cadena":  pd.Series(["x", None, " y", "x", "z"], dtype="str"),
+        "fecha":   [datetime.date(2024, 1, 1), None, datetime.date(2024, 1, 1), datetime.date(1999, 12, 31), None],
+        "momento": pd.to_datetime(["2024-01-01 10:00:00", None, "2024-01-01 10:00:00.5", "2020-02-02", None],
+                                  format="mixed"),
+        "activo":  [True, False, True, True, False],
+        "mixto":   [1, "x ", 2.0, None, np.nan],
+    })
+    cols = list(df.columns)
+    esperados = [calcular_hash_fila(r, cols) for r in df.to_dict("records")]
+    assert hashing.calcular_hashes(df, cols, "sha256").tolist() == esperados
+
+
+def test_detectar_algoritmo_nulo():
+    assert hashing.detectar_algoritmo(None) is None
+    assert hashing.detectar_algoritmo(float("nan")) is None
+    assert hashing.detectar_algoritmo("0" * 16) == "fast64"
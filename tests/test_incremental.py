@@ -0,0 +1,51 @@
+# tests/test_incremental.py
+
+from etl import dbf_reader, incremental
+from benchmarks import generador
+
+CAMPOS = [
+    {"name": "CLAVE",  "type": "N", "length": 8,  "decimal_count": 0},
+    {"name": "NOMBRE", "type": "C", "length": 20, "decimal_count": 0},
+]
+
+
+def test_firma_de_cola_es_la_del_plan(tmp_path):
+    """Una edición de la cola durante la carga no queda firmada como procesada."""
+    ruta = generador.generar_dbf(str(tmp_path / "COLA.DBF"), CAMPOS, 300, ["CLAVE"])
+    inicio, fin, firma, _ = incremental.planear_cola(ruta, None)
+    assert (inicio, fin) == (0, 300)
+
+    generador.mutar_dbf(ruta, CAMPOS, ["CLAVE"], cambios=0.5, semilla=7)   # mientras se cargaba
+    estado = incremental.nuevo_estado_cola(ruta, fin, firma, completa=True)
+
+    inicio, _, _, motivo = incremental.planear_cola(ruta, estado)
+    assert inicio == 0 and "modificados" in motivo
+
+
+def test_cola_sin_cambios_lee_solo_lo_nuevo(tmp_path):
+    ruta = generador.generar_dbf(str(tmp_path / "COLA.DBF"), CAMPOS, 300, ["CLAVE"])
+    _, fin, firma, _ = incremental.planear_cola(ruta, None)
+    estado = incremental.nuevo_estado_cola(ruta, fin, firma, completa=True)
+
+    assert incremental.planear_cola(ruta, estado)[:3] == (300, 300, firma)
+    generador.mutar_dbf(ruta, CAMPOS, ["CLAVE"], altas=0.1, semilla=7)
+    inicio, fin, _, _ = incremental.planear_cola(ruta, estado)
+    assert (inicio, fin) == (300, 330)
+
+
+def test_planear_bloques_solo_los_cambiados(tmp_path):
+    ruta = generador.generar_dbf(str(tmp_path / "CAT.DBF"), CAMPOS, 1000, ["CLAVE"])
+    rangos, sumas, completa, _ = incremental.planear_bloques(ruta, None, tam=100)
+    assert (rangos, completa, len(sumas)) == ([(0, 1000)], True, 10)
+    estado = incremental.nuevo_estado_bloques(ruta, sumas, completa, tam=100)
+
+    with open(ruta, "r+b") as f:                                     # edición en sitio: registros 250 y 310
+        encabezado = dbf_reader.leer_encabezado(ruta)
+        for registro in (250, 310):
+            f.seek(encabezado["header_len"] + registro * encabezado["record_len"] + 9)
+            f.write(b"EDITADO")
+    rangos, _, completa, _ = incremental.planear_bloques(ruta, estado, tam=100)
+    assert (rangos, completa) == ([(200, 400)], False)
+
+    rangos, _, completa, motivo = incremental.planear_bloques(ruta, estado, tam=50)
+    assert completa and "tamaño de bloque" in motivo
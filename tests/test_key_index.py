@@ -0,0 +1,28 @@
+# tests/test_key_index.py
+
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from etl import key_index, state
+from etl.diff import CLAVE
+
+
+def test_checksum_omite_nulos_como_bit_xor():
+    """BIT_XOR(CRC32(row_hash)) ignora NULL; None y NaN tampoco aportan."""
+    esperado = zlib.crc32(b"aa") ^ zlib.crc32(b"bb")
+    assert key_index.checksum_hashes(["aa", None, "bb", np.nan, float("nan")]) == esperado
+
+
+def test_rescan_tras_borrado_soft(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "STATE_FILE", str(tmp_path / "state.db"))
+    destino = pd.DataFrame({CLAVE: ["1", "2", "3"], "row_hash": pd.Series(["aa", np.nan, "cc"])})
+    key_index.reemplazar("MOVS", destino, "row_hash")
+    key_index.aplicar_cambios("MOVS", np.array(["3", "4"], dtype=object), np.array([np.nan, "dd"], dtype=object))
+
+    filas, checksum = key_index.estado_local("MOVS")
+    assert filas == 4
+    assert checksum == key_index.checksum_hashes(["aa", "dd"])
+    cargado = key_index.cargar("MOVS", "row_hash")
+    assert cargado.loc["2", "row_hash"] is None and cargado.loc["3", "row_hash"] is None
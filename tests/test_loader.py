@@ -0,0 +1,113 @@
+# tests/test_loader.py
+
+import pandas as pd
+import pymysql
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+from etl import loader, lotes
+
+
+class _Cursor:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def executemany(self, sql, filas):
+        self.conexion.pendientes += len(filas)
+
+    def close(self):
+        pass
+
+
+class _Conexion:
+    """Conexión cruda de pymysql simulada: registra las filas de cada COMMIT."""
+
+    def __init__(self):
+        self.pendientes = 0
+        self.commits    = []
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits.append(self.pendientes)
+        self.pendientes = 0
+
+    def rollback(self):
+        self.pendientes = 0
+
+    def close(self):
+        pass
+
+
+class _Engine:
+    def __init__(self):
+        self.conexion = _Conexion()
+
+    def raw_connection(self):
+        return self.conexion
+
+
+def _tabla() -> Table:
+    return Table("t", MetaData(), Column("k", Integer, primary_key=True), Column("row_hash", String(64)))
+
+
+def test_commit_rows_mayor_que_chunk_size():
+    """COMMIT_ROWS = 2500 con lotes leídos de 1000: transacciones de 2500 filas."""
+    engine   = _Engine()
+    cargador = loader.CargadorMasivo(engine, _tabla(), ["k"], filas_por_commit=2500, max_bytes=1024 * 1024)
+    acumulador = lotes.Acumulador(cargador.filas_por_envio)
+
+    envios = []
+    for inicio in range(0, 6000, 1000):
+        lote = pd.DataFrame({"k": range(inicio, inicio + 1000), "row_hash": "h"})
+        envios.append(acumulador.agregar(lote, lote.iloc[0:0], len(lote)))
+    envios.append(acumulador.vaciar())
+    for trabajo in filter(None, envios):
+        (sync, _), _ = trabajo
+        cargador.upsert(sync)
+
+    assert engine.conexion.commits == [2500, 2500, 1000]
+
+
+def test_auto_decide_con_filas_acumuladas():
+    """LOAD_MODE = AUTO: lotes leídos de 1000 filas juntan el umbral y van por INFILE."""
+    engine   = _Engine()
+    cargador = loader.CargadorMasivo(
+        engine, _tabla(), ["k"], filas_por_commit=1000, max_bytes=1024 * 1024, modo="AUTO", umbral_infile=5000
+    )
+    infile = []
+    cargador.upsert_infile = lambda df, columnas, on_chunk=None: infile.append(len(df)) or len(df)
+    acumulador = lotes.Acumulador(cargador.filas_por_envio)
+
+    envios = []
+    for inicio in range(0, 12000, 1000):
+        lote = pd.DataFrame({"k": range(inicio, inicio + 1000), "row_hash": "h"})
+        envios.append(acumulador.agregar(lote, lote.iloc[0:0], len(lote)))
+    envios.append(acumulador.vaciar())
+    for trabajo in filter(None, envios):
+        (sync, _), _ = trabajo
+        cargador.upsert(sync)
+
+    assert infile == [5000, 5000]
+    assert engine.conexion.commits == [1000, 1000]
+
+
+def test_infile_solo_cae_a_upsert_si_esta_deshabilitado():
+    """1148/3948 pasan a UPSERT; otros errores se propagan sin cambiar el modo."""
+    cargador = loader.CargadorMasivo(_Engine(), _tabla(), ["k"], max_bytes=1024 * 1024, modo="INFILE")
+    lote = pd.DataFrame({"k": range(10), "row_hash": "h"})
+
+    def falla(codigo):
+        def upsert_infile(df, columnas, on_chunk=None):
+            raise pymysql.err.OperationalError(codigo, "error")
+        return upsert_infile
+
+    cargador.upsert_infile = falla(1213)                             # deadlock
+    with pytest.raises(pymysql.err.OperationalError):
+        cargador.upsert(lote)
+    assert cargador.modo == "INFILE"
+
+    cargador.upsert_infile = falla(3948)
+    assert cargador.upsert(lote) == 10
+    assert cargador.modo == "UPSERT"
@@ -0,0 +1,31 @@
+# tests/test_lotes.py
+
+import pandas as pd
+
+from etl import lotes
+
+
+def _lote(desde: int, n: int) -> pd.DataFrame:
+    return pd.DataFrame({"k": range(desde, desde + n), "row_hash": ["h"] * n})
+
+
+def test_acumulador_entrega_multiplos_del_objetivo():
+    acc = lotes.Acumulador(lambda: 250)
+    vacio = _lote(0, 0)
+    assert acc.agregar(_lote(0, 100), vacio, 100) is None
+    assert acc.agregar(_lote(100, 100), vacio, 100) is None
+
+    (sync, migrar), leidas = acc.agregar(_lote(200, 400), _lote(900, 3), 400)
+    assert len(sync) == 500 and len(migrar) == 3 and leidas == 600
+    assert sync["k"].tolist() == list(range(500))
+
+    (sync, migrar), leidas = acc.vaciar()
+    assert sync["k"].tolist() == list(range(500, 600)) and migrar.empty and leidas == 0
+    assert acc.vaciar() is None
+
+
+def test_acumulador_conserva_columnas_sin_filas():
+    acc = lotes.Acumulador(lambda: 10)
+    acc.agregar(_lote(0, 0), _lote(0, 0), 100)
+    (sync, migrar), leidas = acc.vaciar()
+    assert list(sync.columns) == ["k", "row_hash"] and leidas == 100
@@ -0,0 +1,46 @@
+# tests/test_metadata.py
+
+import threading
+
+from sqlalchemy import create_engine
+
+from etl import metadata
+
+
+def test_invalidar_solo_la_tabla_pedida(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata, "METADATA_DIR", str(tmp_path))
+    for nombre in ("0123456789ab_VENTAS.pkl", "0123456789ab_X_VENTAS.pkl", "ba9876543210_VENTAS.pkl"):
+        (tmp_path / nombre).write_bytes(b"")
+
+    metadata.invalidar("VENTAS")
+    assert [p.name for p in tmp_path.iterdir()] == ["0123456789ab_X_VENTAS.pkl"]
+
+
+def test_reflexion_de_una_tabla_no_frena_a_otras(tmp_path, monkeypatch):
+    """Mientras la firma de A está en curso, B se refleja sin esperar."""
+    monkeypatch.setattr(metadata, "METADATA_DIR", str(tmp_path / "metadata"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'destino.sqlite'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE A (k INTEGER PRIMARY KEY)")
+        conn.exec_driver_sql("CREATE TABLE B (k INTEGER PRIMARY KEY)")
+
+    en_curso, liberar = threading.Event(), threading.Event()
+
+    def firma_lenta(engine, table_name):
+        if table_name == "A":
+            en_curso.set()
+            liberar.wait(10)
+        return None
+
+    monkeypatch.setattr(metadata, "firma_esquema", firma_lenta)
+    hilo = threading.Thread(target=metadata.obtener_tabla, args=(engine, "A", True))
+    hilo.start()
+    try:
+        assert en_curso.wait(10)
+        assert metadata.obtener_tabla(engine, "B", refrescar=True).name == "B"
+        assert hilo.is_alive()
+    finally:
+        liberar.set()
+        hilo.join()
+        metadata.invalidar()
+        engine.dispose()
@@ -0,0 +1,26 @@
+# tests/test_runner.py
+
+import logging
+
+from etl import runner
+
+
+def test_worker_escribe_en_el_log_de_run(tmp_path):
+    """El initializer de los procesos worker deja el log en el archivo de run.py."""
+    log_path = tmp_path / "etl_ALL.log"
+    raiz = logging.getLogger()
+    previos, nivel = raiz.handlers[:], raiz.level
+    try:
+        runner._iniciar_worker(str(log_path), logging.DEBUG)
+        logging.debug("[MOVS] desde el worker")
+        for h in raiz.handlers:
+            h.flush()
+    finally:
+        for h in raiz.handlers[:]:
+            raiz.removeHandler(h)
+            h.close()
+        for h in previos:
+            raiz.addHandler(h)
+        raiz.setLevel(nivel)
+
+    assert "DEBUG [MOVS] desde el worker" in log_path.read_text(encoding="utf-8")
@@ -0,0 +1,33 @@
+# tests/test_scheduler.py
+
+from datetime import datetime
+
+from etl import scheduler
+
+SCHEMAS = {"ENTRIES": {
+    "CATALOGS":      [{"DBF": "agentes"}, {"DBF": "zonas", "SCHEDULE": {"ENABLED": False}}],
+    "TRANSACTIONAL": [{"DBF": "movs", "SCHEDULE": {"INTERVAL_MIN": 5, "WINDOW": ["22:00", "06:00"]}}],
+}}
+
+
+def test_programaciones_combinan_config_y_entrada():
+    cfg = {"SCHEDULE": {"JITTER_S": 0, "CATALOGS": {"INTERVAL_MIN": 90}}}
+    progs = scheduler.construir_programaciones(cfg, SCHEMAS)
+
+    assert sorted(progs) == ["AGENTES", "MOVS"]
+    assert progs["AGENTES"].intervalo.total_seconds() == 90 * 60
+    assert progs["MOVS"].intervalo.total_seconds() == 5 * 60
+    assert list(scheduler.construir_programaciones(cfg, SCHEMAS, ["movs"])) == ["MOVS"]
+
+
+def test_programar_respeta_la_ventana():
+    diurna = scheduler.Programacion("AGENTES", 120, ("06:00", "22:00"), 0)
+    diurna.programar(datetime(2024, 5, 1, 21, 0))
+    assert diurna.siguiente == datetime(2024, 5, 2, 6, 0)            # 23:00 cae fuera: abre mañana
+    diurna.programar(datetime(2024, 5, 1, 3, 0), primera=True)
+    assert diurna.siguiente == datetime(2024, 5, 1, 6, 0)
+
+    nocturna = scheduler.Programacion("MOVS", 30, ("22:00", "06:00"), 0)
+    assert nocturna.en_ventana(datetime(2024, 5, 1, 23, 30)) and nocturna.en_ventana(datetime(2024, 5, 1, 5, 0))
+    nocturna.programar(datetime(2024, 5, 1, 5, 45))
+    assert nocturna.siguiente == datetime(2024, 5, 1, 22, 0)
@@ -0,0 +1,81 @@
+# tests/test_sincronizacion.py
+
+import pytest
+
+from benchmarks import generador
+
+
+@pytest.mark.parametrize("key_index", [True, False])
+def test_row_hash_nulo_en_destino(entorno, key_index):
+    """Un row_hash NULL en destino (p. ej. tras SOFT) se trata como fila cambiada."""
+    e = entorno("AGENTES", filas=300, config={"KEY_INDEX": key_index})
+    e.sincronizar()
+    tabla = e.ctx.nombre_tabla
+    e.ejecutar(f"UPDATE {tabla} SET row_hash = NULL WHERE rowid IN (SELECT rowid FROM {tabla} LIMIT 5)")
+
+    mensaje = e.sincronizar()
+
+    assert "conciliaciones: 5," in mensaje
+    assert e.consultar(f"SELECT COUNT(*) FROM {tabla} WHERE row_hash IS NULL")[0][0] == 0
+
+
+def test_soft_no_vuelve_a_marcar(entorno):
+    """Las filas ya marcadas no se re-marcan ni acumulan para MAX_DELETE_RATIO."""
+    e = entorno("AGENTES", filas=300, columna_soft="is_deleted",
+                config={"DELETE_MODE": "SOFT", "MAX_DELETE_RATIO": 0.10})
+    e.sincronizar()
+    tabla = e.ctx.nombre_tabla
+
+    generador.mutar_dbf(e.ruta, e.ctx.campos, e.ctx.claves_dbf, borrados=0.06, semilla=1)
+    assert "eliminadas: 18," in e.sincronizar()
+    # Segunda tanda: 18 + 18 superaría el 10% si se contaran las ya marcadas
+    generador.mutar_dbf(e.ruta, e.ctx.campos, e.ctx.claves_dbf, borrados=0.06, semilla=2)
+    nuevas = e.sincronizar()
+
+    marcadas = e.consultar(f"SELECT COUNT(*) FROM {tabla} WHERE is_deleted = 1")[0][0]
+    assert f"eliminadas: {marcadas - 18}," in nuevas
+    assert "eliminadas: 0," in e.sincronizar()
+
+
+def test_lote_adaptativo_junta_lotes_leidos(entorno):
+    """Con lecturas de 100 registros el upsert adaptativo igual usa su propio tamaño."""
+    e = entorno("AGENTES", filas=3000, chunk_size=100, config={
+        "ADAPTIVE_CHUNK": True, "CHUNK_TARGET_BYTES": 20000, "CHUNK_MIN_ROWS": 50
+    })
+    e.sincronizar()
+
+    usado = e.consultar("SELECT chunk_size FROM tbl_sync_log ORDER BY id DESC LIMIT 1")[0][0]
+    assert usado > 100
+    assert e.consultar(f"SELECT COUNT(*) FROM {e.ctx.nombre_tabla}")[0][0] == 3000
+
+
+def test_append_con_memo_lee_solo_la_cola(entorno):
+    """FACTURAC proyecta un memo (OBSERVA): APPEND salta a la cola con dbfread en vez de releer todo."""
+    e = entorno("FACTURAC", filas=500, entry={"SYNC_MODE": "APPEND"})
+    assert "Procesadas: 500," in e.sincronizar()
+
+    generador.mutar_dbf(e.ruta, e.ctx.campos, e.ctx.claves_dbf, altas=0.04, semilla=1)
+    assert "Procesadas: 20," in e.sincronizar()
+    assert e.consultar(f"SELECT COUNT(*) FROM {e.ctx.nombre_tabla}")[0][0] == 520
+
+
+def test_huella_identica_omite_la_sincronizacion(entorno):
+    e = entorno("AGENTES", filas=300)
+    assert "Procesadas: 300," in e.sincronizar(forzar=False)
+    assert e.sincronizar(forzar=False).startswith("Sin cambios en AGENTES.DBF")
+
+    generador.mutar_dbf(e.ruta, e.ctx.campos, e.ctx.claves_dbf, cambios=0.05, semilla=1,
+                        campos_cambio=generador.campos_fuente(e.ctx.entry, e.ctx.hash_cols))
+    mensaje = e.sincronizar(forzar=False)
+    assert "Procesadas: 300," in mensaje and "conciliaciones: 15," in mensaje
+
+
+def test_blocks_lee_solo_los_bloques_cambiados(entorno):
+    e = entorno("AGENTES", filas=1000, entry={"SYNC_MODE": "BLOCKS", "BLOCK_RECORDS": 100})
+    assert "Procesadas: 1000," in e.sincronizar()
+
+    generador.mutar_dbf(e.ruta, e.ctx.campos, e.ctx.claves_dbf, cambios=0.002, semilla=4,
+                        campos_cambio=generador.campos_fuente(e.ctx.entry, e.ctx.hash_cols))
+    mensaje = e.sincronizar()
+    assert "conciliaciones: 2," in mensaje
+    assert int(mensaje.split("Procesadas: ")[1].split(",")[0]) <= 200     # 2 bloques de 100
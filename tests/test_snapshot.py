@@ -0,0 +1,39 @@
+# tests/test_snapshot.py
+
+import os
+
+import pytest
+
+from etl import snapshot
+from benchmarks import generador
+
+CAMPOS = [
+    {"name": "CLAVE",  "type": "N", "length": 8,  "decimal_count": 0},
+    {"name": "NOMBRE", "type": "C", "length": 20, "decimal_count": 0},
+    {"name": "FECHA",  "type": "D", "length": 8,  "decimal_count": 0},
+]
+
+
+def test_purgar_respeta_generacion_en_curso(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    for nombre in ("MOVS_a1.parquet", "MOVS_b2.parquet.1234.5678.tmp", "CLIENTES_c3.parquet"):
+        (tmp_path / nombre).write_bytes(b"")
+
+    assert snapshot.purgar("MOVS") == 1
+    assert snapshot.purgar() == 1
+    assert os.listdir(tmp_path) == ["MOVS_b2.parquet.1234.5678.tmp"]
+
+
+def test_lectura_completa_genera_snapshot(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    ruta = generador.generar_dbf(str(tmp_path / "MOVS.DBF"), CAMPOS, 250, ["CLAVE"])
+
+    assert snapshot.iter_lotes(ruta, ["CLAVE"], 100) is None
+    lotes = list(snapshot.iter_lotes(ruta, ["CLAVE", "FECHA"], 100, generar=True))
+    assert [len(l) for l in lotes] == [100, 100, 50]
+    assert list(lotes[0].columns) == ["CLAVE", "FECHA"]
+    assert snapshot.buscar(ruta) == snapshot.ruta_snapshot(ruta)
+
+    desde_snapshot = list(snapshot.iter_lotes(ruta, ["CLAVE"], 100))
+    assert sum(len(l) for l in desde_snapshot) == 250
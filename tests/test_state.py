@@ -0,0 +1,20 @@
+# tests/test_state.py
+
+import os
+import sys
+
+from etl import state
+
+
+def test_directorio_base_ejecutable_congelado(monkeypatch, tmp_path):
+    """Con PyInstaller el estado va junto al ejecutable, no dentro de _MEIPASS."""
+    exe = tmp_path / "dist" / "AlphaETL.exe"
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    monkeypatch.setattr(sys, "_MEIPASS", str(tmp_path / "_MEI123"), raising=False)
+    monkeypatch.setattr(sys, "executable", str(exe))
+    assert state.directorio_base() == str(tmp_path / "dist")
+
+
+def test_directorio_base_desarrollo():
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(state.__file__)))
+    assert state.directorio_base() == raiz
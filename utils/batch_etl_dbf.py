@@ -67,19 +67,29 @@ def dbf_to_dataframe(path):
     return df
 
 
+# Tablas ya reflejadas en esta ejecución (None = no existe)
+_TABLAS = {}
+
+
+def reflejar_tabla(engine, tbl_lower):
+    """Refleja la tabla una sola vez por ejecución y no en cada lote."""
+    if tbl_lower not in _TABLAS:
+        meta = MetaData()
+        try:
+            meta.reflect(bind=engine, only=[tbl_lower])
+            _TABLAS[tbl_lower] = meta.tables.get(tbl_lower)
+        except Exception:
+            _TABLAS[tbl_lower] = None
+    return _TABLAS[tbl_lower]
+
+
 def upsert_or_replace(df, engine, table_name, chunk_size, force_replace=False):
     """
     Upsert por PK o replace completo. Si force_replace=True hace replace.
     """
-    tbl = None
-    meta = MetaData()
     tbl_lower = table_name.lower()
     # verificar existencia tabla
-    try:
-        meta.reflect(bind=engine, only=[tbl_lower])
-        tbl = meta.tables.get(tbl_lower)
-    except Exception:
-        tbl = None
+    tbl = reflejar_tabla(engine, tbl_lower)
 
     # fuerza replace o tabla no existe
     if force_replace or tbl is None:
@@ -90,6 +100,8 @@ def upsert_or_replace(df, engine, table_name, chunk_size, force_replace=False):
             dtype={col: MySQLText(collation='utf8mb4_unicode_ci')
                    for col in df.columns}
         )
+        # La tabla se recreó: la siguiente llamada la vuelve a reflejar
+        _TABLAS.pop(tbl_lower, None)
         return
 
     # si tiene PK -> upsert